@@ -0,0 +1 @@
+"""Benchmarks init file."""
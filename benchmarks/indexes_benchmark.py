@@ -0,0 +1,243 @@
+"""Indexes benchmark file. Used to compare query plans before/after indexes.
+
+Creates a separate schema in the configured database, seeds it with
+generated rows, captures 'EXPLAIN (ANALYZE, BUFFERS)' of the foreign key
+lookups before and after creating indexes and drops the schema.
+
+Run from the repository root:
+    python -m benchmarks.indexes_benchmark --rows 1000000
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from time import perf_counter
+from types import MappingProxyType
+
+from sqlalchemy import NullPool, text
+from sqlalchemy.ext.asyncio import AsyncConnection, create_async_engine
+
+from python_advanced_diploma.src.database import DATABASE_URL
+
+SCHEMA = "indexes_benchmark"
+DEFAULT_ROWS = 1000000
+DEFAULT_USERS = 10000
+
+CREATE_TABLES = (
+    'CREATE TABLE "user" (id serial PRIMARY KEY, name varchar NOT NULL)',
+    (
+        "CREATE TABLE follow ("
+        'following_user_id int NOT NULL REFERENCES "user" (id), '
+        'followed_user_id int NOT NULL REFERENCES "user" (id), '
+        "PRIMARY KEY (following_user_id, followed_user_id))"
+    ),
+    (
+        "CREATE TABLE tweet (id serial PRIMARY KEY, "
+        "content varchar NOT NULL, "
+        'author_id int NOT NULL REFERENCES "user" (id))'
+    ),
+    (
+        'CREATE TABLE "like" ('
+        'user_id int NOT NULL REFERENCES "user" (id), '
+        "tweet_id int NOT NULL REFERENCES tweet (id), "
+        "PRIMARY KEY (user_id, tweet_id))"
+    ),
+    (
+        "CREATE TABLE tweet_media (id serial PRIMARY KEY, "
+        "image varchar NOT NULL, tweet_id int REFERENCES tweet (id))"
+    ),
+)
+
+SEED_TABLES = (
+    (
+        'INSERT INTO "user" (name) '
+        "SELECT 'user_' || i FROM generate_series(1, :users) AS i"
+    ),
+    (
+        "INSERT INTO tweet (content, author_id) "
+        "SELECT 'tweet_' || i, 1 + (i % :users) "
+        "FROM generate_series(1, :rows) AS i"
+    ),
+    (
+        'INSERT INTO "like" (user_id, tweet_id) '
+        "SELECT 1 + (i % :users), 1 + (i * 7919 % :rows) "
+        "FROM generate_series(1, :rows) AS i ON CONFLICT DO NOTHING"
+    ),
+    (
+        "INSERT INTO follow (following_user_id, followed_user_id) "
+        "SELECT 1 + (i % :users), 1 + (i * 31 % :users) "
+        "FROM generate_series(1, :rows) AS i "
+        "WHERE i % :users <> i * 31 % :users ON CONFLICT DO NOTHING"
+    ),
+    (
+        "INSERT INTO tweet_media (image, tweet_id) "
+        "SELECT 'image_' || i, 1 + (i % :rows) "
+        "FROM generate_series(1, :rows) AS i"
+    ),
+)
+
+CREATE_INDEXES = (
+    'CREATE INDEX ix_like_tweet_id ON "like" (tweet_id)',
+    "CREATE INDEX ix_tweet_author_id ON tweet (author_id)",
+    "CREATE INDEX ix_follow_followed_user_id ON follow (followed_user_id)",
+    "CREATE INDEX ix_tweet_media_tweet_id ON tweet_media (tweet_id)",
+)
+
+LOOKUP_QUERIES = MappingProxyType({
+    "feed_likes_selectinload": (
+        'SELECT tweet_id, user_id FROM "like" '
+        "WHERE tweet_id IN (11, 12, 13, 14, 15, 16, 17, 18, 19, 20)"
+    ),
+    "tweets_by_author": "SELECT id FROM tweet WHERE author_id = 42",
+    "profile_following": (
+        "SELECT following_user_id FROM follow WHERE followed_user_id = 42"
+    ),
+    "delete_tweet_medias": "SELECT id FROM tweet_media WHERE tweet_id = 42",
+})
+
+
+async def explain_query(
+    conn: AsyncConnection, query: str,
+) -> dict[str, float | str]:
+    """
+    Функция для получения плана выполнения запроса.
+
+    :param conn: асинхронное соединение
+    :param query: текст запроса
+    :return: план и время выполнения запроса
+    """
+    explain_result = await conn.execute(
+        text(
+            "EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {query}".format(
+                query=query,
+            ),
+        ),
+    )
+    explain_output = explain_result.scalar_one()
+    if isinstance(explain_output, str):
+        explain_output = json.loads(explain_output)
+    plan = explain_output[0]
+    return {
+        "node_type": plan["Plan"]["Node Type"],
+        "execution_time_ms": plan["Execution Time"],
+        "shared_buffers_hit": plan["Plan"]["Shared Hit Blocks"],
+        "shared_buffers_read": plan["Plan"]["Shared Read Blocks"],
+    }
+
+
+async def explain_lookup_queries(
+    conn: AsyncConnection,
+) -> dict[str, dict[str, float | str]]:
+    """
+    Функция для получения планов выполнения запросов поиска по внешним ключам.
+
+    :param conn: асинхронное соединение
+    :return: планы и время выполнения запросов
+    """
+    return {
+        query_name: await explain_query(conn, query)
+        for query_name, query in LOOKUP_QUERIES.items()
+    }
+
+
+async def create_schema(conn: AsyncConnection) -> None:
+    """
+    Функция для создания схемы бенчмарка и её таблиц.
+
+    :param conn: асинхронное соединение
+    """
+    await conn.execute(
+        text("DROP SCHEMA IF EXISTS {schema} CASCADE".format(schema=SCHEMA)),
+    )
+    await conn.execute(text("CREATE SCHEMA {schema}".format(schema=SCHEMA)))
+    await conn.execute(
+        text("SET search_path TO {schema}".format(schema=SCHEMA)),
+    )
+    for create_table in CREATE_TABLES:
+        await conn.execute(text(create_table))
+
+
+async def seed_tables(conn: AsyncConnection, rows: int, users: int) -> float:
+    """
+    Функция для заполнения таблиц бенчмарка и сбора их статистики.
+
+    :param conn: асинхронное соединение
+    :param rows: количество строк в таблицах твитов, лайков и медиа
+    :param users: количество пользователей
+    :return: длительность заполнения в секундах
+    """
+    seed_started_at = perf_counter()
+    for seed_table in SEED_TABLES:
+        await conn.execute(text(seed_table), {"rows": rows, "users": users})
+    seed_duration = perf_counter() - seed_started_at
+    await conn.execute(text("ANALYZE"))
+    return seed_duration
+
+
+async def create_indexes(conn: AsyncConnection) -> None:
+    """
+    Функция для создания индексов и обновления статистики таблиц.
+
+    :param conn: асинхронное соединение
+    """
+    for create_index in CREATE_INDEXES:
+        await conn.execute(text(create_index))
+    await conn.execute(text("ANALYZE"))
+
+
+async def benchmark_indexes(
+    conn: AsyncConnection, rows: int, users: int,
+) -> dict[str, object]:
+    """
+    Функция для сравнения планов запросов до и после создания индексов.
+
+    :param conn: асинхронное соединение
+    :param rows: количество строк в таблицах твитов, лайков и медиа
+    :param users: количество пользователей
+    :return: отчёт бенчмарка
+    """
+    await create_schema(conn)
+    seed_duration = await seed_tables(conn, rows, users)
+    plans_before = await explain_lookup_queries(conn)
+    await create_indexes(conn)
+    return {
+        "rows": rows,
+        "users": users,
+        "seed_duration_s": round(seed_duration, 2),
+        "before": plans_before,
+        "after": await explain_lookup_queries(conn),
+    }
+
+
+async def run_benchmark(rows: int, users: int) -> dict[str, object]:
+    """
+    Функция для запуска бенчмарка индексов.
+
+    Схема бенчмарка удаляется в той же транзакции.
+    :param rows: количество строк в таблицах твитов, лайков и медиа
+    :param users: количество пользователей
+    :return: отчёт бенчмарка
+    """
+    engine = create_async_engine(DATABASE_URL, poolclass=NullPool)
+    async with engine.begin() as conn:
+        report = await benchmark_indexes(conn, rows, users)
+        await conn.execute(
+            text("DROP SCHEMA {schema} CASCADE".format(schema=SCHEMA)),
+        )
+    await engine.dispose()
+    return report
+
+
+def main() -> None:
+    """Функция для запуска бенчмарка из командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=DEFAULT_ROWS)
+    parser.add_argument("--users", type=int, default=DEFAULT_USERS)
+    args = parser.parse_args()
+    report = asyncio.run(run_benchmark(args.rows, args.users))
+    sys.stdout.write("{report}\n".format(report=json.dumps(report, indent=4)))
+
+
+if __name__ == "__main__":
+    main()
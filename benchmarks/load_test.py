@@ -0,0 +1,655 @@
+"""Load test file. Used to measure latency and throughput of the endpoints.
+
+Drives every endpoint of the tweets, users and medias routers concurrently
+with a weighted mix of requests on behalf of the users created by
+'benchmarks.seed_data' and reports requests per second and p50/p95/p99
+latency of every endpoint as JSON, so reports of revisions can be compared.
+
+Requests are sent through the ASGI transport to the application in this
+process, or to a running server when '--base-url' is given::
+
+    python -m benchmarks.load_test --users 100000 --tweets 1000000
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import subprocess  # noqa: S404
+from collections import Counter, defaultdict
+from contextlib import AsyncExitStack
+from dataclasses import dataclass, field
+from io import BytesIO
+from time import perf_counter
+from types import MappingProxyType
+from typing import Awaitable, Callable, Mapping
+
+from httpx import ASGITransport, AsyncClient, HTTPError, Response
+from PIL import Image
+
+from benchmarks.seed_data import (
+    API_KEY_TEMPLATE,
+    DEFAULT_TWEETS,
+    DEFAULT_USERS,
+)
+
+FEED_PAGE_SIZE = 10
+FEED_PAGES = 10
+BATCH_SIZE = 20
+DEFAULT_REQUESTS = 10000
+DEFAULT_CONCURRENCY = 50
+# Время ожидания ответа в секундах
+DEFAULT_TIMEOUT = 30
+REPORTED_PERCENTILES = (50, 95, 99)
+
+
+@dataclass
+class LoadTestState:
+    """Данные, созданные запросами нагрузочного теста."""
+
+    users: int
+    tweets: int
+    rng: random.Random
+    image: bytes
+    created_tweets: list[tuple[int, int]] = field(default_factory=list)
+    likes: list[tuple[int, int]] = field(default_factory=list)
+    follows: list[tuple[int, int]] = field(default_factory=list)
+
+    def get_user_id(self) -> int:
+        """
+        Метод для выбора случайного пользователя.
+
+        :return: ID пользователя
+        """
+        return self.rng.randint(1, self.users)
+
+    def get_tweet_id(self) -> int:
+        """
+        Метод для выбора случайного твита.
+
+        :return: ID твита
+        """
+        return self.rng.randint(1, self.tweets)
+
+    def pop_like(self) -> tuple[dict[str, str], int]:
+        """
+        Метод для извлечения лайка, поставленного нагрузочным тестом.
+
+        :return: заголовки запроса поставившего лайк пользователя и ID твита
+        """
+        user_id, tweet_id = self.likes.pop()
+        return get_headers(user_id), tweet_id
+
+
+def get_headers(user_id: int) -> dict[str, str]:
+    """
+    Функция для получения заголовков запроса пользователя.
+
+    :param user_id: ID пользователя
+    :return: заголовки
+    """
+    return {"Api-Key": API_KEY_TEMPLATE.format(user_id=user_id)}
+
+
+async def add_tweet(client: AsyncClient, state: LoadTestState) -> Response:
+    """
+    Функция для создания твита.
+
+    :param client: асинхронный клиент
+    :param state: данные нагрузочного теста
+    :return: ответ
+    """
+    user_id = state.get_user_id()
+    response = await client.post(
+        "/api/tweets",
+        json={"tweet_data": "Load test tweet", "tweet_media_ids": []},
+        headers=get_headers(user_id),
+    )
+    if response.is_success:
+        state.created_tweets.append((user_id, response.json()["tweet_id"]))
+    return response
+
+
+async def delete_tweet(client: AsyncClient, state: LoadTestState) -> Response:
+    """
+    Функция для удаления твита, созданного нагрузочным тестом.
+
+    :param client: асинхронный клиент
+    :param state: данные нагрузочного теста
+    :return: ответ
+    """
+    user_id, tweet_id = state.created_tweets.pop()
+    return await client.delete(
+        "/api/tweets/{tweet_id}".format(tweet_id=tweet_id),
+        headers=get_headers(user_id),
+    )
+
+
+async def like_tweet(client: AsyncClient, state: LoadTestState) -> Response:
+    """
+    Функция для добавления лайка твиту.
+
+    :param client: асинхронный клиент
+    :param state: данные нагрузочного теста
+    :return: ответ
+    """
+    user_id = state.get_user_id()
+    tweet_id = state.get_tweet_id()
+    response = await client.post(
+        "/api/tweets/{tweet_id}/likes".format(tweet_id=tweet_id),
+        headers=get_headers(user_id),
+    )
+    if response.is_success:
+        state.likes.append((user_id, tweet_id))
+    return response
+
+
+async def like_tweets(client: AsyncClient, state: LoadTestState) -> Response:
+    """
+    Функция для добавления лайков нескольким твитам.
+
+    :param client: асинхронный клиент
+    :param state: данные нагрузочного теста
+    :return: ответ
+    """
+    user_id = state.get_user_id()
+    response = await client.post(
+        "/api/tweets/likes/batch",
+        json={
+            "tweet_ids": [
+                state.get_tweet_id() for _ in range(BATCH_SIZE)
+            ],
+        },
+        headers=get_headers(user_id),
+    )
+    if response.is_success:
+        state.likes.extend(
+            (user_id, tweet_id) for tweet_id in response.json()["tweet_ids"]
+        )
+    return response
+
+
+async def dislike_tweet(client: AsyncClient, state: LoadTestState) -> Response:
+    """
+    Функция для удаления лайка, поставленного нагрузочным тестом.
+
+    :param client: асинхронный клиент
+    :param state: данные нагрузочного теста
+    :return: ответ
+    """
+    headers, tweet_id = state.pop_like()
+    return await client.delete(
+        "/api/tweets/{tweet_id}/likes".format(tweet_id=tweet_id),
+        headers=headers,
+    )
+
+
+async def dislike_tweets(
+    client: AsyncClient, state: LoadTestState,
+) -> Response:
+    """
+    Функция для удаления лайков нескольких твитов.
+
+    Кроме лайка, поставленного нагрузочным тестом, передаются случайные
+    твиты, которые эндпоинт пропускает, если у них нет лайка.
+    :param client: асинхронный клиент
+    :param state: данные нагрузочного теста
+    :return: ответ
+    """
+    headers, tweet_id = state.pop_like()
+    return await client.post(
+        "/api/tweets/likes/batch/delete",
+        json={
+            "tweet_ids": [
+                tweet_id,
+                *(state.get_tweet_id() for _ in range(BATCH_SIZE - 1)),
+            ],
+        },
+        headers=headers,
+    )
+
+
+async def get_tweets(client: AsyncClient, state: LoadTestState) -> Response:
+    """
+    Функция для получения страницы ленты твитов.
+
+    :param client: асинхронный клиент
+    :param state: данные нагрузочного теста
+    :return: ответ
+    """
+    return await client.get(
+        "/api/tweets",
+        params={
+            "limit": FEED_PAGE_SIZE,
+            "offset": state.rng.randint(1, FEED_PAGES),
+        },
+        headers=get_headers(state.get_user_id()),
+    )
+
+
+async def get_home_timeline(
+    client: AsyncClient, state: LoadTestState,
+) -> Response:
+    """
+    Функция для получения домашней ленты твитов.
+
+    :param client: асинхронный клиент
+    :param state: данные нагрузочного теста
+    :return: ответ
+    """
+    return await client.get(
+        "/api/tweets/timeline",
+        headers=get_headers(state.get_user_id()),
+    )
+
+
+async def add_media(client: AsyncClient, state: LoadTestState) -> Response:
+    """
+    Функция для загрузки изображения.
+
+    :param client: асинхронный клиент
+    :param state: данные нагрузочного теста
+    :return: ответ
+    """
+    return await client.post(
+        "/api/medias",
+        files={"file": ("load_test.jpg", state.image, "image/jpeg")},
+        headers=get_headers(state.get_user_id()),
+    )
+
+
+async def follow_user(client: AsyncClient, state: LoadTestState) -> Response:
+    """
+    Функция для подписки на пользователя.
+
+    :param client: асинхронный клиент
+    :param state: данные нагрузочного теста
+    :return: ответ
+    """
+    user_id = state.get_user_id()
+    followee_id = state.get_user_id()
+    response = await client.post(
+        "/api/users/{followee_id}/follow".format(followee_id=followee_id),
+        headers=get_headers(user_id),
+    )
+    if response.is_success:
+        state.follows.append((user_id, followee_id))
+    return response
+
+
+async def cancel_follow_user(
+    client: AsyncClient, state: LoadTestState,
+) -> Response:
+    """
+    Функция для отмены подписки, созданной нагрузочным тестом.
+
+    :param client: асинхронный клиент
+    :param state: данные нагрузочного теста
+    :return: ответ
+    """
+    user_id, followee_id = state.follows.pop()
+    return await client.delete(
+        "/api/users/{followee_id}/follow".format(followee_id=followee_id),
+        headers=get_headers(user_id),
+    )
+
+
+async def get_profiles(client: AsyncClient, state: LoadTestState) -> Response:
+    """
+    Функция для получения нескольких профилей пользователей по ID.
+
+    :param client: асинхронный клиент
+    :param state: данные нагрузочного теста
+    :return: ответ
+    """
+    return await client.get(
+        "/api/users",
+        params={"ids": [state.get_user_id() for _ in range(BATCH_SIZE)]},
+        headers=get_headers(state.get_user_id()),
+    )
+
+
+async def get_own_profile(
+    client: AsyncClient, state: LoadTestState,
+) -> Response:
+    """
+    Функция для получения своего профиля.
+
+    :param client: асинхронный клиент
+    :param state: данные нагрузочного теста
+    :return: ответ
+    """
+    return await client.get(
+        "/api/users/me", headers=get_headers(state.get_user_id()),
+    )
+
+
+async def get_profile(client: AsyncClient, state: LoadTestState) -> Response:
+    """
+    Функция для получения профиля пользователя по ID.
+
+    :param client: асинхронный клиент
+    :param state: данные нагрузочного теста
+    :return: ответ
+    """
+    return await client.get(
+        "/api/users/{user_id}".format(user_id=state.get_user_id()),
+        headers=get_headers(state.get_user_id()),
+    )
+
+
+async def get_followers(
+    client: AsyncClient, state: LoadTestState,
+) -> Response:
+    """
+    Функция для получения первой страницы подписчиков пользователя.
+
+    :param client: асинхронный клиент
+    :param state: данные нагрузочного теста
+    :return: ответ
+    """
+    return await client.get(
+        "/api/users/{user_id}/followers".format(user_id=state.get_user_id()),
+        headers=get_headers(state.get_user_id()),
+    )
+
+
+Scenario = Callable[[AsyncClient, LoadTestState], Awaitable[Response]]
+WeightedScenarios = Mapping[str, tuple[int, Scenario]]
+
+# Вес сценария в смеси запросов
+SCENARIOS: WeightedScenarios = MappingProxyType({
+    "get_tweets": (40, get_tweets),
+    "get_home_timeline": (15, get_home_timeline),
+    "get_profile": (10, get_profile),
+    "get_own_profile": (5, get_own_profile),
+    "get_profiles": (3, get_profiles),
+    "get_followers": (3, get_followers),
+    "like_tweet": (10, like_tweet),
+    "like_tweets": (2, like_tweets),
+    "dislike_tweet": (5, dislike_tweet),
+    "dislike_tweets": (1, dislike_tweets),
+    "follow_user": (4, follow_user),
+    "cancel_follow_user": (2, cancel_follow_user),
+    "add_tweet": (4, add_tweet),
+    "delete_tweet": (2, delete_tweet),
+    "add_media": (3, add_media),
+})
+# Данные, которые отменяет сценарий, и сценарий, который выполняется вместо
+# него, пока этих данных нет
+CANCEL_SCENARIOS = MappingProxyType({
+    "dislike_tweet": ("likes", "like_tweet"),
+    "dislike_tweets": ("likes", "like_tweets"),
+    "cancel_follow_user": ("follows", "follow_user"),
+    "delete_tweet": ("created_tweets", "add_tweet"),
+})
+
+
+def create_test_image() -> bytes:
+    """
+    Функция для создания изображения для загрузки.
+
+    :return: изображение в формате JPEG
+    """
+    image_buffer = BytesIO()
+    Image.new("RGB", (640, 480), color=(29, 161, 242)).save(
+        image_buffer, format="JPEG",
+    )
+    return image_buffer.getvalue()
+
+
+def get_percentile(sorted_latencies: list[float], percentile: float) -> float:
+    """
+    Функция для получения перцентиля задержек методом ближайшего ранга.
+
+    :param sorted_latencies: отсортированные задержки в секундах
+    :param percentile: перцентиль от 0 до 100
+    :return: задержка в миллисекундах
+    """
+    rank = max(round(percentile / 100 * len(sorted_latencies)) - 1, 0)
+    return round(sorted_latencies[rank] * 1000, 2)
+
+
+def get_revision() -> str | None:
+    """
+    Функция для получения ревизии кода.
+
+    :return: хэш коммита | None, если он недоступен
+    """
+    try:
+        return subprocess.check_output(  # noqa: S603, S607
+            ["git", "rev-parse", "--short", "HEAD"],
+            text=True,
+            stderr=subprocess.DEVNULL,
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build_endpoint_report(
+    latencies: list[float], statuses: Counter[str], duration: float,
+) -> dict[str, object]:
+    """
+    Функция для построения отчёта по эндпоинту.
+
+    :param latencies: задержки запросов в секундах
+    :param statuses: количество ответов по статусам
+    :param duration: длительность теста в секундах
+    :return: отчёт по эндпоинту
+    """
+    sorted_latencies = sorted(latencies)
+    percentiles = {
+        "p{percentile}_ms".format(percentile=percentile): get_percentile(
+            sorted_latencies, percentile,
+        )
+        for percentile in REPORTED_PERCENTILES
+    }
+    return {
+        "requests": len(latencies),
+        "rps": round(len(latencies) / duration, 1),
+        **percentiles,
+        "max_ms": round(sorted_latencies[-1] * 1000, 2),
+        "statuses": dict(statuses),
+    }
+
+
+class LoadTestRunner:
+    """Отправка запросов нагрузочного теста и сбор их задержек."""
+
+    def __init__(
+        self,
+        client: AsyncClient,
+        state: LoadTestState,
+        scenario_names: list[str],
+    ) -> None:
+        """
+        Метод для инициализации отправки запросов.
+
+        :param client: асинхронный клиент
+        :param state: данные нагрузочного теста
+        :param scenario_names: сценарии запросов в порядке отправки
+        """
+        self.client = client
+        self.state = state
+        self.scenario_names = scenario_names
+        self.latencies: defaultdict[str, list[float]] = defaultdict(list)
+        self.statuses: defaultdict[str, Counter[str]] = defaultdict(Counter)
+
+    def choose_scenario(self, scenario_name: str) -> str:
+        """
+        Метод для выбора сценария, который можно выполнить.
+
+        :param scenario_name: имя сценария из смеси запросов
+        :return: имя сценария | имя сценария создания данных, если данных
+            для отмены пока нет
+        """
+        cancel_scenario = CANCEL_SCENARIOS.get(scenario_name)
+        if cancel_scenario is None:
+            return scenario_name
+        state_field, create_scenario = cancel_scenario
+        if getattr(self.state, state_field):
+            return scenario_name
+        return create_scenario
+
+    async def send_request(self, scenario_name: str) -> None:
+        """
+        Метод для отправки запроса сценария и записи его задержки.
+
+        :param scenario_name: имя сценария
+        """
+        _, scenario = SCENARIOS[scenario_name]
+        started_at = perf_counter()
+        try:
+            response = await scenario(self.client, self.state)
+        except HTTPError as exc:
+            self.statuses[scenario_name][type(exc).__name__] += 1
+        else:
+            self.statuses[scenario_name][str(response.status_code)] += 1
+        self.latencies[scenario_name].append(perf_counter() - started_at)
+
+    async def send_requests(self) -> None:
+        """Метод для отправки запросов, пока они не закончатся."""
+        while self.scenario_names:
+            await self.send_request(
+                self.choose_scenario(self.scenario_names.pop()),
+            )
+
+    def build_endpoints_report(self, duration: float) -> dict[str, object]:
+        """
+        Метод для построения отчётов по эндпоинтам.
+
+        :param duration: длительность теста в секундах
+        :return: отчёты по именам сценариев
+        """
+        return {
+            scenario_name: build_endpoint_report(
+                self.latencies[scenario_name],
+                self.statuses[scenario_name],
+                duration,
+            )
+            for scenario_name in sorted(self.latencies)
+        }
+
+
+async def run_load_test(
+    client: AsyncClient,
+    state: LoadTestState,
+    requests: int,
+    concurrency: int,
+) -> dict[str, object]:
+    """
+    Функция для запуска нагрузочного теста.
+
+    :param client: асинхронный клиент
+    :param state: данные нагрузочного теста
+    :param requests: количество запросов
+    :param concurrency: количество одновременных запросов
+    :return: отчёт нагрузочного теста
+    """
+    runner = LoadTestRunner(
+        client,
+        state,
+        state.rng.choices(
+            list(SCENARIOS),
+            weights=[weight for weight, _ in SCENARIOS.values()],
+            k=requests,
+        ),
+    )
+    started_at = perf_counter()
+    await asyncio.gather(*[runner.send_requests() for _ in range(concurrency)])
+    duration = perf_counter() - started_at
+    return {
+        "revision": get_revision(),
+        "requests": requests,
+        "concurrency": concurrency,
+        "duration_s": round(duration, 2),
+        "rps": round(requests / duration, 1),
+        "endpoints": runner.build_endpoints_report(duration),
+    }
+
+
+async def create_client(
+    args: argparse.Namespace, stack: AsyncExitStack,
+) -> AsyncClient:
+    """
+    Функция для создания клиента нагрузочного теста.
+
+    Без '--base-url' клиент отправляет запросы приложению в этом процессе,
+    которое запускается вместе с фоновыми задачами своего lifespan.
+    :param args: аргументы командной строки
+    :param stack: стек, закрывающий клиент и приложение
+    :return: асинхронный клиент
+    """
+    if args.base_url:
+        client = AsyncClient(base_url=args.base_url, timeout=args.timeout)
+    else:
+        from python_advanced_diploma.src.main import app  # noqa: WPS433
+
+        await stack.enter_async_context(app.router.lifespan_context(app))
+        client = AsyncClient(
+            transport=ASGITransport(app=app),
+            base_url="http://benchmark",
+            timeout=args.timeout,
+        )
+    return await stack.enter_async_context(client)
+
+
+async def run_benchmark(args: argparse.Namespace) -> dict[str, object]:
+    """
+    Функция для запуска нагрузочного теста с аргументами командной строки.
+
+    :param args: аргументы командной строки
+    :return: отчёт нагрузочного теста
+    """
+    state = LoadTestState(
+        users=args.users,
+        tweets=args.tweets,
+        rng=random.Random(args.seed),  # noqa: S311
+        image=create_test_image(),
+    )
+    async with AsyncExitStack() as stack:
+        client = await create_client(args, stack)
+        report = await run_load_test(
+            client, state, args.requests, args.concurrency,
+        )
+    report["target"] = args.base_url or "asgi"
+    return report
+
+
+def create_parser() -> argparse.ArgumentParser:
+    """
+    Функция для создания парсера аргументов командной строки.
+
+    :return: парсер аргументов
+    """
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--base-url")
+    parser.add_argument("--users", type=int, default=DEFAULT_USERS)
+    parser.add_argument("--tweets", type=int, default=DEFAULT_TWEETS)
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS)
+    parser.add_argument(
+        "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+    )
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output")
+    return parser
+
+
+def main() -> None:
+    """Функция для запуска нагрузочного теста из командной строки."""
+    args = create_parser().parse_args()
+    report = asyncio.run(run_benchmark(args))
+    report_json = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w") as report_file:
+            report_file.write(report_json)
+    print(report_json)  # noqa: WPS421
+
+
+if __name__ == "__main__":
+    main()
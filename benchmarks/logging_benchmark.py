@@ -0,0 +1,190 @@
+"""Logging benchmark file. Used to compare requests/sec with logging on/off.
+
+Serves a minimal endpoint which logs like the application handlers do and
+measures requests per second through the ASGI transport with logging
+disabled, with a synchronous sink and eagerly formatted messages and with
+an enqueued sink and lazily formatted messages.
+
+Run from the repository root:
+    python -m benchmarks.logging_benchmark --requests 20000
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+from time import perf_counter
+
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from loguru import logger
+
+LOG_FORMAT = "{time} {level} {message}"
+DEFAULT_REQUESTS = 20000
+DEFAULT_CONCURRENCY = 50
+
+
+def create_eager_app() -> FastAPI:
+    """
+    Функция для создания приложения с форматированием сообщений до записи.
+
+    :return: приложение
+    """
+    app = FastAPI()
+
+    @app.get("/api/tweets/{id}")
+    async def get_tweet(id: int) -> dict[str, bool]:
+        """
+        Эндпоинт, логирующий запрос как обработчики приложения.
+
+        :param id: ID твита
+        :return: response
+        """
+        logger.info(
+            "User with api key: {api_key} try to get tweet with ID: ".format(
+                api_key="test",
+            ) + "{id}".format(
+                id=id,
+            ),
+        )
+        logger.info(
+            "User with ID: {user_id} get tweet with ID: {id}".format(
+                user_id=1,
+                id=id,
+            ),
+        )
+        return {"result": True}
+
+    return app
+
+
+def create_lazy_app() -> FastAPI:
+    """
+    Функция для создания приложения с отложенным форматированием сообщений.
+
+    :return: приложение
+    """
+    app = FastAPI()
+
+    @app.get("/api/tweets/{id}")
+    async def get_tweet(id: int) -> dict[str, bool]:
+        """
+        Эндпоинт, логирующий запрос как обработчики приложения.
+
+        :param id: ID твита
+        :return: response
+        """
+        logger.info(
+            "User with api key: {api_key} try to get tweet with ID: {id}",
+            api_key="test",
+            id=id,
+        )
+        logger.info(
+            "User with ID: {user_id} get tweet with ID: {id}",
+            user_id=1,
+            id=id,
+        )
+        return {"result": True}
+
+    return app
+
+
+async def measure_requests_per_second(
+    app: FastAPI, requests: int, concurrency: int,
+) -> float:
+    """
+    Функция для измерения количества обработанных запросов в секунду.
+
+    :param app: приложение
+    :param requests: количество запросов
+    :param concurrency: количество одновременных запросов
+    :return: количество запросов в секунду
+    """
+    transport = ASGITransport(app=app)
+    semaphore = asyncio.Semaphore(concurrency)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+
+        async def send_request(request_number: int) -> None:
+            async with semaphore:
+                await ac.get("/api/tweets/{id}".format(id=request_number + 1))
+
+        started_at = perf_counter()
+        await asyncio.gather(
+            *[send_request(request) for request in range(requests)],
+        )
+        duration = perf_counter() - started_at
+    await logger.complete()
+    return round(requests / duration, 1)
+
+
+async def run_benchmark(requests: int, concurrency: int) -> dict[str, object]:
+    """
+    Функция для запуска бенчмарка логирования.
+
+    :param requests: количество запросов в каждом режиме
+    :param concurrency: количество одновременных запросов
+    :return: отчёт бенчмарка
+    """
+    report: dict[str, object] = {
+        "requests": requests,
+        "concurrency": concurrency,
+    }
+    with tempfile.TemporaryDirectory() as log_dir:
+        logger.remove()
+        report["logging_off_rps"] = await measure_requests_per_second(
+            create_lazy_app(), requests, concurrency,
+        )
+        handler_id = logger.add(
+            os.path.join(log_dir, "sync.log"),
+            level="INFO",
+            format="{time} {level} {message}",
+            backtrace=True,
+            diagnose=True,
+        )
+        report["sync_eager_rps"] = await measure_requests_per_second(
+            create_eager_app(), requests, concurrency,
+        )
+        logger.remove(handler_id)
+        handler_id = logger.add(
+            os.path.join(log_dir, "enqueued.log"),
+            level="INFO",
+            format=LOG_FORMAT,
+            enqueue=True,
+            backtrace=True,
+            diagnose=False,
+        )
+        report["enqueued_lazy_rps"] = await measure_requests_per_second(
+            create_lazy_app(), requests, concurrency,
+        )
+        logger.remove(handler_id)
+        handler_id = logger.add(
+            os.path.join(log_dir, "filtered.log"),
+            level="WARNING",
+            format=LOG_FORMAT,
+            enqueue=True,
+        )
+        report["enqueued_lazy_below_level_rps"] = (
+            await measure_requests_per_second(
+                create_lazy_app(), requests, concurrency,
+            )
+        )
+        logger.remove(handler_id)
+    return report
+
+
+def main() -> None:
+    """Функция для запуска бенчмарка из командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS)
+    parser.add_argument(
+        "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+    )
+    args = parser.parse_args()
+    report = asyncio.run(run_benchmark(args.requests, args.concurrency))
+    sys.stdout.write("{report}\n".format(report=json.dumps(report, indent=4)))
+
+
+if __name__ == "__main__":
+    main()
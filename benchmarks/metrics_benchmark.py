@@ -0,0 +1,118 @@
+"""Metrics benchmark file. Used to measure the overhead of request metrics.
+
+Serves a minimal endpoint with and without the metrics middleware and
+measures requests per second through the ASGI transport, then measures how
+many histogram observations and metrics renders are done per second.
+
+Run from the repository root:
+    python -m benchmarks.metrics_benchmark --requests 20000
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from timeit import timeit
+
+from fastapi import FastAPI
+from loguru import logger
+
+from benchmarks.logging_benchmark import (
+    DEFAULT_CONCURRENCY,
+    DEFAULT_REQUESTS,
+    measure_requests_per_second,
+)
+from python_advanced_diploma.src.metrics import (
+    Histogram,
+    MetricsMiddleware,
+    MetricsRegistry,
+)
+
+OBSERVED_DURATION = 0.042
+OBSERVED_LABEL_VALUES = ("GET", "/api/tweets/{id}", "200")
+
+
+def create_app(with_metrics: bool) -> FastAPI:
+    """
+    Функция для создания приложения.
+
+    :param with_metrics: записывать метрики запросов
+    :return: приложение
+    """
+    app = FastAPI()
+
+    @app.get("/api/tweets/{id}")
+    async def get_tweet(id: int) -> dict[str, bool]:
+        """
+        Эндпоинт, возвращающий результат без обращения к БД.
+
+        :param id: ID твита
+        :return: response
+        """
+        return {"result": True}
+
+    if with_metrics:
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+
+def measure_histogram(number: int) -> dict[str, float]:
+    """
+    Функция для измерения скорости записи и вывода гистограммы.
+
+    :param number: количество записей
+    :return: количество записей и выводов в секунду
+    """
+    metrics_registry = MetricsRegistry()
+    histogram = metrics_registry.register(
+        Histogram("duration", "Duration.", ("method", "route", "status")),
+    )
+    observe_duration = timeit(
+        lambda: histogram.observe(OBSERVED_DURATION, OBSERVED_LABEL_VALUES),
+        number=number,
+    )
+    render_number = max(number // 1000, 1)
+    render_duration = timeit(metrics_registry.render, number=render_number)
+    return {
+        "observe_per_s": round(number / observe_duration, 1),
+        "render_per_s": round(render_number / render_duration, 1),
+    }
+
+
+async def run_benchmark(requests: int, concurrency: int) -> dict[str, object]:
+    """
+    Функция для запуска бенчмарка метрик.
+
+    :param requests: количество запросов в каждом режиме
+    :param concurrency: количество одновременных запросов
+    :return: отчёт бенчмарка
+    """
+    logger.remove()
+    report: dict[str, object] = {
+        "requests": requests,
+        "concurrency": concurrency,
+    }
+    report["metrics_off_rps"] = await measure_requests_per_second(
+        create_app(with_metrics=False), requests, concurrency,
+    )
+    report["metrics_on_rps"] = await measure_requests_per_second(
+        create_app(with_metrics=True), requests, concurrency,
+    )
+    report.update(measure_histogram(requests * 10))
+    return report
+
+
+def main() -> None:
+    """Функция для запуска бенчмарка из командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS)
+    parser.add_argument(
+        "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+    )
+    args = parser.parse_args()
+    report = asyncio.run(run_benchmark(args.requests, args.concurrency))
+    sys.stdout.write("{report}\n".format(report=json.dumps(report, indent=4)))
+
+
+if __name__ == "__main__":
+    main()
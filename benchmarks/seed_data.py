@@ -0,0 +1,513 @@
+"""Seed data file. Used to bulk-seed the database for load tests.
+
+Generates users, tweets, likes and follows with power-law distributions
+and loads them with COPY into the configured database, which must already
+be migrated. Tweet authors and followed users are picked by a power law of
+their ID, so low IDs are popular, and the numbers of likes per tweet and of
+followed users per user have heavy tails. The generator is seeded, so the
+same arguments produce the same data.
+
+Every user gets the api key 'benchmark_<ID>', which the load test uses.
+
+Run from the repository root:
+    python -m benchmarks.seed_data --users 100000 --tweets 10000000
+"""
+
+import argparse
+import asyncio
+import json
+import random
+from dataclasses import dataclass
+from itertools import accumulate
+from time import perf_counter
+from typing import Any, Iterable, Iterator
+
+from sqlalchemy import Select, Table, func, select, text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from python_advanced_diploma.src.database import engine
+from python_advanced_diploma.src.tweets.tweets_models import Tweet
+from python_advanced_diploma.src.users.users_models import User
+
+API_KEY_TEMPLATE = "benchmark_{user_id}"
+SEEDED_TABLES = (
+    '"user"', "tweet", '"like"', "follow", "tweet_media", "timeline_entry",
+)
+USER_COLUMNS = ("id", "name", "user_api_key")
+FOLLOW_COLUMNS = ("following_user_id", "followed_user_id")
+TWEET_COLUMNS = ("id", "content", "author_id", "like_count", "is_fanned_out")
+LIKE_COLUMNS = ("user_id", "tweet_id")
+DEFAULT_USERS = 100000
+DEFAULT_TWEETS = 1000000
+DEFAULT_LIKES_PER_TWEET = 5
+DEFAULT_FOLLOWS_PER_USER = 20
+CHUNK_SIZE = 50000
+DISABLE_STATEMENT_TIMEOUT = "SET LOCAL statement_timeout = 0"
+# Время ожидания COPY в секундах вместо DB_COMMAND_TIMEOUT приложения
+COPY_TIMEOUT = 3600
+# Счётчики подписок поддерживаются приложением, а COPY их не заполняет
+UPDATE_FOLLOWS_COUNTS = """
+UPDATE "user"
+SET followers_count = follows_counts.followers_count,
+    following_count = follows_counts.following_count
+FROM (
+    SELECT user_id,
+        count(*) FILTER (WHERE is_follower) AS followers_count,
+        count(*) FILTER (WHERE NOT is_follower) AS following_count
+    FROM (
+        SELECT following_user_id AS user_id, true AS is_follower
+        FROM follow
+        UNION ALL
+        SELECT followed_user_id, false
+        FROM follow
+    ) AS follows
+    GROUP BY user_id
+) AS follows_counts
+WHERE "user".id = follows_counts.user_id
+"""
+POPULARITY_EXPONENT = 1.1
+TAIL_EXPONENT = 2
+
+TweetRecord = tuple[int, str, int, int, bool]
+LikeRecord = tuple[int, int]
+TweetsChunk = tuple[list[TweetRecord], list[LikeRecord]]
+
+
+class PowerLawSampler:
+    """
+    Выбор ID с вероятностью, убывающей по степенному закону.
+
+    Вероятность выбора ID пропорциональна ID в степени -exponent.
+    """
+
+    def __init__(self, size: int, exponent: float, rng: random.Random) -> None:
+        """
+        Метод для инициализации выбора.
+
+        :param size: количество ID, начиная с 1
+        :param exponent: показатель степени
+        :param rng: генератор случайных чисел
+        """
+        self.population = range(1, size + 1)
+        self.cum_weights = list(
+            accumulate(rank ** -exponent for rank in self.population),
+        )
+        self.rng = rng
+
+    def sample(self, count: int) -> list[int]:
+        """
+        Метод для выбора ID с повторениями.
+
+        :param count: количество ID
+        :return: ID
+        """
+        return self.rng.choices(
+            self.population, cum_weights=self.cum_weights, k=count,
+        )
+
+
+def get_heavy_tailed_count(
+    rng: random.Random, mean: float, max_count: int,
+) -> int:
+    """
+    Функция для получения количества с распределением Парето.
+
+    При показателе TAIL_EXPONENT = 2 среднее значение 'pareto_value - 1'
+    равно 1, поэтому среднее количество равно mean.
+
+    :param rng: генератор случайных чисел
+    :param mean: среднее количество
+    :param max_count: максимальное количество
+    :return: количество
+    """
+    pareto_value = rng.paretovariate(TAIL_EXPONENT)
+    return min(round(mean * (pareto_value - 1)), max_count)
+
+
+def generate_users(users: int) -> Iterator[tuple[int, str, str]]:
+    """
+    Функция для генерации пользователей.
+
+    :param users: количество пользователей
+    :yield: ID, имя и api key пользователя
+    """
+    yield from (
+        (
+            user_id,
+            "user_{user_id}".format(user_id=user_id),
+            API_KEY_TEMPLATE.format(user_id=user_id),
+        )
+        for user_id in range(1, users + 1)
+    )
+
+
+def sample_followees(
+    followee_sampler: PowerLawSampler, follower_id: int, follows_count: int,
+) -> set[int]:
+    """
+    Функция для выбора отслеживаемых пользователей подписчика.
+
+    :param followee_sampler: выбор отслеживаемых пользователей
+    :param follower_id: ID подписчика
+    :param follows_count: количество подписок
+    :return: ID отслеживаемых пользователей
+    """
+    followee_ids: set[int] = set()
+    while len(followee_ids) < follows_count:
+        followee_ids.update(
+            followee_sampler.sample(follows_count - len(followee_ids)),
+        )
+        followee_ids.discard(follower_id)
+    return followee_ids
+
+
+def generate_follows(
+    users: int, follows_per_user: float, rng: random.Random,
+) -> Iterator[tuple[int, int]]:
+    """
+    Функция для генерации подписок.
+
+    :param users: количество пользователей
+    :param follows_per_user: среднее количество подписок пользователя
+    :param rng: генератор случайных чисел
+    :yield: ID отслеживаемого пользователя и ID подписчика
+    """
+    followee_sampler = PowerLawSampler(users, POPULARITY_EXPONENT, rng)
+    max_follows = (users - 1) // 10
+    for follower_id in range(1, users + 1):
+        follows_count = get_heavy_tailed_count(
+            rng, follows_per_user, max_follows,
+        )
+        yield from (
+            (followee_id, follower_id)
+            for followee_id in sample_followees(
+                followee_sampler, follower_id, follows_count,
+            )
+        )
+
+
+def get_tweet_record(
+    tweet_id: int, author_id: int, like_count: int,
+) -> TweetRecord:
+    """
+    Функция для получения записи твита.
+
+    :param tweet_id: ID твита
+    :param author_id: ID автора твита
+    :param like_count: количество лайков твита
+    :return: ID, текст, ID автора, количество лайков и признак рассылки
+    """
+    return (
+        tweet_id,
+        "Tweet {tweet_id} by user {author_id}".format(
+            tweet_id=tweet_id, author_id=author_id,
+        ),
+        author_id,
+        like_count,
+        False,
+    )
+
+
+class TweetsGenerator:
+    """Генерация твитов и их лайков пачками."""
+
+    def __init__(
+        self, users: int, likes_per_tweet: float, rng: random.Random,
+    ) -> None:
+        """
+        Метод для инициализации генерации.
+
+        :param users: количество пользователей
+        :param likes_per_tweet: среднее количество лайков твита
+        :param rng: генератор случайных чисел
+        """
+        self.users = users
+        self.likes_per_tweet = likes_per_tweet
+        self.author_sampler = PowerLawSampler(users, POPULARITY_EXPONENT, rng)
+        self.rng = rng
+
+    def add_likes(self, likes_chunk: list[LikeRecord], tweet_id: int) -> int:
+        """
+        Метод для генерации лайков твита в пачку лайков.
+
+        :param likes_chunk: пачка лайков
+        :param tweet_id: ID твита
+        :return: количество лайков твита
+        """
+        like_count = get_heavy_tailed_count(
+            self.rng, self.likes_per_tweet, self.users,
+        )
+        user_ids = self.rng.sample(range(1, self.users + 1), like_count)
+        likes_chunk.extend((user_id, tweet_id) for user_id in user_ids)
+        return like_count
+
+    def generate_chunk(
+        self, first_tweet_id: int, chunk_size: int,
+    ) -> TweetsChunk:
+        """
+        Метод для генерации пачки твитов и их лайков.
+
+        :param first_tweet_id: ID первого твита пачки
+        :param chunk_size: количество твитов в пачке
+        :return: твиты и лайки
+        """
+        tweets_chunk: list[TweetRecord] = []
+        likes_chunk: list[LikeRecord] = []
+        author_ids = self.author_sampler.sample(chunk_size)
+        for tweet_id, author_id in enumerate(author_ids, start=first_tweet_id):
+            tweets_chunk.append(
+                get_tweet_record(
+                    tweet_id, author_id, self.add_likes(likes_chunk, tweet_id),
+                ),
+            )
+        return tweets_chunk, likes_chunk
+
+    def generate_chunks(
+        self, tweets: int,
+    ) -> Iterator[TweetsChunk]:
+        """
+        Метод для генерации твитов и их лайков пачками по CHUNK_SIZE.
+
+        :param tweets: количество твитов
+        :yield: твиты и лайки пачки
+        """
+        yield from (
+            self.generate_chunk(
+                first_tweet_id, min(CHUNK_SIZE, tweets - first_tweet_id + 1),
+            )
+            for first_tweet_id in range(1, tweets + 1, CHUNK_SIZE)
+        )
+
+
+async def get_driver_connection(conn: AsyncConnection) -> Any:
+    """
+    Функция для получения соединения драйвера asyncpg.
+
+    :param conn: асинхронное соединение
+    :return: соединение asyncpg
+    :raises ConnectionError: если соединение драйвера недоступно
+    """
+    raw_connection = await conn.get_raw_connection()
+    asyncpg_connection = raw_connection.driver_connection
+    if asyncpg_connection is None:
+        raise ConnectionError("Driver connection is not available")
+    return asyncpg_connection
+
+
+async def copy_records(
+    asyncpg_connection: Any,
+    table_name: str,
+    records: Iterable[tuple[Any, ...]],
+    columns: tuple[str, ...],
+) -> None:
+    """
+    Функция для загрузки записей в таблицу командой COPY.
+
+    :param asyncpg_connection: соединение asyncpg
+    :param table_name: имя таблицы
+    :param records: записи
+    :param columns: имена столбцов
+    """
+    await asyncpg_connection.copy_records_to_table(
+        table_name, records=records, columns=columns, timeout=COPY_TIMEOUT,
+    )
+
+
+def get_reset_sequence_statement(table: Table) -> Select[tuple[int]]:
+    """
+    Функция для получения запроса, продолжающего последовательность ID.
+
+    COPY не использует последовательность, поэтому она продолжается с
+    наибольшего загруженного ID.
+    :param table: таблица
+    :return: запрос
+    """
+    return select(
+        func.setval(
+            func.pg_get_serial_sequence(
+                '"{table_name}"'.format(table_name=table.name), "id",
+            ),
+            select(func.coalesce(func.max(table.c.id), 1)).scalar_subquery(),
+        ),
+    )
+
+
+async def prepare_tables(conn: AsyncConnection, truncate: bool) -> None:
+    """
+    Функция для подготовки таблиц к заполнению.
+
+    :param conn: асинхронное соединение
+    :param truncate: удалить существующие данные
+    :raises RuntimeError: если таблицы не пусты и удаление не разрешено
+    """
+    await conn.execute(text(DISABLE_STATEMENT_TIMEOUT))
+    if truncate:
+        await conn.execute(
+            text(
+                "TRUNCATE {tables} RESTART IDENTITY CASCADE".format(
+                    tables=", ".join(SEEDED_TABLES),
+                ),
+            ),
+        )
+        return
+    users_exist = await conn.scalar(text('SELECT EXISTS (SELECT FROM "user")'))
+    if users_exist:
+        raise RuntimeError(
+            "Database is not empty, run with --truncate to replace its data",
+        )
+
+
+async def analyze_tables() -> None:
+    """Функция для обновления статистики таблиц после заполнения."""
+    async with engine.begin() as conn:
+        await conn.execute(text(DISABLE_STATEMENT_TIMEOUT))
+        await conn.execute(text("ANALYZE"))
+
+
+@dataclass
+class SeedOptions:
+    """Параметры заполнения БД."""
+
+    users: int = DEFAULT_USERS
+    tweets: int = DEFAULT_TWEETS
+    likes_per_tweet: float = DEFAULT_LIKES_PER_TWEET
+    follows_per_user: float = DEFAULT_FOLLOWS_PER_USER
+    seed: int = 0
+    truncate: bool = False
+
+
+class DatabaseSeeder:
+    """Заполнение БД сгенерированными данными."""
+
+    def __init__(self, options: SeedOptions) -> None:
+        """
+        Метод для инициализации заполнения.
+
+        :param options: параметры заполнения
+        """
+        self.options = options
+        self.rng = random.Random(options.seed)  # noqa: S311
+
+    async def seed_users(
+        self, conn: AsyncConnection, asyncpg_connection: Any,
+    ) -> int:
+        """
+        Метод для загрузки пользователей и подписок.
+
+        :param conn: асинхронное соединение
+        :param asyncpg_connection: соединение asyncpg того же соединения
+        :return: количество подписок
+        """
+        await copy_records(
+            asyncpg_connection,
+            "user",
+            records=generate_users(self.options.users),
+            columns=USER_COLUMNS,
+        )
+        await copy_records(
+            asyncpg_connection,
+            "follow",
+            records=generate_follows(
+                self.options.users, self.options.follows_per_user, self.rng,
+            ),
+            columns=FOLLOW_COLUMNS,
+        )
+        await conn.execute(text(UPDATE_FOLLOWS_COUNTS))
+        return await conn.scalar(text("SELECT count(*) FROM follow"))
+
+    async def seed_tweets(self, asyncpg_connection: Any) -> int:
+        """
+        Метод для загрузки твитов и лайков пачками.
+
+        :param asyncpg_connection: соединение asyncpg
+        :return: количество лайков
+        """
+        tweets_generator = TweetsGenerator(
+            self.options.users, self.options.likes_per_tweet, self.rng,
+        )
+        chunks = tweets_generator.generate_chunks(self.options.tweets)
+        likes = 0
+        for tweets_chunk, likes_chunk in chunks:
+            await copy_records(
+                asyncpg_connection,
+                "tweet",
+                records=tweets_chunk,
+                columns=TWEET_COLUMNS,
+            )
+            await copy_records(
+                asyncpg_connection,
+                "like",
+                records=likes_chunk,
+                columns=LIKE_COLUMNS,
+            )
+            likes += len(likes_chunk)
+        return likes
+
+    async def seed_tables(self) -> tuple[int, int]:
+        """
+        Метод для заполнения таблиц в одной транзакции.
+
+        :return: количество подписок и количество лайков
+        """
+        async with engine.begin() as conn:
+            await prepare_tables(conn, self.options.truncate)
+            asyncpg_connection = await get_driver_connection(conn)
+            follows = await self.seed_users(conn, asyncpg_connection)
+            likes = await self.seed_tweets(asyncpg_connection)
+            for table in (User.__table__, Tweet.__table__):
+                await conn.execute(get_reset_sequence_statement(table))
+        return follows, likes
+
+    async def seed(self) -> dict[str, float]:
+        """
+        Метод для заполнения БД.
+
+        :return: отчёт о заполнении
+        """
+        started_at = perf_counter()
+        follows, likes = await self.seed_tables()
+        await analyze_tables()
+        duration = perf_counter() - started_at
+        rows = self.options.users + self.options.tweets + likes + follows
+        return {
+            "users": self.options.users,
+            "tweets": self.options.tweets,
+            "likes": likes,
+            "follows": follows,
+            "seed": self.options.seed,
+            "duration_s": round(duration, 2),
+            "rows_per_s": round(rows / duration, 1),
+        }
+
+
+def main() -> None:
+    """Функция для запуска заполнения БД из командной строки."""
+    parser = argparse.ArgumentParser(
+        description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("--users", type=int, default=DEFAULT_USERS)
+    parser.add_argument("--tweets", type=int, default=DEFAULT_TWEETS)
+    parser.add_argument(
+        "--likes-per-tweet", type=float, default=DEFAULT_LIKES_PER_TWEET,
+    )
+    parser.add_argument(
+        "--follows-per-user", type=float, default=DEFAULT_FOLLOWS_PER_USER,
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--truncate", action="store_true")
+    args = parser.parse_args()
+    options = SeedOptions(
+        users=args.users,
+        tweets=args.tweets,
+        likes_per_tweet=args.likes_per_tweet,
+        follows_per_user=args.follows_per_user,
+        seed=args.seed,
+        truncate=args.truncate,
+    )
+    report = asyncio.run(DatabaseSeeder(options).seed())
+    print(json.dumps(report, indent=4))  # noqa: WPS421
+
+
+if __name__ == "__main__":
+    main()
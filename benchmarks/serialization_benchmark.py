@@ -0,0 +1,132 @@
+"""Serialization benchmark file. Used to compare feed page serialization.
+
+Builds a page of tweets from attribute objects shaped like the ORM models
+and measures how many times per second it is serialized:
+
+- 'fastapi_json' validates and dumps it like FastAPI does for a
+  'response_model' and encodes it with the stdlib 'json' module;
+- 'fastapi_orjson' does the same with the 'ORJSONResponse' class;
+- 'model_dump_json' validates it once and dumps it with pydantic.
+
+Run from the repository root::
+
+    python -m benchmarks.serialization_benchmark --tweets 100
+"""
+
+import argparse
+import json
+import sys
+from timeit import timeit
+from types import SimpleNamespace
+from typing import Callable
+
+from fastapi.responses import ORJSONResponse
+from pydantic import TypeAdapter
+from starlette.responses import JSONResponse
+
+from python_advanced_diploma.src.tweets.tweets_schemas import TweetsOut
+
+DEFAULT_TWEETS = 100
+DEFAULT_NUMBER = 500
+
+
+def create_tweets_page(tweets_count: int) -> dict[str, object]:
+    """
+    Функция для создания страницы ленты твитов.
+
+    :param tweets_count: количество твитов на странице
+    :return: данные ответа эндпоинта ленты твитов
+    """
+    tweets = []
+    for tweet_id in range(1, tweets_count + 1):
+        tweet_medias = [
+            SimpleNamespace(
+                image="../../images/ab/cd/{id}_{number}.jpeg".format(
+                    id=tweet_id, number=number,
+                ),
+                thumbnail="../../images/ab/cd/{id}_thumbnail.jpg".format(
+                    id=tweet_id,
+                ),
+                medium="../../images/ab/cd/{id}_medium.jpg".format(
+                    id=tweet_id,
+                ),
+                webp="../../images/ab/cd/{id}.webp".format(id=tweet_id),
+            )
+            for number in range(2)
+        ]
+        tweets.append(
+            SimpleNamespace(
+                id=tweet_id,
+                content="Tweet number {id} с текстом".format(id=tweet_id),
+                tweet_medias=tweet_medias,
+                author=SimpleNamespace(id=tweet_id % 10 + 1, name="author"),
+                put_like_users=[
+                    SimpleNamespace(id=user_id, name="user")
+                    for user_id in range(1, 6)
+                ],
+            ),
+        )
+    return {"result": True, "tweets": tweets, "next_cursor": "MTA6MTA"}
+
+
+def get_serializers(
+    tweets_page: dict[str, object],
+) -> dict[str, Callable[[], object]]:
+    """
+    Функция для получения сравниваемых способов сериализации страницы.
+
+    :param tweets_page: данные ответа эндпоинта ленты твитов
+    :return: функции сериализации страницы по названиям
+    """
+    adapter: TypeAdapter[TweetsOut] = TypeAdapter(TweetsOut)
+
+    def serialize_like_fastapi() -> dict[str, object]:
+        tweets_out = adapter.validate_python(
+            tweets_page, from_attributes=True,
+        )
+        return adapter.dump_python(tweets_out, mode="json", by_alias=True)
+
+    return {
+        "fastapi_json": lambda: JSONResponse(serialize_like_fastapi()),
+        "fastapi_orjson": lambda: ORJSONResponse(serialize_like_fastapi()),
+        "model_dump_json": lambda: TweetsOut.model_validate(
+            tweets_page, from_attributes=True,
+        ).model_dump_json(by_alias=True),
+    }
+
+
+def measure_serializers(
+    serializers: dict[str, Callable[[], object]], number: int,
+) -> dict[str, float]:
+    """
+    Функция для измерения количества сериализаций страницы в секунду.
+
+    :param serializers: функции сериализации страницы по названиям
+    :param number: количество сериализаций каждой функцией
+    :return: количество сериализаций в секунду по названиям
+    """
+    return {
+        "{name}_per_s".format(name=serializer_name): round(
+            number / timeit(serializer, number=number), 1,
+        )
+        for serializer_name, serializer in serializers.items()
+    }
+
+
+def main() -> None:
+    """Функция для запуска бенчмарка из командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tweets", type=int, default=DEFAULT_TWEETS)
+    parser.add_argument("--number", type=int, default=DEFAULT_NUMBER)
+    args = parser.parse_args()
+    report = {
+        "tweets": args.tweets,
+        **measure_serializers(
+            get_serializers(create_tweets_page(args.tweets)), args.number,
+        ),
+    }
+    sys.stdout.write("{report}\n".format(report=json.dumps(report, indent=4)))
+
+
+if __name__ == "__main__":
+    main()
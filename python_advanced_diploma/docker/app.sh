@@ -4,4 +4,8 @@ alembic upgrade head
 
 cd ../
 
-gunicorn python_advanced_diploma.src.main:app --workers 4 --worker-class uvicorn.workers.UvicornWorker --bind=0.0.0.0:8000
\ No newline at end of file
+if [ -n "$METRICS_DIR" ]; then
+    rm -f "$METRICS_DIR"/*.json
+fi
+
+gunicorn python_advanced_diploma.src.main:app --workers 4 --worker-class uvicorn.workers.UvicornWorker --bind=0.0.0.0:8000 --bind=0.0.0.0:9000
\ No newline at end of file
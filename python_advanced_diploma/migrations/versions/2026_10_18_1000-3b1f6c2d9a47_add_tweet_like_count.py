@@ -0,0 +1,51 @@
+"""Add tweet like count
+
+Revision ID: 3b1f6c2d9a47
+Revises: 07f88312f75a
+Create Date: 2026-10-18 10:00:12.418305
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3b1f6c2d9a47"
+down_revision: Union[str, None] = "07f88312f75a"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "tweet",
+        sa.Column(
+            "like_count", sa.Integer(), server_default="0", nullable=False
+        ),
+    )
+    op.execute(
+        """
+        UPDATE tweet
+        SET like_count = like_counts.like_count
+        FROM (
+            SELECT tweet_id, count(*) AS like_count
+            FROM "like"
+            GROUP BY tweet_id
+        ) AS like_counts
+        WHERE tweet.id = like_counts.tweet_id
+        """
+    )
+    op.create_index(
+        "ix_tweet_like_count_id",
+        "tweet",
+        [sa.text("like_count DESC"), "id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tweet_like_count_id", table_name="tweet")
+    op.drop_column("tweet", "like_count")
@@ -0,0 +1,51 @@
+"""Add foreign key indexes
+
+Revision ID: 9c4e2a7f1d08
+Revises: 3b1f6c2d9a47
+Create Date: 2026-10-18 11:00:37.902114
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "9c4e2a7f1d08"
+down_revision: Union[str, None] = "3b1f6c2d9a47"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Indexes are built CONCURRENTLY outside of the migration transaction,
+# so that writes to the live tables are not blocked while they are built.
+INDEXES = (
+    ("ix_like_tweet_id", "like", "tweet_id"),
+    ("ix_tweet_author_id", "tweet", "author_id"),
+    ("ix_follow_followed_user_id", "follow", "followed_user_id"),
+    ("ix_tweet_media_tweet_id", "tweet_media", "tweet_id"),
+)
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        for index_name, table_name, column_name in INDEXES:
+            op.create_index(
+                index_name,
+                table_name,
+                [column_name],
+                unique=False,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for index_name, table_name, _ in reversed(INDEXES):
+            op.drop_index(
+                index_name,
+                table_name=table_name,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
@@ -0,0 +1,61 @@
+"""Add home timeline
+
+Revision ID: 5e8d3b0c6f21
+Revises: 9c4e2a7f1d08
+Create Date: 2026-10-18 12:00:05.118824
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5e8d3b0c6f21"
+down_revision: Union[str, None] = "9c4e2a7f1d08"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "timeline_entry",
+        sa.Column("user_id", sa.Integer(), nullable=False),
+        sa.Column("tweet_id", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ["tweet_id"], ["tweet.id"], ondelete="CASCADE"
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["user.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("user_id", "tweet_id"),
+    )
+    op.create_index(
+        "ix_timeline_entry_tweet_id",
+        "timeline_entry",
+        ["tweet_id"],
+        unique=False,
+    )
+    op.add_column(
+        "tweet",
+        sa.Column(
+            "is_fanned_out",
+            sa.Boolean(),
+            server_default=sa.false(),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_tweet_author_id_id_not_fanned_out",
+        "tweet",
+        ["author_id", "id"],
+        unique=False,
+        postgresql_where=sa.text("is_fanned_out IS false"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_tweet_author_id_id_not_fanned_out", table_name="tweet")
+    op.drop_column("tweet", "is_fanned_out")
+    op.drop_index("ix_timeline_entry_tweet_id", table_name="timeline_entry")
+    op.drop_table("timeline_entry")
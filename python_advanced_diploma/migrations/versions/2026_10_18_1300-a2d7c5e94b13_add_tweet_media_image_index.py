@@ -0,0 +1,40 @@
+"""Add tweet media image index
+
+Revision ID: a2d7c5e94b13
+Revises: 5e8d3b0c6f21
+Create Date: 2026-10-18 13:00:48.551907
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a2d7c5e94b13"
+down_revision: Union[str, None] = "5e8d3b0c6f21"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_tweet_media_image",
+            "tweet_media",
+            ["image"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_tweet_media_image",
+            table_name="tweet_media",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
@@ -0,0 +1,35 @@
+"""Add tweet media renditions
+
+Revision ID: d81f4b6a2c95
+Revises: a2d7c5e94b13
+Create Date: 2026-10-18 14:00:21.734662
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d81f4b6a2c95"
+down_revision: Union[str, None] = "a2d7c5e94b13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "tweet_media", sa.Column("thumbnail", sa.String(), nullable=True)
+    )
+    op.add_column(
+        "tweet_media", sa.Column("medium", sa.String(), nullable=True)
+    )
+    op.add_column("tweet_media", sa.Column("webp", sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("tweet_media", "webp")
+    op.drop_column("tweet_media", "medium")
+    op.drop_column("tweet_media", "thumbnail")
@@ -0,0 +1,45 @@
+"""Add tweet media created at
+
+Revision ID: 6f0b9e3d7a52
+Revises: d81f4b6a2c95
+Create Date: 2026-10-18 15:00:09.287140
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "6f0b9e3d7a52"
+down_revision: Union[str, None] = "d81f4b6a2c95"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "tweet_media",
+        sa.Column(
+            "created_at",
+            sa.DateTime(timezone=True),
+            server_default=sa.text("now()"),
+            nullable=False,
+        ),
+    )
+    op.create_index(
+        "ix_tweet_media_created_at_orphaned",
+        "tweet_media",
+        ["created_at"],
+        unique=False,
+        postgresql_where=sa.text("tweet_id IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_tweet_media_created_at_orphaned", table_name="tweet_media"
+    )
+    op.drop_column("tweet_media", "created_at")
@@ -0,0 +1,98 @@
+"""Add user follows counts
+
+Revision ID: 4c9a1e7b3f86
+Revises: 6f0b9e3d7a52
+Create Date: 2026-10-18 16:00:21.640193
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "4c9a1e7b3f86"
+down_revision: Union[str, None] = "6f0b9e3d7a52"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "user",
+        sa.Column(
+            "followers_count",
+            sa.Integer(),
+            server_default="0",
+            nullable=False,
+        ),
+    )
+    op.add_column(
+        "user",
+        sa.Column(
+            "following_count",
+            sa.Integer(),
+            server_default="0",
+            nullable=False,
+        ),
+    )
+    op.execute(
+        """
+        UPDATE "user"
+        SET followers_count = follows_counts.followers_count,
+            following_count = follows_counts.following_count
+        FROM (
+            SELECT user_id,
+                count(*) FILTER (WHERE is_follower) AS followers_count,
+                count(*) FILTER (WHERE NOT is_follower) AS following_count
+            FROM (
+                SELECT following_user_id AS user_id, true AS is_follower
+                FROM follow
+                UNION ALL
+                SELECT followed_user_id, false
+                FROM follow
+            ) AS follows
+            GROUP BY user_id
+        ) AS follows_counts
+        WHERE "user".id = follows_counts.user_id
+        """
+    )
+    # The composite index serves keyset pages of followed users, and
+    # replaces the single column index, which is its prefix.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_follow_followed_user_id_following_user_id",
+            "follow",
+            ["followed_user_id", "following_user_id"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "ix_follow_followed_user_id",
+            table_name="follow",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_follow_followed_user_id",
+            "follow",
+            ["followed_user_id"],
+            unique=False,
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "ix_follow_followed_user_id_following_user_id",
+            table_name="follow",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column("user", "following_count")
+    op.drop_column("user", "followers_count")
@@ -0,0 +1,162 @@
+"""Project cache file. Used to define in-process caches."""
+
+import asyncio
+from collections import OrderedDict
+from time import monotonic
+from typing import Awaitable, Callable, Generic, Hashable, TypeVar
+
+CacheValue = TypeVar("CacheValue")
+
+
+class TTLCache(Generic[CacheValue]):
+    """
+    Ограниченный по размеру кэш с временем жизни записей.
+
+    При переполнении вытесняет давно не использовавшиеся записи (LRU).
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        """
+        Метод для инициализации кэша.
+
+        :param maxsize: максимальное количество записей
+        :param ttl: время жизни записи в секундах
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: OrderedDict[
+            Hashable, tuple[float, CacheValue],
+        ] = OrderedDict()
+
+    def __len__(self) -> int:
+        """
+        Метод для получения количества записей в кэше.
+
+        :return: количество записей
+        """
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> CacheValue | None:
+        """
+        Метод для получения значения из кэша.
+
+        :param key: ключ
+        :return: значение | None, если записи нет или она устарела
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, cache_value = entry
+        if expires_at <= monotonic():
+            self._entries.pop(key, None)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return cache_value
+
+    def set(self, key: Hashable, cache_value: CacheValue) -> None:
+        """
+        Метод для сохранения значения в кэш.
+
+        :param key: ключ
+        :param cache_value: значение
+        """
+        if self.maxsize <= 0:
+            return
+        self._entries[key] = (monotonic() + self.ttl, cache_value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Метод для удаления записи из кэша.
+
+        :param key: ключ
+        """
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Метод для очистки кэша."""
+        self._entries.clear()
+
+    def stats(self) -> dict[str, int]:
+        """
+        Метод для получения статистики использования кэша.
+
+        :return: статистика кэша
+        """
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+class SingleFlight(Generic[CacheValue]):
+    """
+    Объединение одновременных одинаковых вызовов.
+
+    Первый вызов по ключу запускает задачу, остальные вызовы по тому же
+    ключу до её завершения ожидают ту же задачу и получают её результат
+    или исключение. Задача защищена от отмены ожидающих её вызовов.
+    """
+
+    def __init__(self) -> None:
+        """Метод для инициализации объединения вызовов."""
+        self.executions = 0
+        self.coalesced = 0
+        self._in_flight: dict[Hashable, asyncio.Future[CacheValue]] = {}
+
+    async def do(
+        self, key: Hashable, call: Callable[[], Awaitable[CacheValue]],
+    ) -> CacheValue:
+        """
+        Метод для выполнения вызова или ожидания уже выполняемого.
+
+        :param key: ключ вызова
+        :param call: функция, создающая корутину вызова
+        :return: результат вызова
+        """
+        in_flight_call = self._in_flight.get(key)
+        if in_flight_call is None:
+            in_flight_call = asyncio.ensure_future(call())
+            self._in_flight[key] = in_flight_call
+            in_flight_call.add_done_callback(
+                lambda _: self._forget(key, in_flight_call),
+            )
+            self.executions += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(in_flight_call)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Метод для получения статистики объединения вызовов.
+
+        :return: статистика объединения вызовов
+        """
+        return {
+            "in_flight": len(self._in_flight),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+        }
+
+    def _forget(
+        self, key: Hashable, finished_call: asyncio.Future[CacheValue],
+    ) -> None:
+        """
+        Метод для удаления завершённого вызова.
+
+        :param key: ключ вызова
+        :param finished_call: завершённый вызов
+        """
+        if self._in_flight.get(key) is finished_call:
+            self._in_flight.pop(key)
@@ -16,19 +16,141 @@ DB_USER = os.environ.get("POSTGRES_USER")
 DB_PASSWORD = os.environ.get("POSTGRES_PASSWORD")
 DB_NAME = os.environ.get("POSTGRES_NAME")
 
+DB_ECHO = os.environ.get("DB_ECHO", "0") == "1"
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "1") == "1"
+DB_STATEMENT_CACHE_SIZE = int(
+    os.environ.get("DB_STATEMENT_CACHE_SIZE", "100"),
+)
+DB_STATEMENT_TIMEOUT = int(os.environ.get("DB_STATEMENT_TIMEOUT", "30000"))
+DB_COMMAND_TIMEOUT = float(os.environ.get("DB_COMMAND_TIMEOUT", "60"))
+
+DB_REPLICA_HOST = os.environ.get("POSTGRES_REPLICA_HOST")
+DB_REPLICA_PORT = os.environ.get("POSTGRES_REPLICA_PORT", DB_PORT)
+DB_REPLICA_MAX_LAG = float(os.environ.get("DB_REPLICA_MAX_LAG", "5"))
+DB_REPLICA_LAG_CHECK_INTERVAL = float(
+    os.environ.get("DB_REPLICA_LAG_CHECK_INTERVAL", "1"),
+)
+READ_YOUR_WRITES_WINDOW = float(
+    os.environ.get("READ_YOUR_WRITES_WINDOW", "5"),
+)
+READ_YOUR_WRITES_CACHE_SIZE = int(
+    os.environ.get("READ_YOUR_WRITES_CACHE_SIZE", "10000"),
+)
+
 DB_HOST_TEST = os.environ.get("POSTGRES_HOST_TEST")
 DB_PORT_TEST = os.environ.get("POSTGRES_PORT_TEST")
 DB_USER_TEST = os.environ.get("POSTGRES_USER_TEST")
 DB_PASSWORD_TEST = os.environ.get("POSTGRES_PASSWORD_TEST")
 DB_NAME_TEST = os.environ.get("POSTGRES_NAME_TEST")
 
+API_KEY_CACHE_SIZE = int(os.environ.get("API_KEY_CACHE_SIZE", "10000"))
+API_KEY_CACHE_TTL = float(os.environ.get("API_KEY_CACHE_TTL", "300"))
+
+SKIP_RESPONSE_REVALIDATION = (
+    os.environ.get("SKIP_RESPONSE_REVALIDATION", "1") == "1"
+)
+
+TIMELINE_FANOUT_MAX_FOLLOWERS = int(
+    os.environ.get("TIMELINE_FANOUT_MAX_FOLLOWERS", "10000"),
+)
+TIMELINE_BACKFILL_SIZE = int(os.environ.get("TIMELINE_BACKFILL_SIZE", "50"))
+TIMELINE_PAGE_SIZE = int(os.environ.get("TIMELINE_PAGE_SIZE", "20"))
+
+TWEETS_FEED_SQL_JSON = os.environ.get("TWEETS_FEED_SQL_JSON", "0") == "1"
+
+FEED_CACHE_SIZE = int(os.environ.get("FEED_CACHE_SIZE", "1000"))
+FEED_CACHE_TTL = float(os.environ.get("FEED_CACHE_TTL", "30"))
+FEED_CACHE_MAX_STALENESS = float(
+    os.environ.get("FEED_CACHE_MAX_STALENESS", "0"),
+)
+
+CACHE_INVALIDATION_LISTENER = (
+    os.environ.get("CACHE_INVALIDATION_LISTENER", "1") == "1"
+)
+CACHE_INVALIDATION_RECONNECT_DELAY = float(
+    os.environ.get("CACHE_INVALIDATION_RECONNECT_DELAY", "1"),
+)
+
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "100"))
+
+PROFILE_FOLLOWS_PREVIEW_SIZE = int(
+    os.environ.get("PROFILE_FOLLOWS_PREVIEW_SIZE", "20"),
+)
+FOLLOWS_PAGE_SIZE = int(os.environ.get("FOLLOWS_PAGE_SIZE", "50"))
+
+LIKES_WRITE_BEHIND = os.environ.get("LIKES_WRITE_BEHIND", "0") == "1"
+LIKES_QUEUE_DIR = os.environ.get("LIKES_QUEUE_DIR", "likes_queue")
+LIKES_QUEUE_FSYNC = os.environ.get("LIKES_QUEUE_FSYNC", "1") == "1"
+LIKES_FLUSH_INTERVAL = float(os.environ.get("LIKES_FLUSH_INTERVAL", "200"))
+LIKES_FLUSH_BATCH_SIZE = int(os.environ.get("LIKES_FLUSH_BATCH_SIZE", "5000"))
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "1") == "1"
+METRICS_PORT = int(os.environ.get("METRICS_PORT", "0"))
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+METRICS_SNAPSHOT_INTERVAL = float(
+    os.environ.get("METRICS_SNAPSHOT_INTERVAL", "5000"),
+)
+DB_REPEATED_QUERY_THRESHOLD = int(
+    os.environ.get("DB_REPEATED_QUERY_THRESHOLD", "5"),
+)
+DB_SLOW_QUERY_THRESHOLD = float(
+    os.environ.get("DB_SLOW_QUERY_THRESHOLD", "500"),
+)
+DB_SLOW_QUERY_EXPLAIN_RATE = float(
+    os.environ.get("DB_SLOW_QUERY_EXPLAIN_RATE", "0"),
+)
+DB_SLOW_QUERY_EXPLAIN_CONCURRENCY = int(
+    os.environ.get("DB_SLOW_QUERY_EXPLAIN_CONCURRENCY", "2"),
+)
+
+MEDIA_MAX_SIZE = int(os.environ.get("MEDIA_MAX_SIZE", str(10 * 1024 * 1024)))
+MEDIA_CHUNK_SIZE = int(os.environ.get("MEDIA_CHUNK_SIZE", str(1024 * 1024)))
+MEDIA_RENDITION_WORKERS = int(os.environ.get("MEDIA_RENDITION_WORKERS", "1"))
+
+MEDIA_GC_MIN_AGE_HOURS = float(os.environ.get("MEDIA_GC_MIN_AGE_HOURS", "24"))
+MEDIA_GC_BATCH_SIZE = int(os.environ.get("MEDIA_GC_BATCH_SIZE", "500"))
+MEDIA_GC_CONCURRENCY = int(os.environ.get("MEDIA_GC_CONCURRENCY", "16"))
+
+LOG_FILE = os.environ.get("LOG_FILE", "logs.log")
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_ENQUEUE = os.environ.get("LOG_ENQUEUE", "1") == "1"
+LOG_SERIALIZE = os.environ.get("LOG_SERIALIZE", "0") == "1"
+QUERY_PLANS_LOG_FILE = os.environ.get(
+    "QUERY_PLANS_LOG_FILE", "query_plans.log",
+)
+QUERY_PLANS_EXTRA_KEY = "query_plan"
+
+# Записи пишутся в файл фоновым потоком, а аргументы сообщений попадают в
+# поле 'extra' записи, поэтому форматирование выполняется только для
+# записей, уровень которых не ниже уровня обработчика. Аргументы уже
+# подставлены в текст сообщения, поэтому поле 'extra' пишется только в
+# записях в формате JSON при LOG_SERIALIZE.
 logger.remove()
 logger.add(
-    "logs.log",
+    LOG_FILE,
     rotation="1 week",
     compression="zip",
-    level="INFO",
+    level=LOG_LEVEL,
     format="{time} {level} {message}",
+    enqueue=LOG_ENQUEUE,
+    serialize=LOG_SERIALIZE,
     backtrace=True,
-    diagnose=True,
+    diagnose=DEV,
+    filter=lambda record: QUERY_PLANS_EXTRA_KEY not in record["extra"],
 )
+# Планы медленных запросов пишутся в отдельный файл.
+if DB_SLOW_QUERY_EXPLAIN_RATE:
+    logger.add(
+        QUERY_PLANS_LOG_FILE,
+        rotation="1 week",
+        compression="zip",
+        level="INFO",
+        format="{time} {message}",
+        enqueue=LOG_ENQUEUE,
+        delay=True,
+        filter=lambda record: QUERY_PLANS_EXTRA_KEY in record["extra"],
+    )
@@ -1,47 +1,254 @@
 """Project database file. Use to create connect do FastAPI app db."""
 
+from types import MappingProxyType
 from typing import AsyncGenerator
 
+from sqlalchemy import text
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
     AsyncSession,
     async_sessionmaker,
     create_async_engine,
 )
 from sqlalchemy.orm import declarative_base
+from starlette.requests import Request
 
-from python_advanced_diploma.src.config import (
-    DB_HOST,
-    DB_NAME,
-    DB_PASSWORD,
-    DB_PORT,
-    DB_USER,
+from python_advanced_diploma.src import config
+from python_advanced_diploma.src.cache import TTLCache
+from python_advanced_diploma.src.metrics import (
+    InstrumentedQueuePool,
+    instrument_engine,
 )
+from python_advanced_diploma.src.slow_queries import instrument_slow_queries
 
-DATABASE_URL = (
+DATABASE_URL_TEMPLATE = (
     "postgresql+asyncpg://"
-    "{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}".format(
-        DB_USER=DB_USER,
-        DB_PASSWORD=DB_PASSWORD,
-        DB_HOST=DB_HOST,
-        DB_PORT=DB_PORT,
-        DB_NAME=DB_NAME,
-    )
+    "{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
+)
+DATABASE_URL = DATABASE_URL_TEMPLATE.format(
+    DB_USER=config.DB_USER,
+    DB_PASSWORD=config.DB_PASSWORD,
+    DB_HOST=config.DB_HOST,
+    DB_PORT=config.DB_PORT,
+    DB_NAME=config.DB_NAME,
 )
 
-engine = create_async_engine(DATABASE_URL, echo=True)
+ENGINE_OPTIONS = MappingProxyType({
+    "echo": config.DB_ECHO,
+    "poolclass": InstrumentedQueuePool,
+    "pool_size": config.DB_POOL_SIZE,
+    "max_overflow": config.DB_MAX_OVERFLOW,
+    "pool_timeout": config.DB_POOL_TIMEOUT,
+    "pool_recycle": config.DB_POOL_RECYCLE,
+    "pool_pre_ping": config.DB_POOL_PRE_PING,
+    "connect_args": {
+        "prepared_statement_cache_size": config.DB_STATEMENT_CACHE_SIZE,
+        "command_timeout": config.DB_COMMAND_TIMEOUT,
+        "server_settings": {
+            "statement_timeout": str(config.DB_STATEMENT_TIMEOUT),
+        },
+    },
+})
+
+# Отставание реплики считается нулевым, если все полученные ей изменения
+# уже применены, иначе как время с последней применённой транзакции.
+REPLICA_LAG_QUERY = text(
+    "SELECT CASE "
+    "WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()) "
+    "END",
+)
+REPLICA_IS_FRESH_KEY = "replica_is_fresh"
+READ_METHODS = frozenset(("GET", "HEAD", "OPTIONS"))
+
+engine = create_async_engine(DATABASE_URL, **ENGINE_OPTIONS)
+instrument_engine(engine)
+instrument_slow_queries(engine)
+engines: dict[str, AsyncEngine] = {"primary": engine}
 async_session_maker = async_sessionmaker(
     engine,
     class_=AsyncSession,
     expire_on_commit=False,
 )
+replica_session_maker: async_sessionmaker[AsyncSession] | None = None
+if config.DB_REPLICA_HOST:
+    replica_engine = create_async_engine(
+        DATABASE_URL_TEMPLATE.format(
+            DB_USER=config.DB_USER,
+            DB_PASSWORD=config.DB_PASSWORD,
+            DB_HOST=config.DB_REPLICA_HOST,
+            DB_PORT=config.DB_REPLICA_PORT,
+            DB_NAME=config.DB_NAME,
+        ),
+        **ENGINE_OPTIONS,
+    )
+    instrument_engine(replica_engine)
+    instrument_slow_queries(replica_engine)
+    engines["replica"] = replica_engine
+    replica_session_maker = async_sessionmaker(
+        replica_engine,
+        class_=AsyncSession,
+        expire_on_commit=False,
+    )
 Base = declarative_base()
 
+replica_state_cache: TTLCache[bool] = TTLCache(
+    maxsize=1, ttl=config.DB_REPLICA_LAG_CHECK_INTERVAL,
+)
+recent_writers_cache: TTLCache[bool] = TTLCache(
+    maxsize=config.READ_YOUR_WRITES_CACHE_SIZE,
+    ttl=config.READ_YOUR_WRITES_WINDOW,
+)
+
+
+def mark_recent_write(api_key: str | None) -> None:
+    """
+    Функция для отметки записи, выполненной пользователем.
+
+    В течение окна READ_YOUR_WRITES_WINDOW пользователь читает с основного
+    сервера и видит свои изменения.
+    :param api_key: api_key пользователя
+    """
+    if api_key:
+        recent_writers_cache.set(api_key, cache_value=True)
+
 
-async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+async def get_async_session(
+    request: Request,
+) -> AsyncGenerator[AsyncSession, None]:
     """
     Функция для получения асинхронной сессии.
 
+    После изменяющих запросов отмечает запись пользователя.
+    :param request: HTTP запрос
     :yield: Асинхронная сессия
     """
     async with async_session_maker() as session:
         yield session
+    if request.method not in READ_METHODS:
+        mark_recent_write(request.headers.get("api-key"))
+
+
+async def get_replica_lag(
+    session_maker: async_sessionmaker[AsyncSession],
+) -> float | None:
+    """
+    Функция для получения отставания реплики.
+
+    :param session_maker: фабрика асинхронных сессий реплики
+    :return: отставание реплики в секундах | None, если сервер не реплика
+    """
+    async with session_maker() as session:
+        return await session.scalar(REPLICA_LAG_QUERY)
+
+
+async def is_replica_fresh(
+    session_maker: async_sessionmaker[AsyncSession],
+) -> bool:
+    """
+    Функция для проверки отставания реплики.
+
+    Результат проверки кэшируется на DB_REPLICA_LAG_CHECK_INTERVAL секунд.
+    Недоступная реплика считается отставшей.
+    :param session_maker: фабрика асинхронных сессий реплики
+    :return: True, если отставание реплики не превышает DB_REPLICA_MAX_LAG
+    """
+    replica_is_fresh = replica_state_cache.get(REPLICA_IS_FRESH_KEY)
+    if replica_is_fresh is not None:
+        return replica_is_fresh
+    try:
+        replica_lag = await get_replica_lag(session_maker)
+    except (OSError, SQLAlchemyError):
+        config.logger.exception("Replica lag check failed")
+        replica_is_fresh = False
+    else:
+        replica_is_fresh = replica_lag is not None and (
+            replica_lag <= config.DB_REPLICA_MAX_LAG
+        )
+        if not replica_is_fresh:
+            config.logger.warning(
+                "Replica lag {replica_lag} s exceeds {max_lag} s",
+                replica_lag=replica_lag,
+                max_lag=config.DB_REPLICA_MAX_LAG,
+            )
+    replica_state_cache.set(REPLICA_IS_FRESH_KEY, replica_is_fresh)
+    return replica_is_fresh
+
+
+async def get_read_session_maker(
+    api_key: str | None,
+) -> async_sessionmaker[AsyncSession]:
+    """
+    Функция для выбора фабрики сессий для чтения.
+
+    Чтение выполняется с основного сервера, если реплика не настроена,
+    отстаёт или пользователь недавно сам изменял данные.
+    :param api_key: api_key пользователя
+    :return: Фабрика асинхронных сессий
+    """
+    if replica_session_maker is None:
+        return async_session_maker
+    if api_key and recent_writers_cache.get(api_key):
+        return async_session_maker
+    if not await is_replica_fresh(replica_session_maker):
+        return async_session_maker
+    return replica_session_maker
+
+
+def is_replica_session(session: AsyncSession) -> bool:
+    """
+    Функция для проверки, что сессия выполняет запросы к реплике.
+
+    :param session: Асинхронная сессия
+    :return: True, если сессия привязана к реплике
+    """
+    if replica_session_maker is None:
+        return False
+    return session.bind is replica_session_maker.kw["bind"]
+
+
+async def get_async_read_session(
+    request: Request,
+) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Функция для получения асинхронной сессии для чтения.
+
+    :param request: HTTP запрос
+    :yield: Асинхронная сессия реплики или основного сервера
+    """
+    session_maker = await get_read_session_maker(
+        request.headers.get("api-key"),
+    )
+    async with session_maker() as session:
+        yield session
+
+
+def get_async_session_maker() -> async_sessionmaker[AsyncSession]:
+    """
+    Функция для получения фабрики асинхронных сессий.
+
+    Используется фоновыми задачами, которые выполняются после закрытия
+    сессии запроса.
+    :return: Фабрика асинхронных сессий
+    """
+    return async_session_maker
+
+
+def get_engine_settings() -> dict[str, bool | float | int]:
+    """
+    Функция для получения действующих настроек движка базы данных.
+
+    :return: настройки пула соединений и выполнения запросов
+    """
+    return {
+        "echo": config.DB_ECHO,
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+        "statement_cache_size": config.DB_STATEMENT_CACHE_SIZE,
+        "statement_timeout_ms": config.DB_STATEMENT_TIMEOUT,
+        "command_timeout_s": config.DB_COMMAND_TIMEOUT,
+    }
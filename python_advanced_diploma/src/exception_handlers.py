@@ -1,10 +1,11 @@
 """Exception handlers file. Used to handle raises exceptions."""
 from fastapi import FastAPI
 from fastapi.exceptions import RequestValidationError
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.exc import IntegrityError, NoResultFound
 from starlette import status
 from starlette.requests import Request
-from starlette.responses import JSONResponse, Response
+from starlette.responses import Response
 
 from python_advanced_diploma.src.config import logger
 
@@ -42,7 +43,7 @@ def add_no_result_found_exception_handler(app: FastAPI) -> None:
             path_params=path_params,
         )
         logger.error(error_message)
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_404_NOT_FOUND,
             content={
                 "result": False,
@@ -86,7 +87,7 @@ def add_attribute_error_exception_handler(app: FastAPI) -> None:
             path_params=path_params,
         )
         logger.error(error_message)
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_404_NOT_FOUND,
             content={
                 "result": False,
@@ -115,7 +116,7 @@ def add_integrity_error_exception_handler(app: FastAPI) -> None:
         :return: HTTP ответ
         """
         logger.error(exc.args[0])
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
             content={
                 "result": False,
@@ -148,12 +149,11 @@ def override_validation_exception_handler(app: FastAPI) -> None:
         path_params = request.path_params
         request_body_bytes = await request.body()
         request_body = request_body_bytes.decode()
-        error_message = (
+        logger.error(
             "{errors} occurred when trying to execute request to URL:"
             " '{requested_url}' by method '{request_method} with "
             "api-key: '{user_api_key}', path parameters: "
-            "'{path_params}' and request_body: '{request_body}'"
-        ).format(
+            "'{path_params}' and request_body: '{request_body}'",
             errors=exc.errors(),
             user_api_key=user_api_key,
             requested_url=request.url,
@@ -161,8 +161,7 @@ def override_validation_exception_handler(app: FastAPI) -> None:
             path_params=path_params,
             request_body=request_body,
         )
-        logger.error(error_message)
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
             content={
                 "result": False,
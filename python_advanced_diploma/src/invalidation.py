@@ -0,0 +1,326 @@
+"""Project invalidation file. Used to invalidate caches across workers.
+
+Write transactions publish invalidation events with 'pg_notify', so the
+events are delivered only after commit. Every worker keeps a listener task
+on a connection of the engine pool which applies the events to the
+in-process caches of the worker.
+"""
+
+import asyncio
+import json
+from contextlib import AsyncExitStack
+from types import MappingProxyType
+from typing import Any, Awaitable, Callable, Mapping, Optional
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import (
+    AsyncConnection,
+    AsyncEngine,
+    AsyncSession,
+)
+
+from python_advanced_diploma.src.config import (
+    CACHE_INVALIDATION_RECONNECT_DELAY,
+    logger,
+)
+from python_advanced_diploma.src.database import mark_recent_write
+from python_advanced_diploma.src.routers_utils import (
+    clear_api_key_cache,
+    invalidate_user_api_key,
+)
+from python_advanced_diploma.src.tweets.tweets_feed_cache import feed_cache
+
+INVALIDATION_CHANNEL = "cache_invalidation"
+FEED_ENTITY = "feed"
+WRITER_ENTITY = "writer"
+API_KEY_ENTITY = "api_key"
+
+# Интервал проверки соединения слушателя, когда событий нет
+LISTENER_HEALTH_CHECK_INTERVAL = 5
+
+InvalidationHandler = Callable[[Optional[str]], Awaitable[None]]
+
+
+async def invalidate_feed(key: str | None) -> None:
+    """
+    Функция для сброса кэша ленты твитов по событию.
+
+    :param key: ключ события, не используется
+    """
+    await feed_cache.invalidate()
+
+
+async def mark_writer(key: str | None) -> None:
+    """
+    Функция для отметки записи пользователя, выполненной другим процессом.
+
+    :param key: api_key пользователя
+    """
+    mark_recent_write(key)
+
+
+async def invalidate_api_key(key: str | None) -> None:
+    """
+    Функция для удаления api_key из кэша по событию.
+
+    :param key: api_key пользователя | None, чтобы очистить кэш
+    """
+    if key is None:
+        clear_api_key_cache()
+    else:
+        invalidate_user_api_key(key)
+
+
+INVALIDATION_HANDLERS: Mapping[str, InvalidationHandler] = MappingProxyType({
+    FEED_ENTITY: invalidate_feed,
+    WRITER_ENTITY: mark_writer,
+    API_KEY_ENTITY: invalidate_api_key,
+})
+
+
+async def publish_invalidations(
+    session: AsyncSession, events: dict[str, str | None],
+) -> None:
+    """
+    Функция для публикации событий инвалидации в транзакции сессии.
+
+    События доставляются слушателям только после фиксации транзакции.
+    :param session: асинхронная сессия
+    :param events: ключи событий по сущностям
+    """
+    await session.execute(
+        select(
+            *[
+                func.pg_notify(
+                    INVALIDATION_CHANNEL,
+                    json.dumps({"entity": entity, "key": key}),
+                )
+                for entity, key in events.items()
+            ],
+        ),
+    )
+
+
+async def publish_feed_change(
+    session: AsyncSession, api_key: str | None = None,
+) -> None:
+    """
+    Функция для публикации изменения ленты твитов.
+
+    :param session: асинхронная сессия
+    :param api_key: api_key изменившего ленту пользователя
+    """
+    events: dict[str, str | None] = {FEED_ENTITY: None}
+    if api_key:
+        events[WRITER_ENTITY] = api_key
+    await publish_invalidations(session, events)
+
+
+async def commit_feed_change(
+    session: AsyncSession, api_key: str | None = None,
+) -> None:
+    """
+    Функция для фиксации транзакции, изменившей ленту твитов.
+
+    Кэш ленты процесса сбрасывается сразу после фиксации, не дожидаясь
+    события от слушателя.
+    :param session: асинхронная сессия
+    :param api_key: api_key изменившего ленту пользователя
+    """
+    await publish_feed_change(session, api_key)
+    await session.commit()
+    await feed_cache.invalidate()
+
+
+async def commit_user_write(session: AsyncSession, api_key: str) -> None:
+    """
+    Функция для фиксации транзакции с записью, выполненной пользователем.
+
+    :param session: асинхронная сессия
+    :param api_key: api_key пользователя
+    """
+    await publish_invalidations(session, {WRITER_ENTITY: api_key})
+    await session.commit()
+
+
+def parse_invalidation(
+    payload: str,
+) -> tuple[InvalidationHandler, str | None]:
+    """
+    Функция для разбора события инвалидации.
+
+    :param payload: событие инвалидации
+    :return: обработчик события и ключ события
+    """
+    invalidation_event = json.loads(payload)
+    return (
+        INVALIDATION_HANDLERS[invalidation_event["entity"]],
+        invalidation_event.get("key"),
+    )
+
+
+async def dispatch_invalidation(payload: str) -> None:
+    """
+    Функция для применения события инвалидации к кэшам процесса.
+
+    :param payload: событие инвалидации
+    """
+    try:
+        handler, key = parse_invalidation(payload)
+    except (ValueError, KeyError, TypeError):
+        logger.warning(
+            "Invalid cache invalidation event: {payload}",
+            payload=payload,
+        )
+        return
+    await handler(key)
+
+
+async def reset_invalidated_caches() -> None:
+    """
+    Функция для сброса кэшей процесса.
+
+    Вызывается при подключении слушателя, так как события, отправленные
+    без подключения, потеряны.
+    """
+    await invalidate_feed(None)
+    await invalidate_api_key(None)
+
+
+async def subscribe_to_invalidations(
+    conn: AsyncConnection, callback: Callable[..., None],
+) -> Any:
+    """
+    Функция для подписки соединения на канал событий инвалидации.
+
+    Кэши процесса сбрасываются после подписки, так как события,
+    отправленные без подключения, потеряны.
+    :param conn: асинхронное соединение
+    :param callback: функция получения уведомлений
+    :return: соединение asyncpg
+    :raises ConnectionError: если соединение драйвера недоступно
+    """
+    raw_connection = await conn.get_raw_connection()
+    asyncpg_connection = raw_connection.driver_connection
+    if asyncpg_connection is None:
+        raise ConnectionError("Driver connection is not available")
+    await asyncpg_connection.add_listener(INVALIDATION_CHANNEL, callback)
+    await reset_invalidated_caches()
+    logger.info(
+        "Listening for cache invalidations on {channel}",
+        channel=INVALIDATION_CHANNEL,
+    )
+    return asyncpg_connection
+
+
+async def unsubscribe_from_invalidations(
+    asyncpg_connection: Any, callback: Callable[..., None],
+) -> None:
+    """
+    Функция для отписки соединения от канала событий инвалидации.
+
+    :param asyncpg_connection: соединение asyncpg
+    :param callback: функция получения уведомлений
+    """
+    if not asyncpg_connection.is_closed():
+        await asyncpg_connection.remove_listener(
+            INVALIDATION_CHANNEL, callback,
+        )
+
+
+class InvalidationListener:
+    """
+    Слушатель событий инвалидации кэшей процесса.
+
+    Слушает канал на соединении пула движка и переподключается при его
+    потере.
+    """
+
+    def __init__(self) -> None:
+        """Метод для инициализации слушателя."""
+        self.events: asyncio.Queue[str] = asyncio.Queue()
+        self.task: asyncio.Task[None] | None = None
+
+    def on_notification(
+        self, connection: object, pid: int, channel: str, payload: str,
+    ) -> None:
+        """
+        Метод для получения уведомления от соединения.
+
+        :param connection: соединение asyncpg
+        :param pid: ID процесса сервера, отправившего уведомление
+        :param channel: канал уведомления
+        :param payload: событие инвалидации
+        """
+        self.events.put_nowait(payload)
+
+    async def wait_for_event(self) -> str | None:
+        """
+        Метод для ожидания события инвалидации.
+
+        Ожидание прерывается раз в интервал проверки соединения.
+        :return: событие инвалидации | None, если событий не было
+        """
+        try:
+            return await asyncio.wait_for(
+                self.events.get(), timeout=LISTENER_HEALTH_CHECK_INTERVAL,
+            )
+        except asyncio.TimeoutError:
+            return None
+
+    async def listen(self, engine: AsyncEngine) -> None:
+        """
+        Метод для применения событий инвалидации, пока соединение открыто.
+
+        :param engine: асинхронный движок
+        """
+        async with AsyncExitStack() as stack:
+            asyncpg_connection = await subscribe_to_invalidations(
+                await stack.enter_async_context(engine.connect()),
+                self.on_notification,
+            )
+            stack.push_async_callback(
+                unsubscribe_from_invalidations,
+                asyncpg_connection,
+                self.on_notification,
+            )
+            while not asyncpg_connection.is_closed():
+                payload = await self.wait_for_event()
+                if payload is not None:
+                    await dispatch_invalidation(payload)
+
+    async def run(self, engine: AsyncEngine) -> None:
+        """
+        Метод для получения событий инвалидации с переподключением.
+
+        :param engine: асинхронный движок
+        """
+        while True:
+            try:
+                await self.listen(engine)
+            except Exception:
+                logger.exception("Cache invalidation listener failed")
+            await asyncio.sleep(CACHE_INVALIDATION_RECONNECT_DELAY)
+
+    def start(self, engine: AsyncEngine) -> None:
+        """
+        Метод для запуска слушателя, если он ещё не запущен.
+
+        :param engine: асинхронный движок
+        """
+        if self.task is None:
+            self.task = asyncio.create_task(self.run(engine))
+
+    async def stop(self) -> None:
+        """Метод для остановки слушателя."""
+        if self.task is None:
+            return
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            logger.info("Cache invalidation listener stopped")
+        self.task = None
+
+
+invalidation_listener = InvalidationListener()
@@ -1,19 +1,45 @@
 """Project main file. Used to run FastAPI app."""
 
+from contextlib import asynccontextmanager
+from typing import AsyncGenerator
+
 import uvicorn
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from starlette.staticfiles import StaticFiles
 
-from python_advanced_diploma.src.config import APP_PORT, DEV
+from python_advanced_diploma.src.config import (
+    APP_PORT,
+    CACHE_INVALIDATION_LISTENER,
+    DEV,
+    LIKES_WRITE_BEHIND,
+    MEDIA_MAX_SIZE,
+    METRICS_ENABLED,
+    logger,
+)
+from python_advanced_diploma.src.database import engine, get_engine_settings
 from python_advanced_diploma.src.exception_handlers import (
     add_attribute_error_exception_handler,
     add_integrity_error_exception_handler,
     add_no_result_found_exception_handler,
     override_validation_exception_handler,
 )
+from python_advanced_diploma.src.invalidation import invalidation_listener
+from python_advanced_diploma.src.medias.medias_middleware import (
+    MediaSizeLimitMiddleware,
+)
+from python_advanced_diploma.src.medias.medias_renditions import (
+    renditions_pool,
+)
 from python_advanced_diploma.src.medias.medias_router import (
     router as medias_router,
 )
+from python_advanced_diploma.src.metrics import MetricsMiddleware
+from python_advanced_diploma.src.metrics_router import router as metrics_router
+from python_advanced_diploma.src.metrics_snapshots import metrics_snapshots
+from python_advanced_diploma.src.tweets.tweets_likes_buffer import (
+    likes_flusher,
+)
 from python_advanced_diploma.src.tweets.tweets_router import (
     router as tweets_router,
 )
@@ -21,11 +47,57 @@ from python_advanced_diploma.src.users.users_router import (
     router as users_router,
 )
 
-app = FastAPI(title="My Twitter")
+
+def start_background_tasks() -> None:
+    """Функция для запуска фоновых задач процесса приложения."""
+    if CACHE_INVALIDATION_LISTENER:
+        invalidation_listener.start(engine)
+    if LIKES_WRITE_BEHIND:
+        likes_flusher.start(engine)
+    metrics_snapshots.start()
+
+
+async def stop_background_tasks() -> None:
+    """Функция для остановки фоновых задач процесса приложения."""
+    await metrics_snapshots.stop()
+    await likes_flusher.stop()
+    await invalidation_listener.stop()
+    await renditions_pool.shutdown()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncGenerator[None, None]:
+    """
+    Функция для управления жизненным циклом приложения.
+
+    :param app: приложение
+    :yield: None
+    """
+    logger.info(
+        "Database engine settings: {engine_settings}",
+        engine_settings=get_engine_settings(),
+    )
+    start_background_tasks()
+    yield
+    await stop_background_tasks()
+    await logger.complete()
+
+
+app = FastAPI(
+    title="My Twitter",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse,
+)
 
 app.include_router(medias_router)
 app.include_router(tweets_router)
 app.include_router(users_router)
+app.include_router(metrics_router)
+
+app.add_middleware(MediaSizeLimitMiddleware, max_size=MEDIA_MAX_SIZE)
+
+if METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware, debug=DEV)
 
 add_no_result_found_exception_handler(app)
 add_attribute_error_exception_handler(app)
@@ -0,0 +1,221 @@
+"""Medias garbage collector file. Used to delete orphaned tweet media.
+
+Tweet media are uploaded before the tweet is created and stay unattached
+if the tweet is never created. The collector deletes such media older than
+a threshold in bounded batches together with their image files.
+
+Run from the directory the application runs in, so that relative image
+paths resolve to the same files::
+
+    python -m python_advanced_diploma.src.medias.medias_gc --batch-size 500
+"""
+
+import argparse
+import asyncio
+from collections import Counter
+from contextlib import suppress
+from datetime import datetime, timedelta, timezone
+from time import perf_counter
+from typing import Sequence
+
+from aiofiles.os import remove, stat
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from python_advanced_diploma.src.config import (
+    MEDIA_GC_BATCH_SIZE,
+    MEDIA_GC_CONCURRENCY,
+    MEDIA_GC_MIN_AGE_HOURS,
+    logger,
+)
+from python_advanced_diploma.src.database import async_session_maker
+from python_advanced_diploma.src.medias.medias_models import TweetMedia
+from python_advanced_diploma.src.medias.medias_renditions import (
+    get_images_with_renditions,
+)
+from python_advanced_diploma.src.medias.medias_router_utils import (
+    get_unreferenced_images,
+)
+
+
+async def delete_file(path: str, semaphore: asyncio.Semaphore) -> int:
+    """
+    Функция для удаления файла с ограничением параллельности.
+
+    :param path: путь к файлу
+    :param semaphore: семафор, ограничивающий количество удалений
+    :return: размер удалённого файла в байтах
+    """
+    async with semaphore:
+        try:
+            file_stat = await stat(path)
+        except FileNotFoundError:
+            return 0
+        with suppress(FileNotFoundError):
+            await remove(path)
+    return file_stat.st_size
+
+
+async def delete_files(paths: Sequence[str], concurrency: int) -> int:
+    """
+    Функция для параллельного удаления файлов.
+
+    :param paths: пути к файлам
+    :param concurrency: максимальное количество одновременных удалений
+    :return: суммарный размер удалённых файлов в байтах
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    deleted_sizes = await asyncio.gather(
+        *[delete_file(path, semaphore) for path in paths],
+    )
+    return sum(deleted_sizes)
+
+
+async def delete_orphaned_media_batch(
+    session: AsyncSession, created_before: datetime, batch_size: int,
+) -> Sequence[str]:
+    """
+    Функция для удаления пачки не прикреплённых к твитам твит медиа.
+
+    Заблокированные другими транзакциями записи пропускаются.
+    :param session: асинхронная сессия
+    :param created_before: время, раньше которого созданы удаляемые медиа
+    :param batch_size: размер пачки
+    :return: изображения удалённых твит медиа
+    """
+    orphaned_media_ids = (
+        select(TweetMedia.id).
+        filter(
+            TweetMedia.tweet_id.is_(None),
+            TweetMedia.created_at < created_before,
+        ).
+        order_by(TweetMedia.created_at).
+        limit(batch_size).
+        with_for_update(skip_locked=True)
+    )
+    delete_result = await session.execute(
+        delete(TweetMedia).
+        filter(TweetMedia.id.in_(orphaned_media_ids)).
+        returning(TweetMedia.image),
+    )
+    deleted_images = delete_result.scalars().all()
+    await session.commit()
+    return deleted_images
+
+
+async def delete_unreferenced_image_files(
+    images: Sequence[str], session: AsyncSession, concurrency: int,
+) -> tuple[int, int]:
+    """
+    Функция для удаления файлов изображений без ссылок вместе с копиями.
+
+    Вызывается после фиксации удаления записей твит медиа. Файлы удаляются
+    до фиксации транзакции, в которой изображения заблокированы.
+    :param images: изображения удалённых твит медиа
+    :param session: асинхронная сессия
+    :param concurrency: максимальное количество одновременных удалений
+    :return: количество удалённых изображений и их суммарный размер в байтах
+    """
+    unreferenced_images = await get_unreferenced_images(images, session)
+    reclaimed_bytes = await delete_files(
+        get_images_with_renditions(unreferenced_images), concurrency,
+    )
+    await session.commit()
+    return len(unreferenced_images), reclaimed_bytes
+
+
+async def collect_orphaned_media_batch(
+    session_maker: async_sessionmaker[AsyncSession],
+    created_before: datetime,
+    batch_size: int,
+    concurrency: int,
+) -> Counter[str]:
+    """
+    Функция для удаления пачки не прикреплённых к твитам твит медиа.
+
+    Записи и файлы удаляются в отдельных транзакциях.
+    :param session_maker: фабрика асинхронных сессий
+    :param created_before: время, раньше которого созданы удаляемые медиа
+    :param batch_size: размер пачки
+    :param concurrency: максимальное количество одновременных удалений
+    :return: отчёт о работе сборщика по пачке
+    """
+    async with session_maker() as session:
+        deleted_media_images = await delete_orphaned_media_batch(
+            session, created_before, batch_size,
+        )
+        deleted_images, reclaimed_bytes = (
+            await delete_unreferenced_image_files(
+                deleted_media_images, session, concurrency,
+            )
+        )
+    return Counter(
+        deleted_rows=len(deleted_media_images),
+        deleted_images=deleted_images,
+        reclaimed_bytes=reclaimed_bytes,
+    )
+
+
+async def collect_orphaned_media(
+    session_maker: async_sessionmaker[AsyncSession],
+    min_age: timedelta,
+    batch_size: int = MEDIA_GC_BATCH_SIZE,
+    concurrency: int = MEDIA_GC_CONCURRENCY,
+) -> dict[str, float]:
+    """
+    Функция для удаления всех не прикреплённых к твитам твит медиа.
+
+    :param session_maker: фабрика асинхронных сессий
+    :param min_age: минимальный возраст удаляемых медиа
+    :param batch_size: размер пачки
+    :param concurrency: максимальное количество одновременных удалений
+    :return: отчёт о работе сборщика
+    """
+    started_at = perf_counter()
+    created_before = datetime.now(timezone.utc) - min_age
+    report = Counter(deleted_rows=0, deleted_images=0, reclaimed_bytes=0)
+    while True:
+        batch_report = await collect_orphaned_media_batch(
+            session_maker, created_before, batch_size, concurrency,
+        )
+        if not batch_report["deleted_rows"]:
+            break
+        report.update(batch_report)
+        logger.info(
+            "Media garbage collector deleted {batch_rows} rows",
+            batch_rows=batch_report["deleted_rows"],
+        )
+    duration = perf_counter() - started_at
+    return {
+        **report,
+        "duration_s": round(duration, 3),
+        "rows_per_s": (
+            round(report["deleted_rows"] / duration, 1) if duration else 0
+        ),
+    }
+
+
+def main() -> None:
+    """Функция для запуска сборщика из командной строки."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--min-age-hours", type=float, default=MEDIA_GC_MIN_AGE_HOURS,
+    )
+    parser.add_argument("--batch-size", type=int, default=MEDIA_GC_BATCH_SIZE)
+    parser.add_argument(
+        "--concurrency", type=int, default=MEDIA_GC_CONCURRENCY,
+    )
+    args = parser.parse_args()
+    report = asyncio.run(
+        collect_orphaned_media(
+            async_session_maker,
+            timedelta(hours=args.min_age_hours),
+            args.batch_size,
+            args.concurrency,
+        ),
+    )
+    logger.info("Media garbage collector finished: {report}", report=report)
+
+
+if __name__ == "__main__":
+    main()
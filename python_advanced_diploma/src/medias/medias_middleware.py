@@ -0,0 +1,81 @@
+"""Medias middleware file. Used to reject too large uploads early."""
+
+from fastapi.responses import ORJSONResponse
+from starlette import status
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from python_advanced_diploma.src.config import logger
+
+MEDIAS_PATH = "/api/medias"
+MULTIPART_OVERHEAD_SIZE = 16384
+
+
+class MediaSizeLimitMiddleware:
+    """
+    Промежуточный слой, ограничивающий размер загружаемых файлов.
+
+    Запрос на загрузку файла отклоняется по заголовку 'Content-Length' до
+    чтения тела запроса. Тело в формате multipart больше самого файла на
+    размер заголовков частей, поэтому к лимиту добавляется запас, а точный
+    размер файла проверяется при его сохранении.
+    """
+
+    def __init__(self, app: ASGIApp, max_size: int) -> None:
+        """
+        Метод для инициализации промежуточного слоя.
+
+        :param app: ASGI приложение
+        :param max_size: максимальный размер файла в байтах
+        """
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send,
+    ) -> None:
+        """
+        Метод для обработки запроса.
+
+        :param scope: данные запроса
+        :param receive: функция получения сообщений
+        :param send: функция отправки сообщений
+        """
+        content_length = self.get_upload_content_length(scope)
+        if content_length <= self.max_size + MULTIPART_OVERHEAD_SIZE:
+            await self.app(scope, receive, send)
+            return
+        logger.warning(
+            "Upload with content length: {content_length} bytes rejected, "
+            "max size is {max_size} bytes",
+            content_length=content_length,
+            max_size=self.max_size,
+        )
+        response = ORJSONResponse(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            content={
+                "result": False,
+                "error_type": "ValueError",
+                "error_message": "Image size exceeds {max_size} bytes".format(
+                    max_size=self.max_size,
+                ),
+            },
+        )
+        await response(scope, receive, send)
+
+    def get_upload_content_length(self, scope: Scope) -> int:
+        """
+        Метод для получения размера тела запроса на загрузку файла.
+
+        :param scope: данные запроса
+        :return: значение заголовка 'Content-Length' или 0, если запрос
+            не является загрузкой файла или заголовок не передан
+        """
+        if scope["type"] != "http" or scope["method"] != "POST":
+            return 0
+        if scope["path"].rstrip("/") != MEDIAS_PATH:
+            return 0
+        content_length = Headers(scope=scope).get("content-length", "")
+        if not content_length.isdigit():
+            return 0
+        return int(content_length)
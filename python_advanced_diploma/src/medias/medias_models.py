@@ -1,5 +1,7 @@
 """Medias models file. Used to create medias models."""
-from sqlalchemy import ForeignKey
+from datetime import datetime
+
+from sqlalchemy import DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import Mapped, mapped_column
 
 from python_advanced_diploma.src.database import Base
@@ -10,8 +12,23 @@ class TweetMedia(Base):
 
     __tablename__ = "tweet_media"
     id: Mapped[int] = mapped_column(primary_key=True)
-    image: Mapped[str]
+    image: Mapped[str] = mapped_column(index=True)
+    thumbnail: Mapped[str] = mapped_column(nullable=True)
+    medium: Mapped[str] = mapped_column(nullable=True)
+    webp: Mapped[str] = mapped_column(nullable=True)
     tweet_id: Mapped[int] = mapped_column(
         ForeignKey("tweet.id"),
         nullable=True,
+        index=True,
+    )
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
     )
+
+
+Index(
+    "ix_tweet_media_created_at_orphaned",
+    TweetMedia.created_at,
+    postgresql_where=TweetMedia.tweet_id.is_(None),
+)
@@ -0,0 +1,268 @@
+"""Medias renditions file. Used to render resized copies of tweet media."""
+
+import asyncio
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import suppress
+from typing import Any, Sequence
+from uuid import uuid4
+
+from PIL import Image, ImageOps
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from python_advanced_diploma.src.config import MEDIA_RENDITION_WORKERS, logger
+from python_advanced_diploma.src.invalidation import publish_feed_change
+from python_advanced_diploma.src.medias.medias_models import TweetMedia
+from python_advanced_diploma.src.medias.medias_router_utils import (
+    delete_all_tweet_images,
+    get_unreferenced_images,
+)
+from python_advanced_diploma.src.tweets.tweets_feed_cache import feed_cache
+
+THUMBNAIL_SIZE = (320, 320)
+MEDIUM_SIZE = (1080, 1080)
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+TRANSPARENT_MODES = frozenset(("RGBA", "LA", "P", "PA"))
+
+
+def get_rendition_paths(image_path: str) -> dict[str, str]:
+    """
+    Функция для получения путей к копиям изображения.
+
+    Пути вычисляются из пути к исходному изображению, поэтому одинаковые
+    изображения используют одни и те же копии.
+    :param image_path: путь к исходному изображению
+    :return: пути к копиям изображения
+    """
+    image_base_path, _ = os.path.splitext(image_path)
+    return {
+        "thumbnail": "{base}_thumbnail.jpg".format(base=image_base_path),
+        "medium": "{base}_medium.jpg".format(base=image_base_path),
+        "webp": "{base}.webp".format(base=image_base_path),
+    }
+
+
+def get_images_with_renditions(images: Sequence[str]) -> list[str]:
+    """
+    Функция для получения путей к изображениям вместе с их копиями.
+
+    :param images: пути к исходным изображениям
+    :return: пути к изображениям и их копиям
+    """
+    images_with_renditions = []
+    for image in images:
+        images_with_renditions.append(image)
+        images_with_renditions.extend(get_rendition_paths(image).values())
+    return images_with_renditions
+
+
+async def delete_unreferenced_images(
+    images: Sequence[str], session: AsyncSession,
+) -> None:
+    """
+    Функция для удаления изображений без ссылок вместе с их копиями.
+
+    Вызывается после фиксации удаления записей твит медиа. Файлы удаляются
+    до фиксации транзакции, в которой изображения заблокированы.
+    :param images: изображения удалённых твит медиа
+    :param session: асинхронная сессия
+    """
+    unreferenced_images = await get_unreferenced_images(images, session)
+    await delete_all_tweet_images(
+        get_images_with_renditions(unreferenced_images),
+    )
+    await session.commit()
+
+
+def save_rendition(
+    rendition_image: Image.Image,
+    rendition_path: str,
+    image_format: str,
+    **save_params: Any,
+) -> None:
+    """
+    Функция для сохранения копии изображения.
+
+    Копия записывается во временный файл рядом с копией и переносится на
+    её место, поэтому по пути копии не отдаётся частично записанный файл.
+    :param rendition_image: копия изображения
+    :param rendition_path: путь к копии
+    :param image_format: формат копии
+    :param save_params: параметры сохранения формата
+    :raises BaseException: ошибка записи копии
+    """
+    tmp_rendition_path = "{path}.{name}.tmp".format(
+        path=rendition_path, name=uuid4().hex,
+    )
+    try:
+        rendition_image.save(tmp_rendition_path, image_format, **save_params)
+    except BaseException:  # noqa: WPS424
+        with suppress(FileNotFoundError):
+            os.remove(tmp_rendition_path)
+        raise
+    os.replace(tmp_rendition_path, rendition_path)
+
+
+def render_image_renditions(image_path: str) -> dict[str, str]:
+    """
+    Функция для создания уменьшенных копий изображения.
+
+    Выполняется в отдельном процессе. Уже созданные копии не пересоздаются.
+    :param image_path: путь к исходному изображению
+    :return: пути к копиям изображения
+    """
+    rendition_paths = get_rendition_paths(image_path)
+    if all(os.path.isfile(path) for path in rendition_paths.values()):
+        return rendition_paths
+    with Image.open(image_path) as source_image:
+        medium_image = ImageOps.exif_transpose(source_image)
+    medium_image.thumbnail(MEDIUM_SIZE)
+    webp_mode = "RGBA" if medium_image.mode in TRANSPARENT_MODES else "RGB"
+    save_rendition(
+        medium_image.convert(webp_mode),
+        rendition_paths["webp"],
+        "WEBP",
+        quality=WEBP_QUALITY,
+    )
+    medium_image = medium_image.convert("RGB")
+    save_rendition(
+        medium_image,
+        rendition_paths["medium"],
+        "JPEG",
+        quality=JPEG_QUALITY,
+        optimize=True,
+        progressive=True,
+    )
+    medium_image.thumbnail(THUMBNAIL_SIZE)
+    save_rendition(
+        medium_image,
+        rendition_paths["thumbnail"],
+        "JPEG",
+        quality=JPEG_QUALITY,
+        optimize=True,
+    )
+    return rendition_paths
+
+
+class RenditionsPool:
+    """
+    Пул процессов для создания копий изображений, создаваемый лениво.
+
+    Процессы запускаются методом spawn, так как процесс приложения
+    многопоточный, и дочерний процесс, созданный через fork, может
+    унаследовать захваченные другими потоками блокировки.
+    """
+
+    def __init__(self, max_workers: int) -> None:
+        """
+        Метод для инициализации пула.
+
+        :param max_workers: количество процессов
+        """
+        self.max_workers = max_workers
+        self.executor: ProcessPoolExecutor | None = None
+
+    def start(self) -> ProcessPoolExecutor:
+        """
+        Метод для запуска пула процессов, если он ещё не запущен.
+
+        :return: пул процессов
+        """
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self.executor
+
+    async def shutdown(self) -> None:
+        """
+        Метод для остановки пула процессов.
+
+        Пул ожидает завершения выполняемых задач в отдельном потоке, не
+        блокируя цикл событий.
+        """
+        if self.executor is not None:
+            executor = self.executor
+            self.executor = None
+            await asyncio.to_thread(executor.shutdown, cancel_futures=True)
+
+
+renditions_pool = RenditionsPool(MEDIA_RENDITION_WORKERS)
+
+
+async def save_media_renditions(
+    media_id: int,
+    image_path: str,
+    rendition_paths: dict[str, str],
+    session: AsyncSession,
+) -> bool:
+    """
+    Функция для сохранения путей к копиям изображения в записи твит медиа.
+
+    Если твит медиа удалена во время создания копий, удалившая её очистка
+    не видела файлов копий, поэтому изображение без ссылок удаляется
+    вместе с копиями здесь.
+    :param media_id: ID твит медиа
+    :param image_path: путь к исходному изображению
+    :param rendition_paths: пути к копиям изображения
+    :param session: асинхронная сессия
+    :return: True, если запись твит медиа обновлена
+    """
+    update_result = await session.execute(
+        update(TweetMedia).
+        filter_by(id=media_id).
+        values(**rendition_paths),
+    )
+    if not update_result.rowcount:
+        await delete_unreferenced_images([image_path], session)
+        return False
+    await publish_feed_change(session)
+    await session.commit()
+    return True
+
+
+async def create_media_renditions(
+    media_id: int,
+    image_path: str,
+    session_maker: async_sessionmaker[AsyncSession],
+) -> None:
+    """
+    Функция для создания копий изображения твит медиа.
+
+    Копии создаются в пуле процессов, не блокируя цикл событий, после чего
+    пути к ним сохраняются в записи твит медиа, а кэш ленты сбрасывается.
+    :param media_id: ID твит медиа
+    :param image_path: путь к исходному изображению
+    :param session_maker: фабрика асинхронных сессий
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        rendition_paths = await loop.run_in_executor(
+            renditions_pool.start(), render_image_renditions, image_path,
+        )
+    except Exception:
+        logger.exception(
+            "Renditions of media with ID: {media_id} wasn't created",
+            media_id=media_id,
+        )
+        return
+    async with session_maker() as session:
+        renditions_saved = await save_media_renditions(
+            media_id, image_path, rendition_paths, session,
+        )
+    if not renditions_saved:
+        logger.info(
+            "Media with ID: {media_id} was deleted while its renditions "
+            "were created",
+            media_id=media_id,
+        )
+        return
+    await feed_cache.invalidate()
+    logger.info(
+        "Renditions of media with ID: {media_id} was created",
+        media_id=media_id,
+    )
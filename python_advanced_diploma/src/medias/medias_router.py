@@ -3,14 +3,30 @@
 from typing import Annotated
 
 import filetype  # type: ignore
-from fastapi import APIRouter, Depends, Header, Response, UploadFile, status
-from sqlalchemy.ext.asyncio import AsyncSession
-from starlette.responses import JSONResponse
+from fastapi import (
+    APIRouter,
+    BackgroundTasks,
+    Depends,
+    Header,
+    Response,
+    UploadFile,
+    status,
+)
+from fastapi.responses import ORJSONResponse
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
-from python_advanced_diploma.src.config import logger
-from python_advanced_diploma.src.database import get_async_session
+from python_advanced_diploma.src.config import MEDIA_MAX_SIZE, logger
+from python_advanced_diploma.src.database import (
+    get_async_session,
+    get_async_session_maker,
+)
 from python_advanced_diploma.src.medias.medias_models import TweetMedia
+from python_advanced_diploma.src.medias.medias_renditions import (
+    create_media_renditions,
+)
 from python_advanced_diploma.src.medias.medias_router_utils import (
+    FILE_HEADER_SIZE,
+    read_upload_file_chunks,
     save_image_to_disk,
 )
 from python_advanced_diploma.src.medias.medias_schemas import TweetMediaOut
@@ -24,6 +40,7 @@ router = APIRouter(prefix="/api/medias", tags=["Media"])
     "",
     response_model=TweetMediaOut,
     responses={
+        413: {"model": ErrorMessage, "description": "Size Error"},
         415: {"model": ErrorMessage, "description": "Type Error"},
         422: validation_error_response,
     },
@@ -32,46 +49,80 @@ router = APIRouter(prefix="/api/medias", tags=["Media"])
 async def add_new_media(
     api_key: Annotated[str, Header()],
     file: UploadFile,
+    background_tasks: BackgroundTasks,
     session: AsyncSession = Depends(get_async_session),
+    session_maker: async_sessionmaker[AsyncSession] = Depends(
+        get_async_session_maker,
+    ),
 ) -> Response:
     """
     Эндпоинт для загрузки файлов из твита.
 
+    Изображение заблокировано до фиксации записи твит медиа, поэтому
+    параллельное удаление того же изображения не удалит его файл.
+    Уменьшенные копии изображения создаются в фоне после ответа.
     :param api_key: api_key пользователя
     :param file: файл
+    :param background_tasks: фоновые задачи
     :param session: асинхронная сессия
+    :param session_maker: фабрика асинхронных сессий
     :return: ID нового файла
     """
     logger.info(
-        "User with api key: "
-        "{api_key} try to add image with name: {filename}".format(
-            api_key=api_key,
-            filename=file.filename,
-        ),
+        "User with api key: {api_key} try to add image with name: {filename}",
+        api_key=api_key,
+        filename=file.filename,
     )
-    img = await file.read()
-    if filetype.is_image(img):
-        image_path = await save_image_to_disk(api_key, file.filename, img)
+    file_header = await file.read(FILE_HEADER_SIZE)
+    if filetype.is_image(file_header):
+        image_path = await save_image_to_disk(
+            read_upload_file_chunks(file, file_header),
+            filetype.guess_extension(file_header),
+            MEDIA_MAX_SIZE,
+            session,
+        )
+        if image_path is None:
+            logger.warning(
+                "User with api key: {api_key} try to add image with "
+                "filename: {filename} larger than {max_size} bytes",
+                api_key=api_key,
+                filename=file.filename,
+                max_size=MEDIA_MAX_SIZE,
+            )
+            return ORJSONResponse(
+                status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                content={
+                    "result": False,
+                    "error_type": "ValueError",
+                    "error_message": (
+                        "Image size exceeds {max_size} bytes"
+                    ).format(max_size=MEDIA_MAX_SIZE),
+                },
+            )
         tweet_media = TweetMedia(image=image_path)
         session.add(tweet_media)
         await session.commit()
+        background_tasks.add_task(
+            create_media_renditions,
+            tweet_media.id,
+            image_path,
+            session_maker,
+        )
         logger.info(
-            "New media with ID: {tweet_media_id} was added".format(
-                tweet_media_id=tweet_media.id,
-            ),
+            "New media with ID: {tweet_media_id} was added",
+            tweet_media_id=tweet_media.id,
         )
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_201_CREATED,
             content={"result": True, "media_id": tweet_media.id},
         )
     logger.warning(
         "User with api key: {api_key} try to add non image file with filename:"
-        " {filename}".format(
-            api_key=api_key,
-            filename=file.filename,
-        ),
+        " {filename}",
+        api_key=api_key,
+        filename=file.filename,
     )
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
         content={
             "result": False,
@@ -1,44 +1,216 @@
 """Medias router utils file. Use to create util functions."""
 import asyncio
-from datetime import datetime
-from typing import Sequence
+import os
+from contextlib import suppress
+from hashlib import sha256
+from typing import AsyncIterable, AsyncIterator, Iterable, Sequence
+from uuid import uuid4
 
 import aiofiles
-from aiofiles.os import makedirs, remove
+from aiofiles.os import makedirs, remove, replace
+from fastapi import UploadFile
+from sqlalchemy import Text, func, literal, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from python_advanced_diploma.src.config import MEDIA_CHUNK_SIZE
+from python_advanced_diploma.src.medias.medias_models import TweetMedia
 
-async def save_image_to_disk(
-    api_key: str | None, filename: str | None, img: bytes,
-) -> str:
+IMAGES_DIR = "../../images"
+IMAGES_TMP_DIR = "{images_dir}/tmp".format(images_dir=IMAGES_DIR)
+
+# Количество первых байт файла, достаточное для определения его типа
+FILE_HEADER_SIZE = 261
+
+
+async def read_upload_file_chunks(
+    upload_file: UploadFile, file_header: bytes,
+) -> AsyncIterator[bytes]:
     """
-    Функция для сохранения изображения на диск.
+    Функция для чтения загруженного файла частями.
 
-    :param api_key: api_key пользователя
-    :param filename: имя файла
-    :param img: изображение
+    :param upload_file: загруженный файл
+    :param file_header: уже прочитанное начало файла
+    :yield: часть файла
+    """
+    if file_header:
+        yield file_header
+    while True:
+        chunk = await upload_file.read(MEDIA_CHUNK_SIZE)
+        if not chunk:
+            break
+        yield chunk
+
+
+def get_image_path(image_hash: str, extension: str) -> str:
+    """
+    Функция для получения пути к изображению в хранилище.
+
+    Изображения хранятся под именем хэша содержимого и разложены по
+    подкаталогам по первым символам хэша.
+    :param image_hash: хэш содержимого изображения
+    :param extension: расширение изображения
     :return: путь к изображению на диске
     """
-    image_path = "../../images/{api_key}/{now}_{filename}".format(
-        api_key=api_key,
-        now=datetime.now(),
-        filename=filename,
-    )
-    await makedirs(
-        "../../images/{api_key}".format(api_key=api_key),
-        exist_ok=True,
+    return "{images_dir}/{shard}/{subshard}/{image_hash}.{extension}".format(
+        images_dir=IMAGES_DIR,
+        shard=image_hash[:2],
+        subshard=image_hash[2:4],
+        image_hash=image_hash,
+        extension=extension,
     )
+
+
+async def write_image_chunks(
+    image_chunks: AsyncIterable[bytes],
+    image_path: str,
+    max_size: int | None = None,
+) -> str | None:
+    """
+    Функция для записи изображения в файл частями.
+
+    Каталог файла создаётся, если его нет.
+    :param image_chunks: части изображения
+    :param image_path: путь к файлу
+    :param max_size: максимальный размер изображения в байтах
+    :return: хэш содержимого изображения | None, если размер превышен
+    """
+    await makedirs(os.path.dirname(image_path), exist_ok=True)
+    image_hash = sha256()
+    image_size = 0
     async with aiofiles.open(image_path, "wb") as image_file:
-        await image_file.write(img)
+        async for chunk in image_chunks:
+            image_size += len(chunk)
+            if max_size is not None and image_size > max_size:
+                return None
+            image_hash.update(chunk)
+            await image_file.write(chunk)
+    return image_hash.hexdigest()
+
+
+async def lock_images(images: Iterable[str], session: AsyncSession) -> None:
+    """
+    Функция для блокировки изображений до конца транзакции сессии.
+
+    Загрузка изображения и удаление его файла выполняются под блокировкой
+    по хэшу пути, поэтому файл не удаляется, пока на него появляется ссылка.
+    Блокировки берутся в порядке сортировки, чтобы избежать взаимных
+    блокировок.
+    :param images: изображения
+    :param session: асинхронная сессия
+    """
+    image = func.unnest(
+        literal(sorted(set(images)), ARRAY(Text)),
+    ).column_valued("image")
+    await session.execute(
+        select(func.pg_advisory_xact_lock(func.hashtext(image))),
+    )
+
+
+async def store_image(
+    image_chunks: AsyncIterable[bytes],
+    tmp_image_path: str,
+    extension: str,
+    max_size: int | None,
+    session: AsyncSession | None,
+) -> str | None:
+    """
+    Функция для записи изображения во временный файл и переноса в хранилище.
+
+    :param image_chunks: части изображения
+    :param tmp_image_path: путь к временному файлу
+    :param extension: расширение изображения
+    :param max_size: максимальный размер изображения в байтах
+    :param session: асинхронная сессия
+    :return: путь к изображению на диске | None, если размер превышен
+    """
+    image_hash = await write_image_chunks(
+        image_chunks, tmp_image_path, max_size,
+    )
+    if image_hash is None:
+        await remove(tmp_image_path)
+        return None
+    image_path = get_image_path(image_hash, extension)
+    if session is not None:
+        await lock_images([image_path], session)
+    await makedirs(os.path.dirname(image_path), exist_ok=True)
+    await replace(tmp_image_path, image_path)
     return image_path
 
 
+async def save_image_to_disk(
+    image_chunks: AsyncIterable[bytes],
+    extension: str,
+    max_size: int | None = None,
+    session: AsyncSession | None = None,
+) -> str | None:
+    """
+    Функция для сохранения изображения на диск.
+
+    Изображение записывается частями во временный файл, не загружаясь в
+    память целиком, и затем переносится в хранилище под именем хэша своего
+    содержимого, поэтому одинаковые изображения хранятся в одном файле.
+    Если передана сессия, изображение блокируется до конца её транзакции,
+    в которой должна быть добавлена ссылающаяся на него запись. Временный
+    файл удаляется и при ошибке, в том числе при разрыве соединения.
+    :param image_chunks: части изображения
+    :param extension: расширение изображения
+    :param max_size: максимальный размер изображения в байтах
+    :param session: асинхронная сессия
+    :return: путь к изображению на диске | None, если размер превышен
+    :raises BaseException: ошибка записи изображения
+    """
+    tmp_image_path = "{images_tmp_dir}/{name}".format(
+        images_tmp_dir=IMAGES_TMP_DIR,
+        name=uuid4().hex,
+    )
+    try:
+        return await store_image(
+            image_chunks, tmp_image_path, extension, max_size, session,
+        )
+    except BaseException:  # noqa: WPS424
+        with suppress(FileNotFoundError):
+            await remove(tmp_image_path)
+        raise
+
+
+async def get_unreferenced_images(
+    images: Sequence[str], session: AsyncSession,
+) -> list[str]:
+    """
+    Функция для получения изображений, на которые не ссылаются твит медиа.
+
+    Вызывается в новой транзакции после фиксации удаления записей твит
+    медиа. Изображения блокируются до конца транзакции, поэтому их файлы
+    нужно удалить до её фиксации.
+    :param images: изображения удалённых твит медиа
+    :param session: асинхронная сессия
+    :return: изображения без ссылок
+    """
+    if not images:
+        return []
+    await lock_images(images, session)
+    references_query = (
+        select(TweetMedia.image, func.count()).
+        filter(TweetMedia.image.in_(set(images))).
+        group_by(TweetMedia.image)
+    )
+    references_result = await session.execute(references_query)
+    references = dict(references_result.tuples().all())
+    return [image for image in set(images) if not references.get(image)]
+
+
 async def delete_image(tweet_image: str) -> None:
     """
     Функция для удаления изображения твит медиа.
 
+    Изображение могло быть уже удалено при удалении другого твита.
     :param tweet_image: изображение
     """
-    await remove(tweet_image)
+    try:
+        await remove(tweet_image)
+    except FileNotFoundError:
+        return
 
 
 async def delete_all_tweet_images(tweet_images: Sequence[str]) -> None:
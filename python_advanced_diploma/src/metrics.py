@@ -0,0 +1,781 @@
+"""Project metrics file. Used to record runtime metrics of the application.
+
+Metrics are kept in memory of the process and rendered in the Prometheus
+text exposition format. Every gunicorn worker keeps its own metrics, so
+each sample carries the 'worker' label with the worker process ID, and the
+samples of other workers are shared through the metrics snapshots.
+
+Database queries are counted per HTTP request with engine events, which
+also lets tests assert an upper bound on the queries of an endpoint.
+"""
+
+import os
+import re
+from bisect import bisect_left
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar, Token
+from itertools import accumulate
+from time import perf_counter
+from typing import Any, Callable, Iterator, Mapping, Sequence, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from python_advanced_diploma.src.config import (
+    DB_REPEATED_QUERY_THRESHOLD,
+    logger,
+)
+
+LabelValues = tuple[str, ...]
+Sample = tuple[str, LabelValues, LabelValues, float]
+MetricsSamples = Mapping[str, Sequence[Sample]]
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1, 2.5, 5, 7.5, 10,
+)
+POOL_CHECKOUT_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30,
+)
+QUERIES_PER_REQUEST_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+UNMATCHED_ROUTE = "unmatched"
+METRICS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LABEL_VALUE_SPECIAL_CHARS = re.compile(r'([\\"])')
+
+
+class RequestQueries:
+    """
+    Счётчик запросов к БД, выполненных при обработке запроса.
+
+    Запросы учитываются также во внешнем счётчике parent, например в
+    счётчике теста, внутри которого обрабатывается запрос.
+    """
+
+    def __init__(
+        self,
+        parent: "RequestQueries | None" = None,
+        scope: Scope | None = None,
+    ) -> None:
+        """
+        Метод для инициализации счётчика.
+
+        :param parent: внешний счётчик
+        :param scope: данные HTTP запроса
+        """
+        self.parent = parent
+        self.scope = scope
+        self.count = 0
+        self.duration: float = 0
+        self.statements: dict[str, int] = {}
+
+    def get_repeated_statements(self, threshold: int) -> list[str]:
+        """
+        Метод для получения запросов, выполненных много раз.
+
+        Один и тот же запрос, выполненный для каждой строки результата
+        другого запроса, обычно означает проблему N+1 запросов.
+        :param threshold: количество выполнений повторяющегося запроса
+        :return: тексты повторяющихся запросов
+        """
+        return [
+            statement
+            for statement, statement_count in self.statements.items()
+            if statement_count >= threshold
+        ]
+
+
+request_queries: ContextVar[RequestQueries | None] = ContextVar(
+    "request_queries", default=None,
+)
+
+
+def get_route_path(scope: Scope) -> str:
+    """
+    Функция для получения шаблона пути маршрута запроса.
+
+    :param scope: данные HTTP запроса
+    :return: шаблон пути | UNMATCHED_ROUTE, если маршрут не найден
+    """
+    route = scope.get("route")
+    return route.path if route is not None else UNMATCHED_ROUTE
+
+
+def get_current_route_path() -> str | None:
+    """
+    Функция для получения шаблона пути обрабатываемого HTTP запроса.
+
+    :return: шаблон пути | None, если запрос к БД выполнен вне HTTP запроса
+    """
+    current_request_queries = request_queries.get()
+    while current_request_queries is not None:
+        if current_request_queries.scope is not None:
+            return get_route_path(current_request_queries.scope)
+        current_request_queries = current_request_queries.parent
+    return None
+
+
+def escape_label_value(label_value: str) -> str:
+    """
+    Функция для экранирования значения метки.
+
+    :param label_value: значение метки
+    :return: экранированное значение
+    """
+    return LABEL_VALUE_SPECIAL_CHARS.sub(r"\\\1", label_value).replace(
+        "\n", r"\n",
+    )
+
+
+def format_labels(label_names: LabelValues, label_values: LabelValues) -> str:
+    """
+    Функция для форматирования меток образца метрики.
+
+    :param label_names: имена меток
+    :param label_values: значения меток
+    :return: метки в формате Prometheus
+    """
+    return ",".join(
+        '{name}="{value}"'.format(
+            name=label_name, value=escape_label_value(label_value),
+        )
+        for label_name, label_value in zip(label_names, label_values)
+    )
+
+
+class Metric:
+    """Метрика с набором меток."""
+
+    metric_type = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, label_names: LabelValues = (),
+    ) -> None:
+        """
+        Метод для инициализации метрики.
+
+        :param name: имя метрики
+        :param documentation: описание метрики
+        :param label_names: имена меток
+        """
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+
+    def collect(self) -> Iterator[Sample]:
+        """
+        Метод для получения образцов метрики.
+
+        :return: имена образцов, имена и значения меток, значения
+        """
+        return iter(())
+
+
+class Counter(Metric):
+    """Монотонно возрастающий счётчик. Родитель: Metric."""
+
+    metric_type = "counter"
+
+    def __init__(
+        self, name: str, documentation: str, label_names: LabelValues = (),
+    ) -> None:
+        """
+        Метод для инициализации счётчика.
+
+        :param name: имя метрики
+        :param documentation: описание метрики
+        :param label_names: имена меток
+        """
+        super().__init__(name, documentation, label_names)
+        self.values: dict[LabelValues, float] = {}
+
+    def inc(self, label_values: LabelValues = (), amount: float = 1) -> None:
+        """
+        Метод для увеличения значения.
+
+        :param label_values: значения меток
+        :param amount: величина увеличения
+        """
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def collect(self) -> Iterator[Sample]:
+        """
+        Метод для получения образцов метрики.
+
+        :yield: имя образца, имена и значения меток, значение
+        """
+        yield from (
+            (self.name, self.label_names, label_values, metric_value)
+            for label_values, metric_value in self.values.items()
+        )
+
+
+class Gauge(Counter):
+    """Значение, которое может уменьшаться. Родитель: Counter."""
+
+    metric_type = "gauge"
+
+    def dec(self, label_values: LabelValues = (), amount: float = 1) -> None:
+        """
+        Метод для уменьшения значения.
+
+        :param label_values: значения меток
+        :param amount: величина уменьшения
+        """
+        self.inc(label_values, -amount)
+
+    def set(self, label_values: LabelValues, metric_value: float) -> None:
+        """
+        Метод для установки значения.
+
+        :param label_values: значения меток
+        :param metric_value: значение
+        """
+        self.values[label_values] = metric_value
+
+
+class Histogram(Metric):
+    """Распределение наблюдаемых значений по корзинам. Родитель: Metric."""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: LabelValues = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> None:
+        """
+        Метод для инициализации гистограммы.
+
+        :param name: имя метрики
+        :param documentation: описание метрики
+        :param label_names: имена меток
+        :param buckets: верхние границы корзин по возрастанию
+        """
+        super().__init__(name, documentation, label_names)
+        self.buckets = buckets
+        self.bucket_counts: dict[LabelValues, list[int]] = {}
+        self.sums: dict[LabelValues, float] = {}
+
+    def observe(
+        self, observed_value: float, label_values: LabelValues = (),
+    ) -> None:
+        """
+        Метод для записи наблюдаемого значения.
+
+        Значения больше последней границы попадают в корзину '+Inf'.
+        :param observed_value: наблюдаемое значение
+        :param label_values: значения меток
+        """
+        bucket_counts = self.bucket_counts.get(label_values)
+        if bucket_counts is None:
+            bucket_counts = [0 for _ in range(len(self.buckets) + 1)]
+            self.bucket_counts[label_values] = bucket_counts
+            self.sums[label_values] = 0
+        bucket_counts[bisect_left(self.buckets, observed_value)] += 1
+        self.sums[label_values] += observed_value
+
+    def observe_since(
+        self, started_at: float, label_values: LabelValues = (),
+    ) -> None:
+        """
+        Метод для записи времени, прошедшего с начала измерения.
+
+        :param started_at: время начала измерения по perf_counter
+        :param label_values: значения меток
+        """
+        self.observe(perf_counter() - started_at, label_values)
+
+    def collect(self) -> Iterator[Sample]:
+        """
+        Метод для получения образцов метрики.
+
+        :yield: имя образца, имена и значения меток, значение
+        """
+        for label_values, bucket_counts in self.bucket_counts.items():
+            yield from self.collect_buckets(label_values, bucket_counts)
+            yield (
+                "{name}_sum".format(name=self.name),
+                self.label_names,
+                label_values,
+                self.sums[label_values],
+            )
+            yield (
+                "{name}_count".format(name=self.name),
+                self.label_names,
+                label_values,
+                sum(bucket_counts),
+            )
+
+    def collect_buckets(
+        self, label_values: LabelValues, bucket_counts: list[int],
+    ) -> Iterator[Sample]:
+        """
+        Метод для получения образцов корзин гистограммы.
+
+        Количество значений в корзинах накапливается, как требует формат.
+        :param label_values: значения меток
+        :param bucket_counts: количество значений в корзинах
+        :yield: имя образца, имена и значения меток, значение
+        """
+        bucket_name = "{name}_bucket".format(name=self.name)
+        le_names = (*self.label_names, "le")
+        le_values = [
+            (*label_values, str(bound)) for bound in (*self.buckets, "+Inf")
+        ]
+        yield from (
+            (bucket_name, le_names, bucket_labels, count)
+            for bucket_labels, count in zip(
+                le_values, accumulate(bucket_counts),
+            )
+        )
+
+
+class CallbackMetric(Metric):
+    """
+    Метрика, значения которой вычисляются при сборе. Родитель: Metric.
+
+    Используется для показателей, которые уже считаются в других местах
+    приложения, например статистики кэшей и пула соединений.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        label_names: LabelValues,
+        callback: Callable[[], dict[LabelValues, float]],
+    ) -> None:
+        """
+        Метод для инициализации метрики.
+
+        :param name: имя метрики
+        :param documentation: описание метрики
+        :param label_names: имена меток
+        :param callback: функция, возвращающая значения по меткам
+        """
+        super().__init__(name, documentation, label_names)
+        self.callback = callback
+
+    def collect(self) -> Iterator[Sample]:
+        """
+        Метод для получения образцов метрики.
+
+        :yield: имя образца, имена и значения меток, значение
+        """
+        yield from (
+            (self.name, self.label_names, label_values, metric_value)
+            for label_values, metric_value in self.callback().items()
+        )
+
+
+class CallbackCounter(CallbackMetric):
+    """Счётчик, вычисляемый при сборе. Родитель: CallbackMetric."""
+
+    metric_type = "counter"
+
+
+class CallbackGauge(CallbackMetric):
+    """Значение, вычисляемое при сборе. Родитель: CallbackMetric."""
+
+    metric_type = "gauge"
+
+
+MetricType = TypeVar("MetricType", bound=Metric)
+
+
+def format_metric_header(metric: Metric) -> tuple[str, str]:
+    """
+    Функция для форматирования описания и типа метрики.
+
+    :param metric: метрика
+    :return: строки описания и типа метрики
+    """
+    return (
+        "# HELP {name} {documentation}".format(
+            name=metric.name, documentation=metric.documentation,
+        ),
+        "# TYPE {name} {metric_type}".format(
+            name=metric.name, metric_type=metric.metric_type,
+        ),
+    )
+
+
+def format_sample(worker: str, sample: Sample) -> str:
+    """
+    Функция для форматирования образца метрики.
+
+    :param worker: ID процесса, записавшего образец
+    :param sample: имя образца, имена и значения меток, значение
+    :return: образец в формате Prometheus
+    """
+    sample_name, label_names, label_values, metric_value = sample
+    return "{name}{{{labels}}} {value}".format(
+        name=sample_name,
+        labels=format_labels(
+            ("worker", *label_names), (worker, *label_values),
+        ),
+        value=float(metric_value),
+    )
+
+
+class MetricsRegistry:
+    """Набор метрик процесса."""
+
+    def __init__(self) -> None:
+        """Метод для инициализации набора метрик."""
+        self.metrics: dict[str, Metric] = {}
+
+    def register(self, metric: MetricType) -> MetricType:
+        """
+        Метод для добавления метрики в набор.
+
+        :param metric: метрика
+        :return: метрика
+        """
+        self.metrics[metric.name] = metric
+        return metric
+
+    def collect(self) -> dict[str, list[Sample]]:
+        """
+        Метод для получения образцов метрик процесса.
+
+        :return: образцы по именам метрик
+        """
+        return {
+            metric_name: list(metric.collect())
+            for metric_name, metric in self.metrics.items()
+        }
+
+    def render(
+        self, other_workers: Mapping[str, MetricsSamples] | None = None,
+    ) -> str:
+        """
+        Метод для получения метрик в текстовом формате Prometheus.
+
+        Образцы процесса выводятся вместе с образцами других процессов.
+        :param other_workers: образцы метрик других процессов по их ID
+        :return: метрики
+        """
+        workers = {str(os.getpid()): self.collect(), **(other_workers or {})}
+        lines: list[str] = []
+        for metric in self.metrics.values():
+            lines.extend(format_metric_header(metric))
+            for worker, worker_samples in workers.items():
+                lines.extend(
+                    format_sample(worker, sample)
+                    for sample in worker_samples.get(metric.name, ())
+                )
+        lines.append("")
+        return "\n".join(lines)
+
+
+registry = MetricsRegistry()
+
+http_requests_in_progress = registry.register(
+    Gauge(
+        "http_requests_in_progress",
+        "HTTP requests being processed.",
+        label_names=("method",),
+    ),
+)
+http_request_duration_seconds = registry.register(
+    Histogram(
+        "http_request_duration_seconds",
+        "HTTP request processing time in seconds.",
+        label_names=("method", "route", "status"),
+    ),
+)
+db_queries_per_request = registry.register(
+    Histogram(
+        "db_queries_per_request",
+        "Database queries executed while processing an HTTP request.",
+        label_names=("method", "route"),
+        buckets=QUERIES_PER_REQUEST_BUCKETS,
+    ),
+)
+db_time_per_request_seconds = registry.register(
+    Histogram(
+        "db_time_per_request_seconds",
+        "Database query time spent while processing an HTTP request.",
+        label_names=("method", "route"),
+    ),
+)
+db_queries_total = registry.register(
+    Counter("db_queries_total", "Database queries executed."),
+)
+db_query_duration_seconds = registry.register(
+    Histogram(
+        "db_query_duration_seconds",
+        "Database query execution time in seconds.",
+    ),
+)
+db_pool_checkout_wait_seconds = registry.register(
+    Histogram(
+        "db_pool_checkout_wait_seconds",
+        "Time spent waiting for a connection from the pool in seconds.",
+        buckets=POOL_CHECKOUT_BUCKETS,
+    ),
+)
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+    """
+    Пул соединений, измеряющий ожидание соединения.
+
+    Родитель: AsyncAdaptedQueuePool.
+    """
+
+    def _do_get(self) -> Any:
+        """
+        Метод для получения соединения из пула.
+
+        Ожидание записывается и при ошибке получения соединения.
+        :return: запись соединения пула
+        """
+        with ExitStack() as stack:
+            stack.callback(
+                db_pool_checkout_wait_seconds.observe_since, perf_counter(),
+            )
+            return super()._do_get()
+
+
+def start_query(**event_args: Any) -> None:
+    """
+    Функция для учёта запроса к БД перед его выполнением.
+
+    :param event_args: аргументы события 'before_cursor_execute'
+    """
+    db_queries_total.inc()
+    statement = event_args["statement"]
+    current_request_queries = request_queries.get()
+    while current_request_queries is not None:
+        current_request_queries.count += 1
+        if DB_REPEATED_QUERY_THRESHOLD:
+            current_request_queries.statements[statement] = (
+                current_request_queries.statements.get(statement, 0) + 1
+            )
+        current_request_queries = current_request_queries.parent
+    if event_args["context"] is not None:
+        event_args["context"].query_started_at = perf_counter()
+
+
+def get_query_duration(context: Any) -> float | None:
+    """
+    Функция для получения времени выполнения запроса к БД.
+
+    :param context: контекст выполнения запроса | None
+    :return: время выполнения в секундах | None, если начало не записано
+    """
+    started_at = getattr(context, "query_started_at", None)
+    if started_at is None:
+        return None
+    return perf_counter() - started_at
+
+
+def finish_query(**event_args: Any) -> None:
+    """
+    Функция для учёта времени выполнения запроса к БД.
+
+    :param event_args: аргументы события 'after_cursor_execute'
+    """
+    duration = get_query_duration(event_args["context"])
+    if duration is None:
+        return
+    db_query_duration_seconds.observe(duration)
+    current_request_queries = request_queries.get()
+    while current_request_queries is not None:
+        current_request_queries.duration += duration
+        current_request_queries = current_request_queries.parent
+
+
+def instrument_engine(engine: AsyncEngine) -> None:
+    """
+    Функция для подключения учёта запросов к движку.
+
+    :param engine: асинхронный движок
+    """
+    event.listen(
+        engine.sync_engine, "before_cursor_execute", start_query, named=True,
+    )
+    event.listen(
+        engine.sync_engine, "after_cursor_execute", finish_query, named=True,
+    )
+
+
+@contextmanager
+def count_queries() -> Iterator[RequestQueries]:
+    """
+    Функция для подсчёта запросов к БД, выполненных внутри блока.
+
+    Учитываются запросы инструментированных движков, выполненные в текущем
+    контексте, в том числе при обработке HTTP запросов.
+    :yield: счётчик запросов
+    """
+    current_request_queries = RequestQueries(parent=request_queries.get())
+    with ExitStack() as stack:
+        stack.callback(
+            request_queries.reset,
+            request_queries.set(current_request_queries),
+        )
+        yield current_request_queries
+
+
+def log_request_queries(
+    method: str, route_path: str, current_request_queries: RequestQueries,
+) -> None:
+    """
+    Функция для логирования запросов к БД, выполненных при обработке запроса.
+
+    :param method: HTTP метод запроса
+    :param route_path: шаблон пути маршрута
+    :param current_request_queries: счётчик запросов к БД
+    """
+    logger.debug(
+        "{method} {route} executed {query_count} queries in "
+        "{query_duration_ms} ms",
+        method=method,
+        route=route_path,
+        query_count=current_request_queries.count,
+        query_duration_ms=round(current_request_queries.duration * 1000, 3),
+    )
+    if not DB_REPEATED_QUERY_THRESHOLD:
+        return
+    repeated_statements = current_request_queries.get_repeated_statements(
+        DB_REPEATED_QUERY_THRESHOLD,
+    )
+    if repeated_statements:
+        logger.warning(
+            "Possible N+1 queries in {method} {route}: {statements}",
+            method=method,
+            route=route_path,
+            statements=repeated_statements,
+        )
+
+
+def get_request_queries_headers(
+    current_request_queries: RequestQueries,
+) -> list[tuple[bytes, bytes]]:
+    """
+    Функция для получения заголовков с запросами к БД.
+
+    :param current_request_queries: счётчик запросов к БД
+    :return: заголовки ответа
+    """
+    return [
+        (b"x-db-query-count", str(current_request_queries.count).encode()),
+        (
+            b"x-db-query-duration-ms",
+            str(round(current_request_queries.duration * 1000, 3)).encode(),
+        ),
+    ]
+
+
+class RequestMetrics:
+    """Метрики обрабатываемого HTTP запроса."""
+
+    def __init__(self, scope: Scope, send: Send, debug: bool) -> None:
+        """
+        Метод для инициализации метрик запроса.
+
+        :param scope: данные запроса
+        :param send: функция отправки сообщений
+        :param debug: добавлять заголовки с запросами к БД
+        """
+        self.method = scope["method"]
+        self.response_status = "500"
+        self.queries = RequestQueries(
+            parent=request_queries.get(), scope=scope,
+        )
+        self.started_at = perf_counter()
+        self.debug = debug
+        self.downstream_send = send
+
+    async def send(self, message: Message) -> None:
+        """
+        Метод для отправки сообщения с записью статуса ответа.
+
+        :param message: сообщение
+        """
+        if message["type"] == "http.response.start":
+            self.response_status = str(message["status"])
+            if self.debug:
+                message = {
+                    **message,
+                    "headers": [
+                        *message.get("headers", []),
+                        *get_request_queries_headers(self.queries),
+                    ],
+                }
+        await self.downstream_send(message)
+
+    def start(self) -> Token[RequestQueries | None]:
+        """
+        Метод для начала обработки запроса.
+
+        :return: токен для восстановления внешнего счётчика запросов к БД
+        """
+        http_requests_in_progress.inc((self.method,))
+        self.started_at = perf_counter()
+        return request_queries.set(self.queries)
+
+    def finish(self, queries_token: Token[RequestQueries | None]) -> None:
+        """
+        Метод для записи метрик обработанного запроса.
+
+        :param queries_token: токен, полученный при начале обработки
+        """
+        http_requests_in_progress.dec((self.method,))
+        request_queries.reset(queries_token)
+        route_path = get_route_path(self.queries.scope or {})
+        http_request_duration_seconds.observe_since(
+            self.started_at, (self.method, route_path, self.response_status),
+        )
+        db_queries_per_request.observe(
+            self.queries.count, (self.method, route_path),
+        )
+        db_time_per_request_seconds.observe(
+            self.queries.duration, (self.method, route_path),
+        )
+        log_request_queries(self.method, route_path, self.queries)
+
+
+class MetricsMiddleware:
+    """
+    Промежуточный слой, записывающий метрики HTTP запросов.
+
+    Метка 'route' содержит шаблон пути маршрута, а не сам путь, чтобы
+    количество наборов меток не зависело от ID в запросах. В отладочном
+    режиме количество и время запросов к БД добавляются в заголовки ответа.
+    """
+
+    def __init__(self, app: ASGIApp, debug: bool = False) -> None:
+        """
+        Метод для инициализации промежуточного слоя.
+
+        :param app: ASGI приложение
+        :param debug: добавлять заголовки с запросами к БД
+        """
+        self.app = app
+        self.debug = debug
+
+    async def __call__(
+        self, scope: Scope, receive: Receive, send: Send,
+    ) -> None:
+        """
+        Метод для обработки запроса.
+
+        Метрики записываются и при ошибке обработки запроса.
+        :param scope: данные запроса
+        :param receive: функция получения сообщений
+        :param send: функция отправки сообщений
+        """
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_metrics = RequestMetrics(scope, send, self.debug)
+        with ExitStack() as stack:
+            stack.callback(request_metrics.finish, request_metrics.start())
+            await self.app(scope, receive, request_metrics.send)
@@ -0,0 +1,180 @@
+"""Metrics router file. Used to define the metrics route."""
+
+from types import MappingProxyType
+from typing import Callable, Mapping
+
+from fastapi import APIRouter, Request, Response, status
+
+from python_advanced_diploma.src.cache import SingleFlight
+from python_advanced_diploma.src.config import METRICS_PORT
+from python_advanced_diploma.src.database import engines, recent_writers_cache
+from python_advanced_diploma.src.metrics import (
+    METRICS_CONTENT_TYPE,
+    CallbackCounter,
+    CallbackGauge,
+    LabelValues,
+    registry,
+)
+from python_advanced_diploma.src.metrics_snapshots import metrics_snapshots
+from python_advanced_diploma.src.routers_utils import api_key_cache
+from python_advanced_diploma.src.tweets.tweets_feed_cache import (
+    feed_cache,
+    feed_flight,
+)
+from python_advanced_diploma.src.tweets.tweets_likes_buffer import (
+    likes_buffer,
+)
+from python_advanced_diploma.src.users.users_router_utils import (
+    profile_flight,
+)
+
+router = APIRouter(tags=["Metrics"])
+
+CacheStats = Callable[[], dict[str, int]]
+
+CACHES_STATS: Mapping[str, CacheStats] = MappingProxyType({
+    "api_key": api_key_cache.stats,
+    "recent_writers": recent_writers_cache.stats,
+    "feed": feed_cache.stats,
+})
+SINGLE_FLIGHTS: Mapping[str, SingleFlight[bytes]] = MappingProxyType({
+    "feed": feed_flight,
+    "profile": profile_flight,
+})
+
+
+def collect_cache_events() -> dict[LabelValues, float]:
+    """
+    Функция для сбора количества обращений к кэшам.
+
+    :return: количество обращений по кэшам и их результатам
+    """
+    return {
+        (cache_name, cache_event): event_count
+        for cache_name, cache_stats in CACHES_STATS.items()
+        for cache_event, event_count in cache_stats().items()
+        if cache_event != "size"
+    }
+
+
+def collect_single_flight_calls() -> dict[LabelValues, float]:
+    """
+    Функция для сбора количества выполненных и объединённых вызовов.
+
+    :return: количество вызовов по объединениям и их результатам
+    """
+    single_flight_calls: dict[LabelValues, float] = {}
+    for flight_name, single_flight in SINGLE_FLIGHTS.items():
+        single_flight_calls[(flight_name, "executed")] = (
+            single_flight.executions
+        )
+        single_flight_calls[(flight_name, "coalesced")] = (
+            single_flight.coalesced
+        )
+    return single_flight_calls
+
+
+def collect_likes_queue_events() -> dict[LabelValues, float]:
+    """
+    Функция для сбора количества записанных лайков и ошибок записи.
+
+    :return: количество событий очереди лайков
+    """
+    likes_buffer_stats = likes_buffer.stats()
+    return {
+        ("flushed_likes",): likes_buffer_stats["flushed"],
+        ("failed_flushes",): likes_buffer_stats["failed_flushes"],
+    }
+
+
+def collect_pool_connections() -> dict[LabelValues, float]:
+    """
+    Функция для сбора состояния пулов соединений.
+
+    :return: количество соединений по движкам и состояниям
+    """
+    pool_connections: dict[LabelValues, float] = {}
+    for engine_name, engine in engines.items():
+        pool_status = engine.pool
+        pool_connections[(engine_name, "checked_out")] = (
+            pool_status.checkedout()  # type: ignore[attr-defined]
+        )
+        pool_connections[(engine_name, "idle")] = (
+            pool_status.checkedin()  # type: ignore[attr-defined]
+        )
+    return pool_connections
+
+
+registry.register(
+    CallbackCounter(
+        "cache_events_total",
+        "Cache lookups and evictions by result.",
+        label_names=("cache", "event"),
+        callback=collect_cache_events,
+    ),
+)
+registry.register(
+    CallbackCounter(
+        "single_flight_calls_total",
+        "Single-flight calls executed or coalesced into a running call.",
+        label_names=("flight", "result"),
+        callback=collect_single_flight_calls,
+    ),
+)
+registry.register(
+    CallbackCounter(
+        "likes_queue_events_total",
+        "Queued likes written to the database and failed queue flushes.",
+        label_names=("event",),
+        callback=collect_likes_queue_events,
+    ),
+)
+registry.register(
+    CallbackGauge(
+        "likes_queue_size",
+        "Likes waiting in the write-behind queue.",
+        label_names=(),
+        callback=lambda: {(): likes_buffer.stats()["queued"]},
+    ),
+)
+registry.register(
+    CallbackGauge(
+        "db_pool_connections",
+        "Database pool connections by state.",
+        label_names=("engine", "state"),
+        callback=collect_pool_connections,
+    ),
+)
+
+
+def is_metrics_port(request: Request) -> bool:
+    """
+    Функция для проверки, что запрос получен на порт метрик.
+
+    Порт берётся из адреса сервера, принявшего соединение, а не из
+    заголовка 'Host', который задаёт клиент.
+    :param request: HTTP запрос
+    :return: True, если порт метрик не задан или совпадает с портом сервера
+    """
+    if not METRICS_PORT:
+        return True
+    server = request.scope.get("server")
+    return server is not None and server[1] == METRICS_PORT
+
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics(request: Request) -> Response:
+    """
+    Эндпоинт для получения метрик процессов в формате Prometheus.
+
+    Метрики доступны только на внутреннем порту METRICS_PORT, если он
+    задан, и включают снимки метрик других процессов из METRICS_DIR.
+    :param request: HTTP запрос
+    :return: response
+    """
+    if not is_metrics_port(request):
+        return Response(status_code=status.HTTP_404_NOT_FOUND)
+    return Response(
+        content=registry.render(metrics_snapshots.read()),
+        media_type=METRICS_CONTENT_TYPE,
+    )
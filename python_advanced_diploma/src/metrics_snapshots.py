@@ -0,0 +1,192 @@
+"""Metrics snapshots file. Used to share metrics between worker processes.
+
+Every gunicorn worker keeps its own metrics in memory, so a scrape served
+by one worker would miss the samples of the others. When METRICS_DIR is
+set, every worker periodically writes its samples to a file of the shared
+directory, and the metrics route renders them together with its own.
+"""
+
+import asyncio
+import json
+import os
+from contextlib import suppress
+from glob import glob
+from time import time
+from typing import Iterator
+
+from python_advanced_diploma.src.config import (
+    METRICS_DIR,
+    METRICS_SNAPSHOT_INTERVAL,
+    logger,
+)
+from python_advanced_diploma.src.metrics import (
+    MetricsRegistry,
+    MetricsSamples,
+    Sample,
+    registry,
+)
+
+SNAPSHOT_EXTENSION = ".json"
+# Снимок, не обновлявшийся дольше этого количества интервалов, считается
+# снимком завершённого процесса
+STALE_SNAPSHOT_INTERVALS = 3
+
+
+def get_snapshot_path(directory: str, worker: str) -> str:
+    """
+    Функция для получения пути к снимку метрик процесса.
+
+    :param directory: общий каталог снимков
+    :param worker: ID процесса
+    :return: путь к снимку
+    """
+    return os.path.join(
+        directory,
+        "{worker}{extension}".format(
+            worker=worker, extension=SNAPSHOT_EXTENSION,
+        ),
+    )
+
+
+def parse_sample(
+    sample_name: str,
+    label_names: list[str],
+    label_values: list[str],
+    metric_value: float,
+) -> Sample:
+    """
+    Функция для восстановления образца метрики из снимка.
+
+    :param sample_name: имя образца
+    :param label_names: имена меток
+    :param label_values: значения меток
+    :param metric_value: значение
+    :return: образец метрики
+    """
+    return sample_name, tuple(label_names), tuple(label_values), metric_value
+
+
+def load_snapshot(snapshot_path: str) -> MetricsSamples:
+    """
+    Функция для чтения снимка метрик процесса.
+
+    :param snapshot_path: путь к снимку
+    :return: образцы по именам метрик
+    """
+    with open(snapshot_path) as snapshot_file:
+        snapshot = json.load(snapshot_file)
+    return {
+        metric_name: [parse_sample(*sample) for sample in samples]
+        for metric_name, samples in snapshot.items()
+    }
+
+
+def is_live_snapshot(snapshot_path: str, stale_before: float) -> bool:
+    """
+    Функция для проверки, что снимок обновлялся недавно.
+
+    :param snapshot_path: путь к снимку
+    :param stale_before: время, до которого снимок считается устаревшим
+    :return: True, если снимок обновлялся не раньше stale_before
+    """
+    try:
+        return os.path.getmtime(snapshot_path) >= stale_before
+    except FileNotFoundError:
+        return False
+
+
+class MetricsSnapshots:
+    """
+    Снимки метрик процессов приложения в общем каталоге.
+
+    Снимок процесса перезаписывается раз в интервал целиком, поэтому
+    другие процессы не читают частично записанный снимок.
+    """
+
+    def __init__(
+        self,
+        metrics_registry: MetricsRegistry,
+        directory: str,
+        interval: float,
+    ) -> None:
+        """
+        Метод для инициализации снимков.
+
+        :param metrics_registry: набор метрик процесса
+        :param directory: общий каталог снимков | пустая строка
+        :param interval: интервал записи снимка в секундах
+        """
+        self.metrics_registry = metrics_registry
+        self.directory = directory
+        self.interval = interval
+        self.task: asyncio.Task[None] | None = None
+
+    def write(self) -> None:
+        """Метод для записи снимка метрик процесса."""
+        snapshot_path = get_snapshot_path(self.directory, str(os.getpid()))
+        temporary_path = "{path}.tmp".format(path=snapshot_path)
+        with open(temporary_path, "w") as snapshot_file:
+            json.dump(self.metrics_registry.collect(), snapshot_file)
+        os.replace(temporary_path, snapshot_path)
+
+    def live_snapshot_paths(self) -> Iterator[tuple[str, str]]:
+        """
+        Метод для получения снимков других процессов.
+
+        Снимки завершённых процессов пропускаются.
+        :yield: ID процесса и путь к его снимку
+        """
+        stale_before = time() - self.interval * STALE_SNAPSHOT_INTERVALS
+        for snapshot_path in glob(get_snapshot_path(self.directory, "*")):
+            worker = os.path.basename(snapshot_path).removesuffix(
+                SNAPSHOT_EXTENSION,
+            )
+            if worker == str(os.getpid()):
+                continue
+            if is_live_snapshot(snapshot_path, stale_before):
+                yield worker, snapshot_path
+
+    def read(self) -> dict[str, MetricsSamples]:
+        """
+        Метод для чтения снимков метрик других процессов.
+
+        :return: образцы метрик по ID процессов
+        """
+        if not self.directory:
+            return {}
+        worker_samples: dict[str, MetricsSamples] = {}
+        for worker, snapshot_path in self.live_snapshot_paths():
+            with suppress(OSError, ValueError):
+                worker_samples[worker] = load_snapshot(snapshot_path)
+        return worker_samples
+
+    async def run(self) -> None:
+        """Метод для периодической записи снимка метрик процесса."""
+        while True:
+            try:
+                self.write()
+            except OSError:
+                logger.exception("Metrics snapshot write failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        """Метод для запуска записи снимков, если задан общий каталог."""
+        if self.directory and self.task is None:
+            os.makedirs(self.directory, exist_ok=True)
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        """Метод для остановки записи снимков и удаления снимка процесса."""
+        if self.task is None:
+            return
+        self.task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self.task
+        self.task = None
+        with suppress(FileNotFoundError):
+            os.remove(get_snapshot_path(self.directory, str(os.getpid())))
+
+
+metrics_snapshots = MetricsSnapshots(
+    registry, METRICS_DIR, METRICS_SNAPSHOT_INTERVAL / 1000,
+)
@@ -1,6 +1,7 @@
 """Responses file. Used to define HTTP responses."""
 from python_advanced_diploma.src.schemas import (
     ErrorMessage,
+    SuccessMessage,
     ValidationErrorMessage,
 )
 
@@ -16,3 +17,7 @@ validation_error_response = {
     "model": ValidationErrorMessage,
     "description": "Validation Error",
 }
+accepted_response = {
+    "model": SuccessMessage,
+    "description": "Accepted",
+}
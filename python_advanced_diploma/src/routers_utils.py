@@ -1,24 +1,97 @@
 """Project routers utils file. Use to create util functions."""
 
+from typing import Any
+
+from fastapi import Response
+from pydantic import BaseModel
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import load_only
 
+from python_advanced_diploma.src.cache import TTLCache
+from python_advanced_diploma.src.config import (
+    API_KEY_CACHE_SIZE,
+    API_KEY_CACHE_TTL,
+    SKIP_RESPONSE_REVALIDATION,
+)
 from python_advanced_diploma.src.users.users_models import User
 
+api_key_cache: TTLCache[int] = TTLCache(
+    maxsize=API_KEY_CACHE_SIZE,
+    ttl=API_KEY_CACHE_TTL,
+)
+
 
 async def get_user_id_by_api_key(api_key: str, session: AsyncSession) -> int:
     """
     Функция для получения ID записи пользователя из БД.
 
+    Результат кэшируется в памяти процесса, поэтому повторные запросы с тем
+    же api_key не обращаются к БД до истечения времени жизни записи.
     :param api_key: api_key пользователя
     :param session: асинхронная сессия
     :return: ID пользователя
     """
+    cached_user_id = api_key_cache.get(api_key)
+    if cached_user_id is not None:
+        return cached_user_id
     query = (
         select(User).
         filter_by(user_api_key=api_key).
         options(load_only(User.id))
     )
     query_result = await session.execute(query)
-    return query_result.scalars().one().id
+    user_id = query_result.scalars().one().id
+    api_key_cache.set(api_key, user_id)
+    return user_id
+
+
+def invalidate_user_api_key(api_key: str) -> None:
+    """
+    Функция для удаления api_key пользователя из кэша.
+
+    Вызывается при изменении или удалении api_key пользователя.
+    :param api_key: api_key пользователя
+    """
+    api_key_cache.invalidate(api_key)
+
+
+def clear_api_key_cache() -> None:
+    """Функция для очистки кэша api_key пользователей."""
+    api_key_cache.clear()
+
+
+def serialize_response_model(
+    response_model: type[BaseModel], content: dict[str, Any],
+) -> bytes:
+    """
+    Функция для сериализации данных ответа по схеме в JSON.
+
+    :param response_model: схема ответа
+    :param content: данные ответа
+    :return: тело ответа
+    """
+    return response_model.model_validate(
+        content, from_attributes=True,
+    ).model_dump_json(by_alias=True).encode()
+
+
+def build_model_response(
+    response_model: type[BaseModel], content: dict[str, Any],
+) -> Response | dict[str, Any]:
+    """
+    Функция для сериализации ответа эндпоинта по его схеме.
+
+    Данные один раз валидируются схемой и сериализуются в JSON средствами
+    pydantic, поэтому FastAPI не валидирует и не кодирует их повторно.
+    При выключенном SKIP_RESPONSE_REVALIDATION данные возвращаются как есть.
+    :param response_model: схема ответа
+    :param content: данные ответа
+    :return: HTTP ответ | данные ответа
+    """
+    if not SKIP_RESPONSE_REVALIDATION:
+        return content
+    return Response(
+        content=serialize_response_model(response_model, content),
+        media_type="application/json",
+    )
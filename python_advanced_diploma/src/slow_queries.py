@@ -0,0 +1,254 @@
+"""Slow queries file. Used to log slow statements and capture their plans.
+
+Statements running longer than DB_SLOW_QUERY_THRESHOLD are logged with the
+shape of their bound parameters, so values of the parameters never get to
+the log. A sampled share of them is explained in a background task on a
+separate connection and the plan is written to QUERY_PLANS_LOG_FILE.
+"""
+
+import asyncio
+import random
+import re
+from itertools import groupby
+from typing import Any, Iterable, Iterator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from python_advanced_diploma.src.config import (
+    DB_SLOW_QUERY_EXPLAIN_CONCURRENCY,
+    DB_SLOW_QUERY_EXPLAIN_RATE,
+    DB_SLOW_QUERY_THRESHOLD,
+    QUERY_PLANS_EXTRA_KEY,
+    logger,
+)
+from python_advanced_diploma.src.metrics import (
+    get_current_route_path,
+    get_query_duration,
+    request_queries,
+)
+
+# EXPLAIN ANALYZE выполняет запрос, поэтому он используется только для
+# чтения без блокировок строк, остальные запросы только планируются.
+LOCKING_CLAUSE = re.compile(
+    r"\bFOR\s+(UPDATE|SHARE|NO\s+KEY\s+UPDATE|KEY\s+SHARE)\b",
+    re.IGNORECASE,
+)
+# Функции с побочными эффектами или ожиданием блокировок: повторное
+# выполнение запроса с ними для EXPLAIN ANALYZE ждало бы блокировок
+# запроса или повторяло бы его действия, например уведомления.
+SIDE_EFFECT_FUNCTION = re.compile(
+    r"\b(pg_(try_)?advisory\w*|pg_notify|pg_sleep\w*|nextval|setval|"
+    r"pg_cancel_backend|pg_terminate_backend|lo_\w+|dblink\w*)\s*\(",
+    re.IGNORECASE,
+)
+
+_explain_tasks: set[asyncio.Task] = set()
+
+
+def format_type_run(
+    type_name: str, same_type_parameters: Iterator[str],
+) -> str:
+    """
+    Функция для форматирования подряд идущих параметров одного типа.
+
+    :param type_name: имя типа параметров
+    :param same_type_parameters: подряд идущие параметры этого типа
+    :return: имя типа | имя типа и количество параметров
+    """
+    run_length = len(list(same_type_parameters))
+    if run_length == 1:
+        return type_name
+    return "{type_name} x {run_length}".format(
+        type_name=type_name, run_length=run_length,
+    )
+
+
+def get_positional_parameters_shape(parameters: Iterable[Any]) -> str:
+    """
+    Функция для получения формы позиционных параметров запроса.
+
+    :param parameters: позиционные параметры запроса
+    :return: типы параметров
+    """
+    parameter_types = (type(parameter).__name__ for parameter in parameters)
+    type_runs = [
+        format_type_run(type_name, same_type_parameters)
+        for type_name, same_type_parameters in groupby(parameter_types)
+    ]
+    return "({type_runs})".format(type_runs=", ".join(type_runs))
+
+
+def get_parameters_shape(parameters: Any, executemany: bool) -> str:
+    """
+    Функция для получения формы параметров запроса без их значений.
+
+    Подряд идущие параметры одного типа сворачиваются, например параметры
+    'IN (...)' из ста ID выводятся как '(int x 100)'.
+    :param parameters: параметры запроса
+    :param executemany: запрос выполняется для нескольких наборов параметров
+    :return: типы параметров
+    """
+    if executemany:
+        if not parameters:
+            return "[]"
+        return "{count} x {shape}".format(
+            count=len(parameters),
+            shape=get_parameters_shape(parameters[0], executemany=False),
+        )
+    if isinstance(parameters, dict):
+        return str({
+            parameter_name: type(parameter_value).__name__
+            for parameter_name, parameter_value in parameters.items()
+        })
+    return get_positional_parameters_shape(parameters or ())
+
+
+def can_analyze(statement: str) -> bool:
+    """
+    Функция для проверки, можно ли выполнить запрос для EXPLAIN ANALYZE.
+
+    :param statement: текст запроса
+    :return: True, если запрос только читает данные без блокировок и не
+        вызывает функций с побочными эффектами
+    """
+    if not statement.lstrip().upper().startswith("SELECT"):
+        return False
+    if SIDE_EFFECT_FUNCTION.search(statement) is not None:
+        return False
+    return LOCKING_CLAUSE.search(statement) is None
+
+
+def should_explain(statement: str, executemany: bool) -> bool:
+    """
+    Функция для выбора медленного запроса, план которого будет записан.
+
+    :param statement: текст запроса
+    :param executemany: запрос выполняется для нескольких наборов параметров
+    :return: True, если запрос попал в выборку DB_SLOW_QUERY_EXPLAIN_RATE
+    """
+    if executemany or statement.lstrip().upper().startswith("EXPLAIN"):
+        return False
+    return random.random() < DB_SLOW_QUERY_EXPLAIN_RATE  # noqa: S311
+
+
+async def explain_statement(
+    engine: AsyncEngine,
+    statement: str,
+    parameters: Any,
+    duration_ms: float,
+    route: str | None,
+) -> None:
+    """
+    Функция для записи плана медленного запроса в лог планов.
+
+    Запрос выполняется в отдельной транзакции, которая откатывается, и не
+    учитывается в запросах HTTP запроса, во время которого запущена задача.
+    :param engine: асинхронный движок
+    :param statement: текст запроса
+    :param parameters: параметры запроса
+    :param duration_ms: время выполнения запроса в миллисекундах
+    :param route: шаблон пути маршрута
+    """
+    request_queries.set(None)
+    explain_options = "(ANALYZE, BUFFERS)" if can_analyze(statement) else ""
+    explain_statement_text = "EXPLAIN {options} {statement}".format(
+        options=explain_options, statement=statement,
+    )
+    try:
+        async with engine.connect() as conn:
+            explain_result = await conn.exec_driver_sql(
+                explain_statement_text, parameters,
+            )
+            query_plan = "\n".join(
+                plan_row[0] for plan_row in explain_result
+            )
+    except Exception as exc:
+        logger.warning(
+            "Failed to explain slow query: {error}",
+            error=repr(exc),
+        )
+        return
+    logger.bind(**{QUERY_PLANS_EXTRA_KEY: True}).info(
+        "{duration_ms} ms in {route}\n{statement}\n{query_plan}\n",
+        duration_ms=duration_ms,
+        route=route,
+        statement=statement,
+        query_plan=query_plan,
+    )
+
+
+def schedule_explain(
+    engine: AsyncEngine,
+    statement: str,
+    parameters: Any,
+    duration_ms: float,
+    route: str | None,
+) -> None:
+    """
+    Функция для запуска записи плана медленного запроса в фоне.
+
+    Запуск пропускается, если выполняется предельное количество записей.
+    :param engine: асинхронный движок
+    :param statement: текст запроса
+    :param parameters: параметры запроса
+    :param duration_ms: время выполнения запроса в миллисекундах
+    :param route: шаблон пути маршрута
+    """
+    if len(_explain_tasks) >= DB_SLOW_QUERY_EXPLAIN_CONCURRENCY:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    explain_task = loop.create_task(
+        explain_statement(engine, statement, parameters, duration_ms, route),
+    )
+    _explain_tasks.add(explain_task)
+    explain_task.add_done_callback(_explain_tasks.discard)
+
+
+def instrument_slow_queries(engine: AsyncEngine) -> None:
+    """
+    Функция для подключения лога медленных запросов к движку.
+
+    Время выполнения запроса записывается при подключении учёта запросов,
+    поэтому функция вызывается после 'instrument_engine'.
+    :param engine: асинхронный движок
+    """
+    if not DB_SLOW_QUERY_THRESHOLD:
+        return
+
+    def log_slow_query(**event_args: Any) -> None:
+        duration = get_query_duration(event_args["context"])
+        if duration is None:
+            return
+        duration_ms = round(duration * 1000, 3)
+        if duration_ms < DB_SLOW_QUERY_THRESHOLD:
+            return
+        route = get_current_route_path()
+        logger.warning(
+            "Slow query {duration_ms} ms in {route}: {statement} "
+            "with parameters {parameters_shape}",
+            duration_ms=duration_ms,
+            route=route,
+            statement=event_args["statement"],
+            parameters_shape=get_parameters_shape(
+                event_args["parameters"], event_args["executemany"],
+            ),
+        )
+        if should_explain(event_args["statement"], event_args["executemany"]):
+            schedule_explain(
+                engine,
+                event_args["statement"],
+                event_args["parameters"],
+                duration_ms,
+                route,
+            )
+
+    event.listen(
+        engine.sync_engine,
+        "after_cursor_execute",
+        log_slow_query,
+        named=True,
+    )
@@ -0,0 +1,437 @@
+"""Tweets feed file. Used to build pages of the tweets feed.
+
+Feed pages are ordered by like count and tweet ID and are selected by page
+number or by a cursor which points to the last tweet of the previous page.
+"""
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from binascii import Error as BinasciiError
+from functools import partial
+
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    Text,
+    and_,
+    cast,
+    func,
+    or_,
+    select,
+)
+from sqlalchemy.dialects.postgresql import aggregate_order_by, array_agg
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+from sqlalchemy.orm import aliased, load_only, selectinload
+
+from python_advanced_diploma.src.database import is_replica_session
+from python_advanced_diploma.src.medias.medias_models import TweetMedia
+from python_advanced_diploma.src.routers_utils import serialize_response_model
+from python_advanced_diploma.src.tweets.tweets_feed_cache import (
+    FeedPageKey,
+    feed_cache,
+    feed_flight,
+)
+from python_advanced_diploma.src.tweets.tweets_models import Like, Tweet
+from python_advanced_diploma.src.tweets.tweets_schemas import TweetsOut
+from python_advanced_diploma.src.users.users_models import User
+
+
+def encode_feed_cursor(like_count: int, tweet_id: int) -> str:
+    """
+    Функция для создания курсора ленты твитов.
+
+    Курсор указывает на последний твит страницы ленты.
+    :param like_count: количество лайков твита
+    :param tweet_id: ID твита
+    :return: курсор
+    """
+    cursor = "{like_count}:{tweet_id}".format(
+        like_count=like_count,
+        tweet_id=tweet_id,
+    )
+    return urlsafe_b64encode(cursor.encode()).decode().rstrip("=")
+
+
+def decode_feed_cursor(cursor: str) -> tuple[int, int]:
+    """
+    Функция для разбора курсора ленты твитов.
+
+    :param cursor: курсор
+    :raises ValueError: если курсор некорректен
+    :return: количество лайков и ID последнего твита страницы
+    """
+    padding = "=" * (-len(cursor) % 4)
+    try:
+        decoded_cursor = urlsafe_b64decode(cursor + padding).decode()
+    except (BinasciiError, UnicodeDecodeError) as exc:
+        raise ValueError("Invalid feed cursor") from exc
+    like_count, _, tweet_id = decoded_cursor.partition(":")
+    if not like_count.isdigit() or not tweet_id.isdigit():
+        raise ValueError("Invalid feed cursor")
+    return int(like_count), int(tweet_id)
+
+
+def get_feed_page_filter(cursor: str) -> ColumnElement[bool]:
+    """
+    Функция для получения условия твитов страницы ленты после курсора.
+
+    Некорректный курсор приводит к ValueError.
+    :param cursor: курсор следующей страницы
+    :return: условие твитов страницы
+    """
+    last_like_count, last_tweet_id = decode_feed_cursor(cursor)
+    return or_(
+        Tweet.like_count < last_like_count,
+        and_(
+            Tweet.like_count == last_like_count,
+            Tweet.id > last_tweet_id,
+        ),
+    )
+
+
+def get_feed_page_offset(
+    limit: int | None, offset: int | None, cursor: str | None,
+) -> int | None:
+    """
+    Функция для получения сдвига страницы ленты твитов.
+
+    Сдвиг задаётся номером страницы, начиная с первой, и не учитывается
+    при передаче курсора.
+    :param limit: лимит
+    :param offset: номер страницы
+    :param cursor: курсор следующей страницы
+    :return: сдвиг | None
+    """
+    if cursor:
+        return None
+    if offset and limit:
+        return (offset - 1) * limit
+    return offset
+
+
+def get_tweets_feed_query(
+    limit: int | None,
+    offset: int | None,
+    page_filter: ColumnElement[bool] | None,
+) -> Select[tuple[Tweet]]:
+    """
+    Функция для получения запроса страницы ленты твитов.
+
+    :param limit: лимит
+    :param offset: сдвиг
+    :param page_filter: условие выбора страницы по курсору
+    :return: запрос твитов страницы
+    """
+    query = (
+        select(Tweet).options(load_only(Tweet.content, Tweet.like_count)).
+        options(
+            selectinload(Tweet.tweet_medias).load_only(
+                TweetMedia.image,
+                TweetMedia.thumbnail,
+                TweetMedia.medium,
+                TweetMedia.webp,
+            ),
+        ).
+        options(selectinload(Tweet.author).load_only(User.name)).
+        options(selectinload(Tweet.put_like_users).load_only(User.name)).
+        order_by(Tweet.like_count.desc(), Tweet.id).
+        limit(limit).
+        offset(offset)
+    )
+    if page_filter is not None:
+        query = query.filter(page_filter)
+    return query
+
+
+def get_attachments_json(tweet_id: ColumnElement[int]) -> ColumnElement:
+    """
+    Функция для получения подзапроса изображений твита страницы в JSON.
+
+    Вместо изображения отдаётся его средняя копия, если она уже создана.
+    :param tweet_id: ID твита страницы
+    :return: подзапрос массива изображений твита
+    """
+    return (
+        select(
+            func.json_agg(
+                aggregate_order_by(
+                    func.coalesce(TweetMedia.medium, TweetMedia.image),
+                    TweetMedia.id,
+                ),
+            ),
+        ).
+        filter(TweetMedia.tweet_id == tweet_id).
+        scalar_subquery()
+    )
+
+
+def get_attachment_renditions_json(
+    tweet_id: ColumnElement[int],
+) -> ColumnElement:
+    """
+    Функция для получения подзапроса копий изображений твита в JSON.
+
+    :param tweet_id: ID твита страницы
+    :return: подзапрос массива изображений твита с их копиями
+    """
+    return (
+        select(
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object(
+                        "original",
+                        TweetMedia.image,
+                        "thumbnail",
+                        TweetMedia.thumbnail,
+                        "medium",
+                        TweetMedia.medium,
+                        "webp",
+                        TweetMedia.webp,
+                    ),
+                    TweetMedia.id,
+                ),
+            ),
+        ).
+        filter(TweetMedia.tweet_id == tweet_id).
+        scalar_subquery()
+    )
+
+
+def get_likes_json(tweet_id: ColumnElement[int]) -> ColumnElement:
+    """
+    Функция для получения подзапроса лайков твита страницы в JSON.
+
+    :param tweet_id: ID твита страницы
+    :return: подзапрос массива поставивших лайк пользователей
+    """
+    return (
+        select(
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object(
+                        "user_id",
+                        User.id,
+                        "name",
+                        User.name,
+                    ),
+                    User.id,
+                ),
+            ),
+        ).
+        select_from(User).
+        join(Like, Like.user_id == User.id).
+        filter(Like.tweet_id == tweet_id).
+        scalar_subquery()
+    )
+
+
+def get_tweet_json(
+    tweet_id: ColumnElement[int],
+    content: ColumnElement[str],
+    author: type[User],
+) -> ColumnElement:
+    """
+    Функция для получения выражения твита страницы в JSON.
+
+    :param tweet_id: ID твита страницы
+    :param content: содержание твита страницы
+    :param author: псевдоним автора твита
+    :return: выражение объекта твита
+    """
+    return func.json_build_object(
+        "id",
+        tweet_id,
+        "content",
+        content,
+        "attachments",
+        func.coalesce(get_attachments_json(tweet_id), func.json_build_array()),
+        "author",
+        func.json_build_object(
+            "id",
+            author.id,
+            "name",
+            author.name,
+        ),
+        "likes",
+        func.coalesce(get_likes_json(tweet_id), func.json_build_array()),
+        "attachment_renditions",
+        func.coalesce(
+            get_attachment_renditions_json(tweet_id),
+            func.json_build_array(),
+        ),
+    )
+
+
+def get_tweets_feed_json_query(
+    limit: int | None,
+    offset: int | None,
+    page_filter: ColumnElement[bool] | None,
+) -> Select:
+    """
+    Функция для получения запроса, собирающего страницу ленты в JSON.
+
+    Твиты страницы, их изображения, автор и лайки собираются в массив JSON
+    одним запросом в том же виде и порядке, что и схема 'TweetsOut'.
+    Вместе с массивом возвращаются количество твитов страницы, количество
+    лайков и ID последнего из них.
+    :param limit: лимит
+    :param offset: сдвиг
+    :param page_filter: условие выбора страницы по курсору
+    :return: запрос
+    """
+    page_query = (
+        select(Tweet.id, Tweet.content, Tweet.like_count, Tweet.author_id).
+        order_by(Tweet.like_count.desc(), Tweet.id).
+        limit(limit).
+        offset(offset)
+    )
+    if page_filter is not None:
+        page_query = page_query.filter(page_filter)
+    page = page_query.subquery("page")
+    author = aliased(User, name="author")
+    tweets_json = func.coalesce(
+        func.json_agg(
+            aggregate_order_by(
+                get_tweet_json(page.c.id, page.c.content, author),
+                page.c.like_count.desc(),
+                page.c.id,
+            ),
+        ),
+        func.json_build_array(),
+    )
+    return (
+        select(
+            cast(tweets_json, Text),
+            func.count(),
+            array_agg(
+                aggregate_order_by(
+                    page.c.like_count,
+                    page.c.like_count,
+                    page.c.id.desc(),
+                ),
+            )[1],
+            array_agg(
+                aggregate_order_by(
+                    page.c.id,
+                    page.c.like_count,
+                    page.c.id.desc(),
+                ),
+            )[1],
+        ).
+        select_from(page).
+        join(author, author.id == page.c.author_id)
+    )
+
+
+async def get_tweets_feed_json(
+    session: AsyncSession,
+    limit: int | None,
+    offset: int | None,
+    page_filter: ColumnElement[bool] | None,
+) -> bytes:
+    """
+    Функция для получения страницы ленты твитов в виде готового JSON.
+
+    Ответ собирается в PostgreSQL одним запросом, минуя создание моделей
+    и их валидацию.
+    :param session: асинхронная сессия
+    :param limit: лимит
+    :param offset: сдвиг
+    :param page_filter: условие выбора страницы по курсору
+    :return: тело ответа со страницей ленты твитов
+    """
+    tweets_json, tweets_count, last_like_count, last_tweet_id = (
+        await session.execute(
+            get_tweets_feed_json_query(limit, offset, page_filter),
+        )
+    ).one()
+    next_cursor = None
+    if limit and tweets_count == limit:
+        next_cursor = encode_feed_cursor(last_like_count, last_tweet_id)
+    return b"".join((
+        b'{"result":true,"tweets":',
+        tweets_json.encode(),
+        b',"next_cursor":',
+        json.dumps(next_cursor).encode(),
+        b"}",
+    ))
+
+
+async def build_tweets_feed(
+    bind: AsyncEngine | AsyncConnection,
+    limit: int | None,
+    offset: int | None,
+    page_filter: ColumnElement[bool] | None,
+    sql_json: bool,
+) -> bytes:
+    """
+    Функция для построения сериализованной страницы ленты твитов.
+
+    Страница строится в отдельной сессии, так как её результат разделяют
+    одновременные запросы и он не должен зависеть от сессии одного из них.
+    :param bind: движок или соединение сессии запроса
+    :param limit: лимит
+    :param offset: сдвиг
+    :param page_filter: условие выбора страницы по курсору
+    :param sql_json: собрать ответ в PostgreSQL
+    :return: тело ответа со страницей ленты твитов
+    """
+    async with AsyncSession(bind) as session:
+        if sql_json:
+            return await get_tweets_feed_json(
+                session, limit, offset, page_filter,
+            )
+        tweets_select_result = await session.execute(
+            get_tweets_feed_query(limit, offset, page_filter),
+        )
+        tweets = tweets_select_result.scalars().all()
+    next_cursor = None
+    if limit and len(tweets) == limit:
+        next_cursor = encode_feed_cursor(tweets[-1].like_count, tweets[-1].id)
+    return serialize_response_model(
+        TweetsOut,
+        {
+            "result": True,
+            "tweets": tweets,
+            "next_cursor": next_cursor,
+        },
+    )
+
+
+async def load_tweets_feed(
+    session: AsyncSession,
+    feed_version: int,
+    feed_page_key: FeedPageKey,
+    page_filter: ColumnElement[bool] | None,
+    sql_json: bool,
+) -> bytes:
+    """
+    Функция для получения страницы ленты твитов, отсутствующей в кэше.
+
+    Сессия запроса закрывается до ожидания страницы, чтобы не удерживать
+    соединение пула, пока страница строится в отдельной сессии.
+    Страницы, прочитанные с реплики, не кэшируются, так как реплика может
+    не содержать изменений, уже отмеченных в версии ленты.
+    :param session: асинхронная сессия запроса
+    :param feed_version: версия ленты, полученная до построения страницы
+    :param feed_page_key: ключ страницы (лимит, сдвиг, курсор)
+    :param page_filter: условие выбора страницы по курсору
+    :param sql_json: собрать ответ в PostgreSQL
+    :return: тело ответа со страницей ленты твитов
+    """
+    await session.close()
+    limit, offset, cursor = feed_page_key
+    flight_key = (session.bind, feed_version, feed_page_key)
+    tweets_feed = await feed_flight.do(
+        flight_key,
+        partial(
+            build_tweets_feed,
+            session.bind,
+            limit,
+            get_feed_page_offset(limit, offset, cursor),
+            page_filter,
+            sql_json=sql_json,
+        ),
+    )
+    if not is_replica_session(session):
+        await feed_cache.set(feed_page_key, feed_version, tweets_feed)
+    return tweets_feed
@@ -0,0 +1,216 @@
+"""Tweets feed cache file. Used to cache serialized tweets feed pages."""
+
+from abc import ABC, abstractmethod
+from time import time
+from typing import NamedTuple, Optional
+
+from python_advanced_diploma.src.cache import SingleFlight, TTLCache
+from python_advanced_diploma.src.config import (
+    FEED_CACHE_MAX_STALENESS,
+    FEED_CACHE_SIZE,
+    FEED_CACHE_TTL,
+)
+
+FeedPageKey = tuple[Optional[int], Optional[int], Optional[str]]
+
+
+class CachedFeedPage(NamedTuple):
+    """Сохранённая страница ленты твитов. Родитель: NamedTuple."""
+
+    version: int
+    stored_at: float
+    body: bytes
+
+
+class FeedCacheBackend(ABC):
+    """
+    Хранилище страниц ленты твитов. Родитель: ABC.
+
+    Хранит страницы ленты и номер версии ленты, который увеличивается при
+    каждом её изменении.
+    """
+
+    @abstractmethod
+    async def load_page(self, key: FeedPageKey) -> CachedFeedPage | None:
+        """
+        Метод для получения страницы ленты.
+
+        :param key: ключ страницы
+        :return: страница ленты | None, если её нет
+        """
+
+    @abstractmethod
+    async def store_page(self, key: FeedPageKey, page: CachedFeedPage) -> None:
+        """
+        Метод для сохранения страницы ленты.
+
+        :param key: ключ страницы
+        :param page: страница ленты
+        """
+
+    @abstractmethod
+    async def current_version(self) -> int:
+        """
+        Метод для получения версии ленты.
+
+        :return: версия ленты
+        """
+
+    @abstractmethod
+    async def increment_version(self) -> int:
+        """
+        Метод для увеличения версии ленты.
+
+        :return: новая версия ленты
+        """
+
+
+class InMemoryFeedCacheBackend(FeedCacheBackend):
+    """
+    Хранилище страниц ленты в памяти процесса. Родитель: FeedCacheBackend.
+
+    Каждый процесс приложения хранит свои страницы и свою версию ленты.
+    """
+
+    def __init__(self, maxsize: int, ttl: float) -> None:
+        """
+        Метод для инициализации хранилища.
+
+        :param maxsize: максимальное количество страниц
+        :param ttl: время жизни страницы в секундах
+        """
+        self.pages: TTLCache[CachedFeedPage] = TTLCache(
+            maxsize=maxsize,
+            ttl=ttl,
+        )
+        self.version = 0
+
+    async def load_page(self, key: FeedPageKey) -> CachedFeedPage | None:
+        """
+        Метод для получения страницы ленты.
+
+        :param key: ключ страницы
+        :return: страница ленты | None, если её нет
+        """
+        return self.pages.get(key)
+
+    async def store_page(self, key: FeedPageKey, page: CachedFeedPage) -> None:
+        """
+        Метод для сохранения страницы ленты.
+
+        :param key: ключ страницы
+        :param page: страница ленты
+        """
+        self.pages.set(key, page)
+
+    async def current_version(self) -> int:
+        """
+        Метод для получения версии ленты.
+
+        :return: версия ленты
+        """
+        return self.version
+
+    async def increment_version(self) -> int:
+        """
+        Метод для увеличения версии ленты.
+
+        Страницы прежних версий не удаляются, а вытесняются по времени жизни
+        и размеру хранилища.
+        :return: новая версия ленты
+        """
+        self.version += 1
+        return self.version
+
+
+class FeedCache:
+    """
+    Кэш сериализованных страниц ленты твитов.
+
+    Страница, сохранённая до изменения ленты, отдаётся только в течение
+    окна допустимой устарелости max_staleness.
+    """
+
+    def __init__(
+        self, backend: FeedCacheBackend, max_staleness: float,
+    ) -> None:
+        """
+        Метод для инициализации кэша.
+
+        :param backend: хранилище страниц
+        :param max_staleness: допустимая устарелость страницы в секундах
+        """
+        self.backend = backend
+        self.max_staleness = max_staleness
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    async def current_version(self) -> int:
+        """
+        Метод для получения версии ленты.
+
+        Версию нужно получить до построения страницы, чтобы страница,
+        построенная во время изменения ленты, не считалась актуальной.
+        :return: версия ленты
+        """
+        return await self.backend.current_version()
+
+    async def get(self, key: FeedPageKey, version: int) -> bytes | None:
+        """
+        Метод для получения страницы ленты из кэша.
+
+        :param key: ключ страницы
+        :param version: текущая версия ленты
+        :return: тело страницы | None, если она устарела или её нет
+        """
+        page = await self.backend.load_page(key)
+        if page is None:
+            self.misses += 1
+            return None
+        if page.version == version:
+            self.hits += 1
+            return page.body
+        if time() - page.stored_at <= self.max_staleness:
+            self.stale_hits += 1
+            return page.body
+        self.misses += 1
+        return None
+
+    async def set(self, key: FeedPageKey, version: int, body: bytes) -> None:
+        """
+        Метод для сохранения страницы ленты в кэш.
+
+        :param key: ключ страницы
+        :param version: версия ленты, для которой построена страница
+        :param body: тело страницы
+        """
+        await self.backend.store_page(
+            key, CachedFeedPage(version=version, stored_at=time(), body=body),
+        )
+
+    async def invalidate(self) -> None:
+        """Метод для отметки изменения ленты твитов."""
+        await self.backend.increment_version()
+
+    def stats(self) -> dict[str, int]:
+        """
+        Метод для получения статистики использования кэша.
+
+        :return: статистика кэша
+        """
+        return {
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+        }
+
+
+feed_cache = FeedCache(
+    backend=InMemoryFeedCacheBackend(
+        maxsize=FEED_CACHE_SIZE,
+        ttl=FEED_CACHE_TTL,
+    ),
+    max_staleness=FEED_CACHE_MAX_STALENESS,
+)
+feed_flight: SingleFlight[bytes] = SingleFlight()
@@ -0,0 +1,582 @@
+"""Tweets likes buffer file. Used to write likes to the database in batches.
+
+With LIKES_WRITE_BEHIND enabled a like or a dislike is acknowledged after
+it is appended to a queue file of the worker, and a background flusher
+writes the queued likes to the database every LIKES_FLUSH_INTERVAL
+milliseconds. A flush inserts and deletes all queued likes with one
+statement and changes the like counter of every tweet once by the total
+delta, so likes of a viral tweet don't contend on its row.
+
+Every worker appends to its own queue file locked with 'flock'. After a
+flush the file is deleted, and files whose lock is not held, left by a
+crashed worker, are replayed by the next started worker. Queued likes are
+visible to reads only after the flush.
+"""
+
+import asyncio
+import fcntl
+import os
+from collections import Counter
+from contextlib import suppress
+from functools import partial
+from glob import glob
+from time import time_ns
+from typing import IO, Sequence
+
+from sqlalchemy import (
+    Integer,
+    bindparam,
+    delete,
+    func,
+    literal,
+    select,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from sqlalchemy.sql.expression import CTE, TableValuedAlias, Update
+
+from python_advanced_diploma.src.config import (
+    LIKES_FLUSH_BATCH_SIZE,
+    LIKES_FLUSH_INTERVAL,
+    LIKES_QUEUE_DIR,
+    LIKES_QUEUE_FSYNC,
+    logger,
+)
+from python_advanced_diploma.src.invalidation import publish_feed_change
+from python_advanced_diploma.src.tweets.tweets_feed_cache import feed_cache
+from python_advanced_diploma.src.tweets.tweets_models import Like, Tweet
+
+QUEUE_FILE_SUFFIX = ".likes"
+
+LikeKey = tuple[int, int]
+
+
+class LikesQueueFile:
+    """
+    Файл очереди лайков процесса.
+
+    Файл заблокирован, пока он открыт, поэтому его не воспроизводят другие
+    процессы.
+    """
+
+    def __init__(self, path: str, queue_file: IO[bytes]) -> None:
+        """
+        Метод для инициализации файла очереди.
+
+        :param path: путь к файлу
+        :param queue_file: открытый заблокированный файл
+        """
+        self.path = path
+        self.queue_file = queue_file
+        self.written = 0
+        self.synced = 0
+        self.closed = False
+        self._sync_task: asyncio.Task[None] | None = None
+
+    @classmethod
+    def create(cls, queue_dir: str) -> "LikesQueueFile":
+        """
+        Метод для создания нового файла очереди.
+
+        :param queue_dir: директория файлов очереди
+        :return: файл очереди
+        """
+        os.makedirs(queue_dir, exist_ok=True)
+        path = os.path.join(
+            queue_dir,
+            "{created_at}_{pid}{suffix}".format(
+                created_at=time_ns(),
+                pid=os.getpid(),
+                suffix=QUEUE_FILE_SUFFIX,
+            ),
+        )
+        queue_file = open(path, "ab")  # noqa: WPS515
+        fcntl.flock(queue_file.fileno(), fcntl.LOCK_EX)
+        return cls(path, queue_file)
+
+    def append(self, user_id: int, tweet_id: int, liked: bool) -> None:
+        """
+        Метод для записи лайка или его отмены в файл.
+
+        Запись передаётся ОС, поэтому сохраняется при падении процесса.
+        :param user_id: ID пользователя
+        :param tweet_id: ID твита
+        :param liked: True для лайка, False для его отмены
+        """
+        self.queue_file.write(
+            "{liked:d} {user_id} {tweet_id}\n".format(
+                liked=liked, user_id=user_id, tweet_id=tweet_id,
+            ).encode(),
+        )
+        self.queue_file.flush()
+        self.written += 1
+
+    def read(self) -> dict[LikeKey, bool]:
+        """
+        Метод для чтения лайков из файла.
+
+        Неполная последняя строка, оставшаяся после падения процесса,
+        пропускается.
+        :return: последнее состояние лайков по пользователям и твитам
+        """
+        queued_likes: dict[LikeKey, bool] = {}
+        self.queue_file.seek(0)
+        for line in self.queue_file:
+            try:
+                liked, user_id, tweet_id = map(int, line.split())
+            except ValueError:
+                logger.warning(
+                    "Skipped invalid likes queue record {line} in {path}",
+                    line=line,
+                    path=self.path,
+                )
+                continue
+            queued_likes[(user_id, tweet_id)] = bool(liked)
+        return queued_likes
+
+    async def sync(self) -> None:
+        """
+        Метод для ожидания записи файла на диск.
+
+        Одновременные вызовы ожидают одну синхронизацию, которая покрывает
+        все записи, сделанные до её начала. Ожидание завершается и без
+        синхронизации, если лайки файла уже записаны в БД и файл удалён.
+        """
+        written = self.written
+        while self.synced < written and not self.closed:
+            if self._sync_task is None:
+                self._sync_task = asyncio.ensure_future(
+                    asyncio.to_thread(os.fsync, self.queue_file.fileno()),
+                )
+                self._sync_task.add_done_callback(
+                    partial(self._finish_sync, written=self.written),
+                )
+            await asyncio.shield(self._sync_task)
+
+    async def delete(self) -> None:
+        """
+        Метод для удаления файла после записи его лайков в БД.
+
+        Файл помечается закрытым до ожидания текущей синхронизации, поэтому
+        новые синхронизации закрываемого файла не запускаются.
+        """
+        self.closed = True
+        while self._sync_task is not None:
+            await asyncio.gather(self._sync_task, return_exceptions=True)
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            logger.warning(
+                "Likes queue file {path} was already deleted",
+                path=self.path,
+            )
+        self.queue_file.close()
+
+    def _finish_sync(
+        self, sync_task: asyncio.Task[None], written: int,
+    ) -> None:
+        self._sync_task = None
+        if not sync_task.cancelled() and sync_task.exception() is None:
+            self.synced = written
+
+
+def claim_queue_file(path: str) -> LikesQueueFile | None:
+    """
+    Функция для захвата файла очереди, оставленного другим процессом.
+
+    :param path: путь к файлу
+    :return: файл очереди | None, если он заблокирован или удалён
+    """
+    try:
+        queue_file = open(path, "r+b")  # noqa: WPS515
+    except FileNotFoundError:
+        return None
+    try:
+        fcntl.flock(queue_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        queue_file.close()
+        return None
+    if os.fstat(queue_file.fileno()).st_nlink == 0:
+        queue_file.close()
+        return None
+    return LikesQueueFile(path, queue_file)
+
+
+def get_likes_rows(prefix: str) -> TableValuedAlias:
+    """
+    Функция для получения строк лайков из параметров запроса.
+
+    :param prefix: префикс параметров 'liked' | 'disliked'
+    :return: строки с ID пользователей и ID твитов
+    """
+    user_ids = bindparam(
+        "{prefix}_user_ids".format(prefix=prefix), type_=ARRAY(Integer),
+    )
+    tweet_ids = bindparam(
+        "{prefix}_tweet_ids".format(prefix=prefix), type_=ARRAY(Integer),
+    )
+    return func.unnest(user_ids, tweet_ids).table_valued(
+        "user_id", "tweet_id",
+    ).render_derived()
+
+
+def get_inserted_likes(liked_rows: TableValuedAlias) -> CTE:
+    """
+    Функция для получения CTE вставки лайков.
+
+    Лайки собственных и удалённых твитов пропускаются.
+    :param liked_rows: строки лайков
+    :return: CTE с ID твитов вставленных лайков
+    """
+    liked_tweets = (
+        select(liked_rows.c.user_id, liked_rows.c.tweet_id).
+        join(Tweet, Tweet.id == liked_rows.c.tweet_id).
+        filter(Tweet.author_id != liked_rows.c.user_id)
+    )
+    return (
+        insert(Like).
+        from_select(["user_id", "tweet_id"], liked_tweets).
+        on_conflict_do_nothing().
+        returning(Like.tweet_id).
+        cte("inserted_likes")
+    )
+
+
+def get_deleted_likes(disliked_rows: TableValuedAlias) -> CTE:
+    """
+    Функция для получения CTE удаления отменённых лайков.
+
+    :param disliked_rows: строки отменённых лайков
+    :return: CTE с ID твитов удалённых лайков
+    """
+    return (
+        delete(Like).
+        filter(
+            Like.user_id == disliked_rows.c.user_id,
+            Like.tweet_id == disliked_rows.c.tweet_id,
+        ).
+        returning(Like.tweet_id).
+        cte("deleted_likes")
+    )
+
+
+def get_apply_likes_statement() -> Update:
+    """
+    Функция для построения запроса записи пачки лайков в БД.
+
+    Лайки вставляются, а отменённые лайки удаляются в CTE запроса, и
+    счётчик лайков твита изменяется на разность вставленных и удалённых
+    строк, поэтому повторная запись пачки не меняет счётчики. Параметры
+    запроса строит get_apply_likes_params.
+    :return: запрос
+    """
+    inserted_likes = get_inserted_likes(get_likes_rows("liked"))
+    deleted_likes = get_deleted_likes(get_likes_rows("disliked"))
+    like_changes = union_all(
+        select(inserted_likes.c.tweet_id, literal(1).label("delta")),
+        select(deleted_likes.c.tweet_id, literal(-1).label("delta")),
+    ).subquery()
+    like_count_deltas = (
+        select(
+            like_changes.c.tweet_id,
+            func.sum(like_changes.c.delta).label("delta"),
+        ).
+        group_by(like_changes.c.tweet_id).
+        subquery()
+    )
+    return (
+        update(Tweet).
+        filter(Tweet.id == like_count_deltas.c.tweet_id).
+        values(like_count=Tweet.like_count + like_count_deltas.c.delta).
+        execution_options(synchronize_session=False)
+    )
+
+
+def get_apply_likes_params(
+    queued_likes: dict[LikeKey, bool],
+) -> dict[str, list[int]]:
+    """
+    Функция для получения параметров запроса записи пачки лайков.
+
+    Строки упорядочены по пользователям и твитам, поэтому одновременные
+    записи блокируют строки в одном порядке.
+    :param queued_likes: состояние лайков по пользователям и твитам
+    :return: ID пользователей и твитов лайков и отменённых лайков
+    """
+    likes_params: dict[str, list[int]] = {
+        "liked_user_ids": [],
+        "liked_tweet_ids": [],
+        "disliked_user_ids": [],
+        "disliked_tweet_ids": [],
+    }
+    for (user_id, tweet_id), liked in sorted(queued_likes.items()):
+        prefix = "liked" if liked else "disliked"
+        likes_params["{prefix}_user_ids".format(prefix=prefix)].append(user_id)
+        likes_params["{prefix}_tweet_ids".format(prefix=prefix)].append(
+            tweet_id,
+        )
+    return likes_params
+
+
+async def apply_likes(
+    engine: AsyncEngine, queued_likes: dict[LikeKey, bool],
+) -> None:
+    """
+    Функция для записи пачки лайков в БД.
+
+    :param engine: асинхронный движок
+    :param queued_likes: состояние лайков по пользователям и твитам
+    """
+    if not queued_likes:
+        return
+    async with AsyncSession(engine) as session:
+        await session.execute(
+            get_apply_likes_statement(), get_apply_likes_params(queued_likes),
+        )
+        await publish_feed_change(session)
+        await session.commit()
+    await feed_cache.invalidate()
+
+
+async def get_stored_liked_tweet_ids(
+    user_id: int, tweet_ids: Sequence[int], session: AsyncSession,
+) -> set[int]:
+    """
+    Функция для получения твитов, лайки которых записаны в БД.
+
+    :param user_id: ID пользователя
+    :param tweet_ids: ID твитов
+    :param session: асинхронная сессия
+    :return: ID твитов, лайкнутых пользователем
+    """
+    if not tweet_ids:
+        return set()
+    stored_likes_result = await session.scalars(
+        select(Like.tweet_id).
+        filter(Like.user_id == user_id, Like.tweet_id.in_(tweet_ids)),
+    )
+    return set(stored_likes_result)
+
+
+class LikesBuffer:
+    """Очередь лайков процесса, которые ещё не записаны в БД."""
+
+    def __init__(self, queue_dir: str, fsync: bool, batch_size: int) -> None:
+        """
+        Метод для инициализации очереди.
+
+        :param queue_dir: директория файлов очереди
+        :param fsync: синхронизировать запись с диском перед подтверждением
+        :param batch_size: количество лайков, при котором запускается запись
+        """
+        self.queue_dir = queue_dir
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self.queued_likes: dict[LikeKey, bool] = {}
+        self.flush_requested = asyncio.Event()
+        self.flush_counts: Counter[str] = Counter()
+        self._queue_file: LikesQueueFile | None = None
+        self._flushed_queue_files: list[LikesQueueFile] = []
+        self._flush_lock = asyncio.Lock()
+
+    async def add(
+        self, user_id: int, tweet_ids: Sequence[int], liked: bool,
+    ) -> None:
+        """
+        Метод для добавления лайков или их отмены в очередь.
+
+        :param user_id: ID пользователя
+        :param tweet_ids: ID твитов
+        :param liked: True для лайков, False для их отмены
+        """
+        if not tweet_ids:
+            return
+        if self._queue_file is None:
+            self._queue_file = LikesQueueFile.create(self.queue_dir)
+        queue_file = self._queue_file
+        for tweet_id in tweet_ids:
+            queue_file.append(user_id, tweet_id, liked)
+            self.queued_likes[(user_id, tweet_id)] = liked
+        if len(self.queued_likes) >= self.batch_size:
+            self.flush_requested.set()
+        if self.fsync:
+            await queue_file.sync()
+
+    async def get_liked_tweet_ids(
+        self, user_id: int, tweet_ids: Sequence[int], session: AsyncSession,
+    ) -> list[int]:
+        """
+        Метод для получения лайкнутых твитов с учётом очереди процесса.
+
+        :param user_id: ID пользователя
+        :param tweet_ids: ID твитов
+        :param session: асинхронная сессия
+        :return: ID твитов, лайкнутых пользователем
+        """
+        queued_likes = {
+            tweet_id: self.queued_likes.get((user_id, tweet_id))
+            for tweet_id in tweet_ids
+        }
+        stored_liked_tweet_ids = await get_stored_liked_tweet_ids(
+            user_id,
+            [
+                tweet_id
+                for tweet_id, queued_like in queued_likes.items()
+                if queued_like is None
+            ],
+            session,
+        )
+        return [
+            tweet_id
+            for tweet_id, queued_like in queued_likes.items()
+            if queued_like or tweet_id in stored_liked_tweet_ids
+        ]
+
+    def recover(self) -> int:
+        """
+        Метод для захвата файлов очереди, оставленных упавшими процессами.
+
+        Файлы воспроизводятся в порядке создания, лайки из них добавляются
+        в очередь, а файлы удаляются после их записи в БД.
+        :return: количество восстановленных лайков
+        """
+        recovered_likes = 0
+        queue_files_pattern = os.path.join(
+            self.queue_dir, "*{suffix}".format(suffix=QUEUE_FILE_SUFFIX),
+        )
+        for path in sorted(glob(queue_files_pattern)):
+            queue_file = claim_queue_file(path)
+            if queue_file is None:
+                continue
+            queued_likes = queue_file.read()
+            self.queued_likes.update(queued_likes)
+            self._flushed_queue_files.append(queue_file)
+            recovered_likes += len(queued_likes)
+            logger.info(
+                "Recovered {count} queued likes from {path}",
+                count=len(queued_likes),
+                path=path,
+            )
+        return recovered_likes
+
+    async def flush(self, engine: AsyncEngine) -> int:
+        """
+        Метод для записи лайков очереди в БД.
+
+        Новые лайки во время записи добавляются в новый файл очереди. При
+        ошибке или отмене записи лайки возвращаются в очередь, а файлы
+        очереди удаляются только после успешной записи.
+        :param engine: асинхронный движок
+        :return: количество записанных лайков
+        :raises asyncio.CancelledError: если запись отменена
+        """
+        async with self._flush_lock:
+            if self._queue_file is not None:
+                self._flushed_queue_files.append(self._queue_file)
+                self._queue_file = None
+            queued_likes = self.queued_likes
+            self.queued_likes = {}
+            try:
+                await apply_likes(engine, queued_likes)
+            except asyncio.CancelledError:
+                self._requeue(queued_likes)
+                raise
+            except Exception:
+                self._requeue(queued_likes)
+                logger.exception(
+                    "Failed to write {count} queued likes",
+                    count=len(queued_likes),
+                )
+                self.flush_counts["failed_flushes"] += 1
+                return 0
+            for queue_file in self._flushed_queue_files:
+                await queue_file.delete()
+            self._flushed_queue_files = []
+            self.flush_counts["flushed"] += len(queued_likes)
+            return len(queued_likes)
+
+    def stats(self) -> dict[str, int]:
+        """
+        Метод для получения статистики очереди.
+
+        :return: количество лайков в очереди, записанных лайков и ошибок
+        """
+        return {
+            "queued": len(self.queued_likes),
+            "flushed": self.flush_counts["flushed"],
+            "failed_flushes": self.flush_counts["failed_flushes"],
+        }
+
+    def _requeue(self, queued_likes: dict[LikeKey, bool]) -> None:
+        queued_likes.update(self.queued_likes)
+        self.queued_likes = queued_likes
+
+
+class LikesFlusher:
+    """
+    Периодическая запись лайков очереди в БД.
+
+    Запись выполняется раз в интервал или раньше, если очередь набрала
+    пачку, и ещё раз при остановке.
+    """
+
+    def __init__(self, buffer: LikesBuffer, interval: float) -> None:
+        """
+        Метод для инициализации записи.
+
+        :param buffer: очередь лайков
+        :param interval: интервал записи в секундах
+        """
+        self.buffer = buffer
+        self.interval = interval
+        self.stopping = False
+        self.task: asyncio.Task[None] | None = None
+
+    async def wait_for_flush_request(self) -> None:
+        """Метод для ожидания запроса записи или окончания интервала."""
+        with suppress(asyncio.TimeoutError):
+            await asyncio.wait_for(
+                self.buffer.flush_requested.wait(), timeout=self.interval,
+            )
+        self.buffer.flush_requested.clear()
+
+    async def run(self, engine: AsyncEngine) -> None:
+        """
+        Метод для записи лайков очереди в БД до остановки.
+
+        :param engine: асинхронный движок
+        """
+        while not self.stopping:
+            await self.wait_for_flush_request()
+            await self.buffer.flush(engine)
+        await self.buffer.flush(engine)
+
+    def start(self, engine: AsyncEngine) -> None:
+        """
+        Метод для запуска записи лайков очереди в БД.
+
+        Перед запуском в очередь добавляются лайки упавших процессов.
+        :param engine: асинхронный движок
+        """
+        if self.task is None:
+            self.buffer.recover()
+            self.stopping = False
+            self.task = asyncio.create_task(self.run(engine))
+
+    async def stop(self) -> None:
+        """Метод для остановки записи лайков с записью оставшихся."""
+        if self.task is None:
+            return
+        self.stopping = True
+        self.buffer.flush_requested.set()
+        await self.task
+        self.task = None
+        logger.info("Likes flusher stopped")
+
+
+likes_buffer = LikesBuffer(
+    LIKES_QUEUE_DIR, LIKES_QUEUE_FSYNC, LIKES_FLUSH_BATCH_SIZE,
+)
+likes_flusher = LikesFlusher(likes_buffer, LIKES_FLUSH_INTERVAL / 1000)
@@ -1,6 +1,6 @@
 """Tweets models file. Used to create tweets models."""
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index, false
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from python_advanced_diploma.src.database import Base
@@ -19,6 +19,7 @@ class Like(Base):
     tweet_id: Mapped[int] = mapped_column(
         ForeignKey("tweet.id", ondelete="CASCADE"),
         primary_key=True,
+        index=True,
     )
 
 
@@ -30,14 +31,47 @@ class Tweet(Base):
     content: Mapped[str]
     author_id: Mapped[int] = mapped_column(
         ForeignKey("user.id", ondelete="RESTRICT"),
+        index=True,
+    )
+    like_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    is_fanned_out: Mapped[bool] = mapped_column(
+        default=False,
+        server_default=false(),
+    )
+    tweet_medias: Mapped[list[TweetMedia]] = relationship(
+        order_by=TweetMedia.id,
     )
-    tweet_medias: Mapped[list[TweetMedia]] = relationship()
     author: Mapped[User] = relationship()
     put_like_users: Mapped[list[User]] = relationship(
         secondary="like",
+        order_by=User.id,
         viewonly=True,
     )
     likes: Mapped[list["Like"]] = relationship(
         primaryjoin=(Like.tweet_id == id),
         viewonly=True,
     )
+
+
+class TimelineEntry(Base):
+    """Запись домашней ленты пользователя. Родитель: Base."""
+
+    __tablename__ = "timeline_entry"
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey("user.id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    tweet_id: Mapped[int] = mapped_column(
+        ForeignKey("tweet.id", ondelete="CASCADE"),
+        primary_key=True,
+        index=True,
+    )
+
+
+Index("ix_tweet_like_count_id", Tweet.like_count.desc(), Tweet.id)
+Index(
+    "ix_tweet_author_id_id_not_fanned_out",
+    Tweet.author_id,
+    Tweet.id,
+    postgresql_where=Tweet.is_fanned_out.is_(False),
+)
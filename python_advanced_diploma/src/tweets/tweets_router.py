@@ -4,33 +4,65 @@ from typing import Annotated, Sequence
 
 from fastapi import APIRouter, Depends, Header, Response, status
 from fastapi.params import Path, Query
-from sqlalchemy import and_, delete, func, select
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import delete, select
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import load_only, selectinload
-from starlette.responses import JSONResponse
 
-from python_advanced_diploma.src.config import logger
-from python_advanced_diploma.src.database import get_async_session
+from python_advanced_diploma.src.config import (
+    LIKES_WRITE_BEHIND,
+    TIMELINE_PAGE_SIZE,
+    TWEETS_FEED_SQL_JSON,
+    logger,
+)
+from python_advanced_diploma.src.database import (
+    get_async_read_session,
+    get_async_session,
+)
+from python_advanced_diploma.src.invalidation import (
+    commit_feed_change,
+    publish_feed_change,
+)
 from python_advanced_diploma.src.medias.medias_models import TweetMedia
-from python_advanced_diploma.src.medias.medias_router_utils import (
-    delete_all_tweet_images,
+from python_advanced_diploma.src.medias.medias_renditions import (
+    delete_unreferenced_images,
 )
 from python_advanced_diploma.src.responses import (
+    accepted_response,
     bad_request_error_response,
     not_found_error_response,
     validation_error_response,
 )
-from python_advanced_diploma.src.routers_utils import get_user_id_by_api_key
+from python_advanced_diploma.src.routers_utils import (
+    build_model_response,
+    get_user_id_by_api_key,
+)
 from python_advanced_diploma.src.schemas import SuccessMessage
-from python_advanced_diploma.src.tweets.tweets_models import Like, Tweet
+from python_advanced_diploma.src.tweets.tweets_feed import (
+    get_feed_page_filter,
+    load_tweets_feed,
+)
+from python_advanced_diploma.src.tweets.tweets_feed_cache import feed_cache
+from python_advanced_diploma.src.tweets.tweets_likes_buffer import (
+    likes_buffer,
+)
+from python_advanced_diploma.src.tweets.tweets_models import Tweet
 from python_advanced_diploma.src.tweets.tweets_router_utils import (
+    add_likes,
     create_new_tweet,
+    queue_likes_change,
+    remove_likes,
 )
 from python_advanced_diploma.src.tweets.tweets_schemas import (
     TweetCreated,
+    TweetIdsIn,
+    TweetIdsOut,
     TweetIn,
     TweetsOut,
 )
+from python_advanced_diploma.src.tweets.tweets_timeline import (
+    get_home_timeline_tweet_ids_query,
+)
 from python_advanced_diploma.src.users.users_models import User
 
 router = APIRouter(prefix="/api/tweets", tags=["Tweet"])
@@ -59,25 +91,24 @@ async def add_new_tweet(
     :return: ID нового твита
     """
     logger.info(
-        "User with api key: {api_key} try to add new tweet ".format(
-            api_key=api_key,
-        ) + "with content: {content}".format(
-            content=new_tweet.tweet_data,
-        ) + " and media ID's: {tweet_media_ids}".format(
-            tweet_media_ids=new_tweet.tweet_media_ids,
-        ),
+        "User with api key: {api_key} try to add new tweet with content: "
+        "{content} and media ID's: {tweet_media_ids}",
+        api_key=api_key,
+        content=new_tweet.tweet_data,
+        tweet_media_ids=new_tweet.tweet_media_ids,
     )
     current_user_id = await get_user_id_by_api_key(api_key, session)
+    await publish_feed_change(session, api_key)
     tweet = await create_new_tweet(current_user_id, session, new_tweet)
     if tweet:
+        await feed_cache.invalidate()
         logger.info(
-            "New tweet with ID: {tweet_id} was added by user with ID: ".format(
-                tweet_id=tweet.id,
-            ) + "{author_id}".format(
-                author_id=current_user_id,
-            ),
+            "New tweet with ID: {tweet_id} was added by user with ID: "
+            "{author_id}",
+            tweet_id=tweet.id,
+            author_id=current_user_id,
         )
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_201_CREATED,
             content={
                 "result": True,
@@ -90,7 +121,7 @@ async def add_new_tweet(
         tweet_media_ids=new_tweet.tweet_media_ids,
     )
     logger.error(error_message)
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_404_NOT_FOUND,
         content={
             "result": False,
@@ -122,11 +153,9 @@ async def delete_tweet(
     :return: response
     """
     logger.info(
-        "User with api key: {api_key} try to delete tweet with ID: ".format(
-            api_key=api_key,
-        ) + "{id}".format(
-            id=id,
-        ),
+        "User with api key: {api_key} try to delete tweet with ID: {id}",
+        api_key=api_key,
+        id=id,
     )
     current_user_id = await get_user_id_by_api_key(api_key, session)
     tweet_medias_delete_result = await session.execute(
@@ -134,36 +163,88 @@ async def delete_tweet(
         filter(TweetMedia.tweet_id == id).
         returning(TweetMedia.image),
     )
-    deleted_tweet_media_images = tweet_medias_delete_result.scalars().all()
-    delete_tweet_stmt = (
+    deleted_images = tweet_medias_delete_result.scalars().all()
+    delete_tweet_result = await session.execute(
         delete(Tweet).
         filter_by(id=id, author_id=current_user_id).
-        returning(Tweet.id)
+        returning(Tweet.id),
     )
-    delete_tweet_result = await session.execute(delete_tweet_stmt)
-    if delete_tweet_result.scalars().one():
-        await session.commit()
-        if deleted_tweet_media_images:
-            await delete_all_tweet_images(deleted_tweet_media_images)
+    delete_tweet_result.scalars().one()
+    await commit_feed_change(session, api_key)
+    await delete_unreferenced_images(deleted_images, session)
     logger.info(
-        "Tweet with ID: {id} was deleted by user with ID: ".format(
-            id=id,
-        ) + "{current_user_id}".format(
-            current_user_id=current_user_id,
-        ),
+        "Tweet with ID: {id} was deleted by user with ID: {current_user_id}",
+        id=id,
+        current_user_id=current_user_id,
     )
-    return JSONResponse(
+    return ORJSONResponse(
         content={
             "result": True,
         },
     )
 
 
+async def get_like_error_response(
+    id: int, current_user_id: int, session: AsyncSession,
+) -> Response | None:
+    """
+    Функция для проверки, что пользователь может лайкнуть твит.
+
+    :param id: ID твита
+    :param current_user_id: ID пользователя
+    :param session: асинхронная сессия
+    :return: response с ошибкой | None, если твит можно лайкнуть
+    """
+    author_id = await session.scalar(select(Tweet.author_id).filter_by(id=id))
+    if author_id is None:
+        logger.warning(
+            "User with ID: {current_user_id} try to like non exist tweet "
+            "with ID: {id}",
+            current_user_id=current_user_id,
+            id=id,
+        )
+        return ORJSONResponse(
+            status_code=status.HTTP_404_NOT_FOUND,
+            content={
+                "result": False,
+                "error_type": "NoResultFound",
+                "error_message": "Tweet not found",
+            },
+        )
+    if author_id == current_user_id:
+        logger.warning(
+            "User with ID: {current_user_id} try to like own tweet with "
+            "ID: {id}",
+            current_user_id=current_user_id,
+            id=id,
+        )
+        error_message = "You can't like own tweet"
+    elif LIKES_WRITE_BEHIND:
+        return None
+    else:
+        logger.warning(
+            "User with ID: {current_user_id} try to like tweet with ID: "
+            "{id} again",
+            current_user_id=current_user_id,
+            id=id,
+        )
+        error_message = "Tweet is already liked"
+    return ORJSONResponse(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        content={
+            "result": False,
+            "error_type": "ValueError",
+            "error_message": error_message,
+        },
+    )
+
+
 @router.post(
     "/{id}/likes",
     status_code=status.HTTP_201_CREATED,
     response_model=SuccessMessage,
     responses={
+        202: accepted_response,
         400: bad_request_error_response,
         404: not_found_error_response,
         422: validation_error_response,
@@ -177,56 +258,49 @@ async def like_tweet(
     """
     Эндпоинт для установки отметки «Нравится» на твит.
 
+    При включённом LIKES_WRITE_BEHIND лайк добавляется в очередь лайков.
     :param id: ID твита
     :param api_key: api_key пользователя
     :param session: асинхронная сессия
     :return: response
     """
     logger.info(
-        "User with api key: {api_key} try to like tweet with ID: {id}".format(
-            api_key=api_key,
-            id=id,
-        ),
+        "User with api key: {api_key} try to like tweet with ID: {id}",
+        api_key=api_key,
+        id=id,
     )
     current_user_id = await get_user_id_by_api_key(api_key, session)
-    tweet_query = (
-        select(Tweet).
-        filter_by(id=id).
-        options(load_only(Tweet.author_id))
-    )
-    tweet_query_result = await session.execute(tweet_query)
-    tweet = tweet_query_result.scalars().one()
-    if tweet.author_id == current_user_id:
-        logger.warning(
-            "User with ID: {current_user_id}".format(
-                current_user_id=current_user_id,
-            ) + "try to like own tweet with ID: {id}".format(
-                id=id,
-            ),
+    liked_tweet_ids = []
+    if not LIKES_WRITE_BEHIND:
+        liked_tweet_ids = await add_likes(current_user_id, [id], session)
+    if liked_tweet_ids:
+        await commit_feed_change(session, api_key)
+        logger.info(
+            "Tweet with ID: {id} was liked by user with ID: "
+            "{current_user_id}",
+            id=id,
+            current_user_id=current_user_id,
         )
-        return JSONResponse(
-            status_code=status.HTTP_400_BAD_REQUEST,
+        return ORJSONResponse(
+            status_code=status.HTTP_201_CREATED,
             content={
-                "result": False,
-                "error_type": "ValueError",
-                "error_message": "You can't like own tweet",
+                "result": True,
             },
         )
-    like = Like(
-        user_id=current_user_id,
-        tweet_id=id,
+    error_response = await get_like_error_response(
+        id, current_user_id, session,
     )
-    session.add(like)
-    await session.commit()
+    if error_response is not None:
+        return error_response
+    await likes_buffer.add(current_user_id, [id], liked=True)
     logger.info(
-        "Tweet with ID: {id} was liked by user with ID: ".format(
-            id=id,
-        ) + "{current_user_id}".format(
-            current_user_id=current_user_id,
-        ),
+        "Like of tweet with ID: {id} by user with ID: {current_user_id} "
+        "was queued",
+        id=id,
+        current_user_id=current_user_id,
     )
-    return JSONResponse(
-        status_code=status.HTTP_201_CREATED,
+    return ORJSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
         content={
             "result": True,
         },
@@ -237,6 +311,7 @@ async def like_tweet(
     "/{id}/likes",
     response_model=SuccessMessage,
     responses={
+        202: accepted_response,
         404: not_found_error_response,
         422: validation_error_response,
     },
@@ -249,50 +324,55 @@ async def dislike_tweet(
     """
     Эндпоинт для удаления отметки «Нравится» с твита.
 
+    При включённом LIKES_WRITE_BEHIND отмена лайка добавляется в очередь
+    лайков.
     :param id: ID твита
     :param api_key: api_key пользователя
     :param session: асинхронная сессия
     :return: response
     """
     logger.info(
-        "User with api key: {api_key} try to dislike tweet with ID: ".format(
-            api_key=api_key,
-        ) + "{id}".format(
-            id=id,
-        ),
+        "User with api key: {api_key} try to dislike tweet with ID: {id}",
+        api_key=api_key,
+        id=id,
     )
     current_user_id = await get_user_id_by_api_key(api_key, session)
-    stmt = (
-        delete(Like).
-        filter(
-            and_(Like.user_id == current_user_id, Like.tweet_id == id),
-        ).
-        returning(Like)
-    )
-    like_delete_result = await session.execute(stmt)
-    deleted_like = like_delete_result.fetchone()
-    if deleted_like:
-        await session.commit()
-        logger.info(
-            "Tweet with ID: {id} was disliked by user with id: ".format(
+    if LIKES_WRITE_BEHIND:
+        queued_tweet_ids = await queue_likes_change(
+            likes_buffer, current_user_id, [id], session, liked=False,
+        )
+        if queued_tweet_ids:
+            logger.info(
+                "Dislike of tweet with ID: {id} by user with ID: "
+                "{current_user_id} was queued",
                 id=id,
-            ) + "{current_user_id}".format(
                 current_user_id=current_user_id,
-            ),
+            )
+            return ORJSONResponse(
+                status_code=status.HTTP_202_ACCEPTED,
+                content={
+                    "result": True,
+                },
+            )
+    elif await remove_likes(current_user_id, [id], session):
+        await commit_feed_change(session, api_key)
+        logger.info(
+            "Tweet with ID: {id} was disliked by user with id: "
+            "{current_user_id}",
+            id=id,
+            current_user_id=current_user_id,
         )
-        return JSONResponse(
+        return ORJSONResponse(
             content={
                 "result": True,
             },
         )
     logger.warning(
-        "Tweet with ID: {id} wasn't liked by author with ID: {author_id}".
-        format(
-            id=id,
-            author_id=current_user_id,
-        ),
+        "Tweet with ID: {id} wasn't liked by author with ID: {author_id}",
+        id=id,
+        author_id=current_user_id,
     )
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_404_NOT_FOUND,
         content={
             "result": False,
@@ -302,10 +382,125 @@ async def dislike_tweet(
     )
 
 
+async def change_likes(
+    api_key: str,
+    tweet_ids: Sequence[int],
+    session: AsyncSession,
+    liked: bool,
+) -> Response:
+    """
+    Функция для установки или удаления отметок «Нравится» пачкой.
+
+    При включённом LIKES_WRITE_BEHIND изменения добавляются в очередь
+    лайков, и ответ имеет статус 202.
+    :param api_key: api_key пользователя
+    :param tweet_ids: ID твитов
+    :param session: асинхронная сессия
+    :param liked: True для лайков, False для их отмены
+    :return: response с ID твитов, лайки которых изменены
+    """
+    current_user_id = await get_user_id_by_api_key(api_key, session)
+    if LIKES_WRITE_BEHIND:
+        changed_tweet_ids = await queue_likes_change(
+            likes_buffer, current_user_id, tweet_ids, session, liked=liked,
+        )
+        status_code = status.HTTP_202_ACCEPTED
+    else:
+        apply_likes_change = add_likes if liked else remove_likes
+        changed_tweet_ids = await apply_likes_change(
+            current_user_id, tweet_ids, session,
+        )
+        if changed_tweet_ids:
+            await commit_feed_change(session, api_key)
+        status_code = status.HTTP_200_OK
+    logger.info(
+        "Tweets with IDs: {tweet_ids} were {action} by user with ID: "
+        "{current_user_id}",
+        tweet_ids=changed_tweet_ids,
+        action="liked" if liked else "disliked",
+        current_user_id=current_user_id,
+    )
+    return ORJSONResponse(
+        status_code=status_code,
+        content={
+            "result": True,
+            "tweet_ids": changed_tweet_ids,
+        },
+    )
+
+
+@router.post(
+    "/likes/batch",
+    response_model=TweetIdsOut,
+    responses={
+        202: accepted_response,
+        422: validation_error_response,
+    },
+)
+async def like_tweets(
+    tweet_ids_in: TweetIdsIn,
+    api_key: Annotated[str, Header()],
+    session: AsyncSession = Depends(get_async_session),
+) -> Response:
+    """
+    Эндпоинт для установки отметок «Нравится» на несколько твитов.
+
+    Собственные, несуществующие и уже лайкнутые твиты пропускаются.
+    :param tweet_ids_in: ID твитов
+    :param api_key: api_key пользователя
+    :param session: асинхронная сессия
+    :return: response с ID лайкнутых твитов
+    """
+    logger.info(
+        "User with api key: {api_key} try to like tweets with IDs: "
+        "{tweet_ids}",
+        api_key=api_key,
+        tweet_ids=tweet_ids_in.tweet_ids,
+    )
+    return await change_likes(
+        api_key, tweet_ids_in.tweet_ids, session, liked=True,
+    )
+
+
+@router.post(
+    "/likes/batch/delete",
+    response_model=TweetIdsOut,
+    responses={
+        202: accepted_response,
+        422: validation_error_response,
+    },
+)
+async def dislike_tweets(
+    tweet_ids_in: TweetIdsIn,
+    api_key: Annotated[str, Header()],
+    session: AsyncSession = Depends(get_async_session),
+) -> Response:
+    """
+    Эндпоинт для удаления отметок «Нравится» с нескольких твитов.
+
+    Твиты без лайка пользователя пропускаются. Эндпоинт принимает POST,
+    потому что тело запроса DELETE не передают многие клиенты и прокси.
+    :param tweet_ids_in: ID твитов
+    :param api_key: api_key пользователя
+    :param session: асинхронная сессия
+    :return: response с ID твитов, с которых удалены лайки
+    """
+    logger.info(
+        "User with api key: {api_key} try to dislike tweets with IDs: "
+        "{tweet_ids}",
+        api_key=api_key,
+        tweet_ids=tweet_ids_in.tweet_ids,
+    )
+    return await change_likes(
+        api_key, tweet_ids_in.tweet_ids, session, liked=False,
+    )
+
+
 @router.get(
     "",
     response_model=TweetsOut,
     responses={
+        400: bad_request_error_response,
         404: not_found_error_response,
         422: validation_error_response,
     },
@@ -314,50 +509,153 @@ async def get_tweets(
     api_key: Annotated[str, Header()],
     limit: Annotated[int | None, Query(ge=0)] = None,
     offset: Annotated[int | None, Query(ge=0)] = None,
-    session: AsyncSession = Depends(get_async_session),
-) -> dict[str, bool | Sequence[Tweet]]:
+    cursor: Annotated[str | None, Query()] = None,
+    session: AsyncSession = Depends(get_async_read_session),
+) -> Response:
     """
     Эндпоинт для получения списка твитов.
 
+    При передаче курсора страница выбирается по ключу (количество лайков,
+    ID твита) последнего твита предыдущей страницы, сдвиг не учитывается.
+    При включённом TWEETS_FEED_SQL_JSON ответ собирается в PostgreSQL.
+    Сериализованные страницы ленты кэшируются до её изменения, а
+    одновременные запросы одной страницы ожидают одно её построение.
     :param api_key: api_key пользователя
     :param limit: лимит
     :param offset: сдвиг
+    :param cursor: курсор следующей страницы
     :param session: асинхронная сессия
     :return: response
     """
     logger.info(
-        "User with api key: {api_key} try to get tweets with limit: ".format(
-            api_key=api_key,
-        ) + "{limit} and offset: {offset}".format(
+        "User with api key: {api_key} try to get tweets with limit: "
+        "{limit}, offset: {offset} and cursor: {cursor}",
+        api_key=api_key,
+        limit=limit,
+        offset=offset,
+        cursor=cursor,
+    )
+    current_user_id = await get_user_id_by_api_key(api_key, session)
+    feed_page_key = (limit, offset, cursor)
+    feed_version = await feed_cache.current_version()
+    tweets_feed = await feed_cache.get(feed_page_key, feed_version)
+    if tweets_feed is not None:
+        logger.info(
+            "User with ID: {user_id} get cached tweets with limit: "
+            "{limit}, offset: {offset} and cursor: {cursor}",
+            user_id=current_user_id,
             limit=limit,
             offset=offset,
-        ),
+            cursor=cursor,
+        )
+        return Response(content=tweets_feed, media_type="application/json")
+    page_filter = None
+    if cursor:
+        try:
+            page_filter = get_feed_page_filter(cursor)
+        except ValueError:
+            logger.warning(
+                "User with ID: {user_id} send invalid cursor: {cursor}",
+                user_id=current_user_id,
+                cursor=cursor,
+            )
+            return ORJSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={
+                    "result": False,
+                    "error_type": "ValueError",
+                    "error_message": "Invalid cursor",
+                },
+            )
+    tweets_feed = await load_tweets_feed(
+        session,
+        feed_version,
+        feed_page_key,
+        page_filter,
+        sql_json=TWEETS_FEED_SQL_JSON,
+    )
+    logger.info(
+        "User with ID: {user_id} get tweets with limit: "
+        "{limit}, offset: {offset} and cursor: {cursor}",
+        user_id=current_user_id,
+        limit=limit,
+        offset=offset,
+        cursor=cursor,
+    )
+    return Response(content=tweets_feed, media_type="application/json")
+
+
+@router.get(
+    "/timeline",
+    response_model=TweetsOut,
+    responses={
+        404: not_found_error_response,
+        422: validation_error_response,
+    },
+)
+async def get_home_timeline(
+    api_key: Annotated[str, Header()],
+    limit: Annotated[int, Query(gt=0)] = TIMELINE_PAGE_SIZE,
+    cursor: Annotated[int | None, Query(gt=0)] = None,
+    session: AsyncSession = Depends(get_async_read_session),
+) -> Response | dict[str, bool | str | None | Sequence[Tweet]]:
+    """
+    Эндпоинт для получения домашней ленты твитов.
+
+    Лента содержит твиты пользователя и отслеживаемых им авторов от новых
+    к старым.
+    :param api_key: api_key пользователя
+    :param limit: лимит
+    :param cursor: ID последнего твита предыдущей страницы
+    :param session: асинхронная сессия
+    :return: response
+    """
+    logger.info(
+        "User with api key: {api_key} try to get home timeline with "
+        "limit: {limit} and cursor: {cursor}",
+        api_key=api_key,
+        limit=limit,
+        cursor=cursor,
     )
     current_user_id = await get_user_id_by_api_key(api_key, session)
-    if offset and limit:
-        offset = (offset - 1) * limit
     query = (
         select(Tweet).options(load_only(Tweet.content)).
-        options(selectinload(Tweet.tweet_medias).load_only(TweetMedia.image)).
+        options(
+            selectinload(Tweet.tweet_medias).load_only(
+                TweetMedia.image,
+                TweetMedia.thumbnail,
+                TweetMedia.medium,
+                TweetMedia.webp,
+            ),
+        ).
         options(selectinload(Tweet.author).load_only(User.name)).
         options(selectinload(Tweet.put_like_users).load_only(User.name)).
-        join(Like, isouter=True).
-        group_by(Tweet.id).
-        order_by(func.count(Tweet.likes).desc(), Tweet.id).
-        offset(offset).
+        filter(
+            Tweet.id.in_(
+                get_home_timeline_tweet_ids_query(
+                    current_user_id, limit, cursor,
+                ),
+            ),
+        ).
+        order_by(Tweet.id.desc()).
         limit(limit)
     )
-    tweets_select_result = await session.execute(query)
-    tweets = tweets_select_result.scalars().all()
+    tweets = (await session.scalars(query)).all()
+    next_cursor = None
+    if len(tweets) == limit:
+        next_cursor = str(tweets[-1].id)
     logger.info(
-        "User with ID: {user_id} get tweets with limit: ".format(
-            user_id=current_user_id,
-        ) + "{limit} and offset: {offset}".format(
-            limit=limit,
-            offset=offset,
-        ),
+        "User with ID: {user_id} get home timeline with limit: "
+        "{limit} and cursor: {cursor}",
+        user_id=current_user_id,
+        limit=limit,
+        cursor=cursor,
+    )
+    return build_model_response(
+        TweetsOut,
+        {
+            "result": True,
+            "tweets": tweets,
+            "next_cursor": next_cursor,
+        },
     )
-    return {
-        "result": True,
-        "tweets": tweets,
-    }
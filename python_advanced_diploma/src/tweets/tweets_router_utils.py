@@ -1,10 +1,20 @@
 """Tweets router utils file. Use to create util functions."""
-from sqlalchemy import update
+from typing import Sequence
+
+from sqlalchemy import delete, literal, select, update
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from python_advanced_diploma.src.medias.medias_models import TweetMedia
-from python_advanced_diploma.src.tweets.tweets_models import Tweet
+from python_advanced_diploma.src.tweets.tweets_likes_buffer import (
+    LikesBuffer,
+)
+from python_advanced_diploma.src.tweets.tweets_models import Like, Tweet
 from python_advanced_diploma.src.tweets.tweets_schemas import TweetIn
+from python_advanced_diploma.src.tweets.tweets_timeline import (
+    fan_out_tweet,
+    is_author_fan_out_allowed,
+)
 
 
 async def create_new_tweet(
@@ -20,13 +30,15 @@ async def create_new_tweet(
     :param new_tweet: новый твит
     :return: экземпляр класса 'Tweet' | None
     """
+    is_fanned_out = await is_author_fan_out_allowed(current_user_id, session)
     tweet = Tweet(
         content=new_tweet.tweet_data,
         author_id=current_user_id,
+        is_fanned_out=is_fanned_out,
     )
     session.add(tweet)
+    await session.flush()
     if new_tweet.tweet_media_ids:
-        await session.flush()
         medias_update_stmt = (
             update(TweetMedia).
             where(
@@ -39,5 +51,118 @@ async def create_new_tweet(
         medias_update_ids = medias_update_result.scalars().all()
         if len(new_tweet.tweet_media_ids) != len(medias_update_ids):
             return None
+    await fan_out_tweet(tweet, session)
     await session.commit()
     return tweet
+
+
+async def get_likeable_tweet_ids(
+    user_id: int, tweet_ids: Sequence[int], session: AsyncSession,
+) -> list[int]:
+    """
+    Функция для получения ID существующих чужих твитов.
+
+    :param user_id: ID пользователя
+    :param tweet_ids: ID твитов
+    :param session: асинхронная сессия
+    :return: ID твитов, которые пользователь может лайкнуть
+    """
+    tweet_ids_result = await session.scalars(
+        select(Tweet.id).
+        filter(Tweet.id.in_(tweet_ids), Tweet.author_id != user_id).
+        order_by(Tweet.id),
+    )
+    return list(tweet_ids_result)
+
+
+async def add_likes(
+    user_id: int, tweet_ids: Sequence[int], session: AsyncSession,
+) -> list[int]:
+    """
+    Функция для установки отметок «Нравится» на чужие твиты.
+
+    Проверка авторов твитов, вставка лайков и увеличение счётчиков лайков
+    выполняются одним запросом. Повторные лайки не вставляются и не
+    прерывают транзакцию, а счётчики увеличиваются только для вставленных.
+    :param user_id: ID пользователя
+    :param tweet_ids: ID твитов
+    :param session: асинхронная сессия
+    :return: ID лайкнутых твитов
+    """
+    liked_tweets = (
+        select(literal(user_id), Tweet.id).
+        filter(Tweet.id.in_(tweet_ids), Tweet.author_id != user_id)
+    )
+    inserted_likes = (
+        insert(Like).
+        from_select(["user_id", "tweet_id"], liked_tweets).
+        on_conflict_do_nothing().
+        returning(Like.tweet_id).
+        cte("inserted_likes")
+    )
+    like_count_update_result = await session.execute(
+        update(Tweet).
+        filter(Tweet.id.in_(select(inserted_likes.c.tweet_id))).
+        values(like_count=Tweet.like_count + 1).
+        returning(Tweet.id),
+    )
+    return sorted(like_count_update_result.scalars().all())
+
+
+async def remove_likes(
+    user_id: int, tweet_ids: Sequence[int], session: AsyncSession,
+) -> list[int]:
+    """
+    Функция для удаления отметок «Нравится» с твитов.
+
+    Удаление лайков и уменьшение счётчиков лайков выполняются одним
+    запросом.
+    :param user_id: ID пользователя
+    :param tweet_ids: ID твитов
+    :param session: асинхронная сессия
+    :return: ID твитов, с которых удалены лайки
+    """
+    deleted_likes = (
+        delete(Like).
+        filter(Like.user_id == user_id, Like.tweet_id.in_(tweet_ids)).
+        returning(Like.tweet_id).
+        cte("deleted_likes")
+    )
+    like_count_update_result = await session.execute(
+        update(Tweet).
+        filter(Tweet.id.in_(select(deleted_likes.c.tweet_id))).
+        values(like_count=Tweet.like_count - 1).
+        returning(Tweet.id),
+    )
+    return sorted(like_count_update_result.scalars().all())
+
+
+async def queue_likes_change(
+    likes_buffer: LikesBuffer,
+    user_id: int,
+    tweet_ids: Sequence[int],
+    session: AsyncSession,
+    liked: bool,
+) -> list[int]:
+    """
+    Функция для добавления лайков или их отмены в очередь лайков.
+
+    В очередь добавляются лайки чужих существующих твитов и отмены
+    лайков, которые есть в очереди или в БД.
+    :param likes_buffer: очередь лайков
+    :param user_id: ID пользователя
+    :param tweet_ids: ID твитов
+    :param session: асинхронная сессия
+    :param liked: True для лайков, False для их отмены
+    :return: ID твитов, лайки которых добавлены в очередь
+    """
+    if liked:
+        queued_tweet_ids = await get_likeable_tweet_ids(
+            user_id, tweet_ids, session,
+        )
+    else:
+        queued_tweet_ids = await likes_buffer.get_liked_tweet_ids(
+            user_id, tweet_ids, session,
+        )
+    await likes_buffer.add(user_id, queued_tweet_ids, liked=liked)
+    return queued_tweet_ids
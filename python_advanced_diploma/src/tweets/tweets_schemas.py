@@ -1,6 +1,7 @@
 """Tweets schemas file. Used to define schemas to tweets routes."""
 from pydantic import BaseModel, Field, conint, model_serializer
 
+from python_advanced_diploma.src.config import BATCH_MAX_SIZE
 from python_advanced_diploma.src.schemas import SuccessMessage
 from python_advanced_diploma.src.users.users_schemas import BaseUser
 
@@ -18,6 +19,20 @@ class TweetCreated(SuccessMessage):
     tweet_id: int = Field(..., gt=0)
 
 
+class TweetIdsIn(BaseModel):
+    """Входящие ID твитов. Родитель: BaseModel."""
+
+    tweet_ids: list[conint(gt=0)] = Field(  # type: ignore
+        ..., min_length=1, max_length=BATCH_MAX_SIZE,
+    )
+
+
+class TweetIdsOut(SuccessMessage):
+    """ID твитов, изменённых запросом. Родитель: SuccessMessage."""
+
+    tweet_ids: list[int]
+
+
 class LikeOut(BaseModel):
     """Исходящий лайк. Родитель: BaseModel."""
 
@@ -29,15 +44,26 @@ class TweetImage(BaseModel):
     """Изображение твита. Родитель: BaseModel."""
 
     image: str
+    medium: str | None = None
 
     @model_serializer
     def serialize_model(self) -> str:
         """
         Метод для сериализации модели изображения твита.
 
+        Если уменьшенная копия изображения уже создана, возвращается она.
         :return: изображение твита
         """
-        return self.image
+        return self.medium or self.image
+
+
+class TweetImageRenditions(BaseModel):
+    """Копии изображения твита. Родитель: BaseModel."""
+
+    original: str = Field(..., validation_alias="image")
+    thumbnail: str | None = None
+    medium: str | None = None
+    webp: str | None = None
 
 
 class TweetOut(BaseModel):
@@ -51,9 +77,14 @@ class TweetOut(BaseModel):
     )
     author: BaseUser
     put_like_users: list[LikeOut] = Field(..., serialization_alias="likes")
+    attachment_renditions: list[TweetImageRenditions] = Field(
+        ...,
+        validation_alias="tweet_medias",
+    )
 
 
 class TweetsOut(SuccessMessage):
     """Лента с твитами. Родитель: SuccessMessage."""
 
     tweets: list[TweetOut]
+    next_cursor: str | None = None
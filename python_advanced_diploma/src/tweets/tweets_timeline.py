@@ -0,0 +1,193 @@
+"""Tweets timeline file. Used to maintain home timelines of users.
+
+New tweets are fanned out to the timelines of the followers of their
+author when it has few enough followers. Tweets of the other authors are
+read from the tweets table when the timeline is requested.
+"""
+from typing import Sequence
+
+from sqlalchemy import (
+    Integer,
+    delete,
+    func,
+    literal,
+    or_,
+    select,
+    true,
+    union_all,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql.expression import CompoundSelect
+
+from python_advanced_diploma.src.config import (
+    TIMELINE_BACKFILL_SIZE,
+    TIMELINE_FANOUT_MAX_FOLLOWERS,
+)
+from python_advanced_diploma.src.tweets.tweets_models import (
+    TimelineEntry,
+    Tweet,
+)
+from python_advanced_diploma.src.users.users_models import Follow
+
+
+async def is_author_fan_out_allowed(
+    author_id: int, session: AsyncSession,
+) -> bool:
+    """
+    Функция для проверки возможности рассылки твитов автора по лентам.
+
+    Подписчики считаются не дальше лимита, поэтому проверка для авторов с
+    большим количеством подписчиков не читает всю таблицу подписок.
+    :param author_id: ID автора
+    :param session: асинхронная сессия
+    :return: True, если количество подписчиков не превышает лимит
+    """
+    followers_query = (
+        select(Follow.followed_user_id).
+        filter(Follow.following_user_id == author_id).
+        limit(TIMELINE_FANOUT_MAX_FOLLOWERS + 1)
+    ).subquery()
+    followers_count_result = await session.execute(
+        select(func.count()).select_from(followers_query),
+    )
+    followers_count = followers_count_result.scalar_one()
+    return followers_count <= TIMELINE_FANOUT_MAX_FOLLOWERS
+
+
+async def fan_out_tweet(tweet: Tweet, session: AsyncSession) -> None:
+    """
+    Функция для добавления нового твита в домашние ленты.
+
+    Твит всегда добавляется в ленту автора, а в ленты подписчиков - только
+    если он помечен для рассылки. Твиты авторов с большим количеством
+    подписчиков читаются из таблицы твитов при получении ленты.
+    :param tweet: твит
+    :param session: асинхронная сессия
+    """
+    timeline_entries = [
+        select(literal(tweet.author_id), literal(tweet.id)),
+    ]
+    if tweet.is_fanned_out:
+        timeline_entries.append(
+            select(Follow.followed_user_id, literal(tweet.id)).
+            filter(Follow.following_user_id == tweet.author_id),
+        )
+    await session.execute(
+        insert(TimelineEntry).from_select(
+            ["user_id", "tweet_id"],
+            union_all(*timeline_entries),
+        ),
+    )
+
+
+async def backfill_timeline(
+    user_id: int, author_ids: Sequence[int], session: AsyncSession,
+) -> None:
+    """
+    Функция для добавления последних твитов авторов в ленту подписчика.
+
+    Твиты каждого автора выбираются с лимитом в боковом подзапросе.
+    :param user_id: ID подписчика
+    :param author_ids: ID авторов
+    :param session: асинхронная сессия
+    """
+    authors = func.unnest(
+        literal(list(author_ids), ARRAY(Integer)),
+    ).table_valued("author_id").render_derived()
+    author_tweets = (
+        select(Tweet.id).
+        filter(
+            Tweet.author_id == authors.c.author_id,
+            Tweet.is_fanned_out.is_(True),
+        ).
+        order_by(Tweet.id.desc()).
+        limit(TIMELINE_BACKFILL_SIZE).
+        lateral()
+    )
+    authors_tweets = (
+        select(literal(user_id), author_tweets.c.id).
+        select_from(authors).
+        join(author_tweets, true())
+    )
+    await session.execute(
+        insert(TimelineEntry).
+        from_select(["user_id", "tweet_id"], authors_tweets).
+        on_conflict_do_nothing(),
+    )
+
+
+async def remove_author_from_timeline(
+    user_id: int, author_ids: Sequence[int], session: AsyncSession,
+) -> None:
+    """
+    Функция для удаления твитов авторов из ленты бывшего подписчика.
+
+    :param user_id: ID бывшего подписчика
+    :param author_ids: ID авторов
+    :param session: асинхронная сессия
+    """
+    await session.execute(
+        delete(TimelineEntry).
+        filter(
+            TimelineEntry.user_id == user_id,
+            TimelineEntry.tweet_id.in_(
+                select(Tweet.id).filter(Tweet.author_id.in_(author_ids)),
+            ),
+        ),
+    )
+
+
+def get_home_timeline_tweet_ids_query(
+    user_id: int, limit: int, cursor: int | None,
+) -> CompoundSelect:
+    """
+    Функция для построения запроса ID твитов домашней ленты.
+
+    Объединяет записи ленты пользователя и твиты пользователя и
+    отслеживаемых авторов, которые не рассылались по лентам при создании.
+    Собственные твиты, созданные до появления лент, есть только в таблице
+    твитов, поэтому они тоже читаются из неё.
+    :param user_id: ID пользователя
+    :param limit: лимит
+    :param cursor: ID последнего твита предыдущей страницы
+    :return: запрос ID твитов
+    """
+    timeline_query = (
+        select(TimelineEntry.tweet_id).
+        filter(TimelineEntry.user_id == user_id)
+    )
+    not_fanned_out_query = (
+        select(Tweet.id.label("tweet_id")).
+        filter(
+            or_(
+                Tweet.author_id == user_id,
+                Tweet.author_id.in_(
+                    select(Follow.following_user_id).
+                    filter(Follow.followed_user_id == user_id),
+                ),
+            ),
+            Tweet.is_fanned_out.is_(False),
+        )
+    )
+    if cursor:
+        timeline_query = timeline_query.filter(
+            TimelineEntry.tweet_id < cursor,
+        )
+        not_fanned_out_query = not_fanned_out_query.filter(Tweet.id < cursor)
+    timeline_subquery = (
+        timeline_query.
+        order_by(TimelineEntry.tweet_id.desc()).
+        limit(limit).
+        subquery()
+    )
+    not_fanned_out_subquery = (
+        not_fanned_out_query.
+        order_by(Tweet.id.desc()).
+        limit(limit).
+        subquery()
+    )
+    return union_all(
+        select(timeline_subquery.c.tweet_id),
+        select(not_fanned_out_subquery.c.tweet_id),
+    )
@@ -2,7 +2,7 @@
 
 from typing import Annotated
 
-from sqlalchemy import ForeignKey
+from sqlalchemy import ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from python_advanced_diploma.src.database import Base
@@ -28,9 +28,18 @@ class User(Base):
     id: Mapped[int] = mapped_column(primary_key=True)
     name: Mapped[str]
     user_api_key: Mapped[str] = mapped_column(unique=True)
+    followers_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    following_count: Mapped[int] = mapped_column(default=0, server_default="0")
     followers: Mapped[list["User"]] = relationship(
         secondary="follow",
         primaryjoin=(Follow.following_user_id == id),
         secondaryjoin=(Follow.followed_user_id == id),
         backref="following",
     )
+
+
+Index(
+    "ix_follow_followed_user_id_following_user_id",
+    Follow.followed_user_id,
+    Follow.following_user_id,
+)
@@ -1,28 +1,62 @@
 """Users router file. Used to define users routes."""
 
-from typing import Annotated
+from functools import partial
+from typing import Annotated, Any, Sequence
 
 from fastapi import APIRouter, Depends, Header, Response, status
-from fastapi.params import Path
-from sqlalchemy import and_, delete, select
+from fastapi.params import Path, Query
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import load_only, selectinload
-from starlette.responses import JSONResponse
 
-from python_advanced_diploma.src.config import logger
-from python_advanced_diploma.src.database import get_async_session
+from python_advanced_diploma.src.config import (
+    BATCH_MAX_SIZE,
+    FOLLOWS_PAGE_SIZE,
+    logger,
+)
+from python_advanced_diploma.src.database import (
+    get_async_read_session,
+    get_async_session,
+)
+from python_advanced_diploma.src.invalidation import commit_user_write
 from python_advanced_diploma.src.responses import (
     bad_request_error_response,
     not_found_error_response,
     validation_error_response,
 )
-from python_advanced_diploma.src.routers_utils import get_user_id_by_api_key
+from python_advanced_diploma.src.routers_utils import (
+    build_model_response,
+    get_user_id_by_api_key,
+)
 from python_advanced_diploma.src.schemas import SuccessMessage
-from python_advanced_diploma.src.users.users_models import Follow, User
-from python_advanced_diploma.src.users.users_schemas import UsersOut
+from python_advanced_diploma.src.tweets.tweets_timeline import (
+    backfill_timeline,
+    remove_author_from_timeline,
+)
+from python_advanced_diploma.src.users.users_models import User
+from python_advanced_diploma.src.users.users_router_utils import (
+    add_follows,
+    add_follows_previews,
+    build_profile_info,
+    get_follows_page,
+    get_profiles_query,
+    profile_flight,
+    remove_follows,
+)
+from python_advanced_diploma.src.users.users_schemas import (
+    FollowsOut,
+    UserIdsIn,
+    UserIdsOut,
+    UsersListOut,
+    UsersOut,
+)
 
 router = APIRouter(prefix="/api/users", tags=["User"])
 
+ProfileIds = Annotated[
+    list[int], Query(min_length=1, max_length=BATCH_MAX_SIZE),
+]
+
 
 @router.post(
     "/{id}/follow",
@@ -48,20 +82,17 @@ async def follow_user(
     :return: response
     """
     logger.info(
-        "User with api key: {api_key}".format(
-            api_key=api_key,
-        ) + " try to following user with ID: {id}".format(
-            id=id,
-        ),
+        "User with api key: {api_key} try to following user with ID: {id}",
+        api_key=api_key,
+        id=id,
     )
     current_user_id = await get_user_id_by_api_key(api_key, session)
     if id == current_user_id:
         logger.warning(
-            "User with ID: {current_user_id} ".format(
-                current_user_id=current_user_id,
-            ) + "try to following self",
+            "User with ID: {current_user_id} try to following self",
+            current_user_id=current_user_id,
         )
-        return JSONResponse(
+        return ORJSONResponse(
             status_code=status.HTTP_400_BAD_REQUEST,
             content={
                 "result": False,
@@ -69,19 +100,42 @@ async def follow_user(
                 "error_message": "You can't follow yourself",
             },
         )
-    follow = Follow(
-        following_user_id=id,
-        followed_user_id=current_user_id,
-    )
-    session.add(follow)
-    await session.commit()
+    if not await add_follows(current_user_id, [id], session):
+        followee_query_result = await session.execute(
+            select(User.id).filter_by(id=id),
+        )
+        if followee_query_result.scalar_one_or_none() is None:
+            logger.warning(
+                "User with ID: {current_user_id} try to following non exist "
+                "user with ID: {id}",
+                current_user_id=current_user_id,
+                id=id,
+            )
+            error_message = "User not found"
+        else:
+            logger.warning(
+                "User with ID: {current_user_id} already following user with "
+                "ID: {id}",
+                current_user_id=current_user_id,
+                id=id,
+            )
+            error_message = "User is already followed"
+        return ORJSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "result": False,
+                "error_type": "ValueError",
+                "error_message": error_message,
+            },
+        )
+    await backfill_timeline(current_user_id, [id], session)
+    await commit_user_write(session, api_key)
     logger.info(
-        "User with ID: {current_user_id} following user with ID: {id}".format(
-            current_user_id=current_user_id,
-            id=id,
-        ),
+        "User with ID: {current_user_id} following user with ID: {id}",
+        current_user_id=current_user_id,
+        id=id,
     )
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_201_CREATED,
         content={"result": True},
     )
@@ -109,43 +163,29 @@ async def cancel_follow_user(
     :return: response
     """
     logger.info(
-        "User with api key: {api_key}".format(
-            api_key=api_key,
-        ) + " try to stop following user with ID: {id}".format(
-            id=id,
-        ),
+        "User with api key: {api_key} try to stop following user with ID: "
+        "{id}",
+        api_key=api_key,
+        id=id,
     )
     current_user_id = await get_user_id_by_api_key(api_key, session)
-    stmt = (
-        delete(Follow).
-        filter(
-            and_(
-                Follow.following_user_id == id,
-                Follow.followed_user_id == current_user_id,
-            ),
-        ).
-        returning(Follow)
-    )
-    follow_delete_result = await session.execute(stmt)
-    deleted_follow = follow_delete_result.fetchone()
-    if deleted_follow:
-        await session.commit()
+    if await remove_follows(current_user_id, [id], session):
+        await remove_author_from_timeline(current_user_id, [id], session)
+        await commit_user_write(session, api_key)
         logger.info(
-            "User with ID: {current_user_id}".format(
-                current_user_id=current_user_id,
-            ) + " stop following user with ID: {id}".format(
-                id=id,
-            ),
+            "User with ID: {current_user_id} stop following user with ID: "
+            "{id}",
+            current_user_id=current_user_id,
+            id=id,
         )
-        return JSONResponse(content={"result": True})
+        return ORJSONResponse(content={"result": True})
     logger.warning(
         "User with ID: {id} wasn't followed by user with ID: "
-        "{current_user_id}".format(
-            id=id,
-            current_user_id=current_user_id,
-        ),
+        "{current_user_id}",
+        id=id,
+        current_user_id=current_user_id,
     )
-    return JSONResponse(
+    return ORJSONResponse(
         status_code=status.HTTP_404_NOT_FOUND,
         content={
             "result": False,
@@ -155,6 +195,139 @@ async def cancel_follow_user(
     )
 
 
+@router.post(
+    "/follow/batch",
+    response_model=UserIdsOut,
+    responses={
+        422: validation_error_response,
+    },
+)
+async def follow_users(
+    user_ids_in: UserIdsIn,
+    api_key: Annotated[str, Header()],
+    session: AsyncSession = Depends(get_async_session),
+) -> Response:
+    """
+    Эндпоинт для подписки на нескольких пользователей.
+
+    Сам пользователь, несуществующие и уже отслеживаемые пользователи
+    пропускаются.
+    :param user_ids_in: ID пользователей
+    :param api_key: api_key пользователя
+    :param session: асинхронная сессия
+    :return: response с ID пользователей, на которых добавлены подписки
+    """
+    logger.info(
+        "User with api key: {api_key} try to following users with IDs: "
+        "{user_ids}",
+        api_key=api_key,
+        user_ids=user_ids_in.user_ids,
+    )
+    current_user_id = await get_user_id_by_api_key(api_key, session)
+    followed_user_ids = await add_follows(
+        current_user_id, user_ids_in.user_ids, session,
+    )
+    if followed_user_ids:
+        await backfill_timeline(current_user_id, followed_user_ids, session)
+        await commit_user_write(session, api_key)
+    logger.info(
+        "User with ID: {current_user_id} following users with IDs: "
+        "{followed_user_ids}",
+        current_user_id=current_user_id,
+        followed_user_ids=followed_user_ids,
+    )
+    return ORJSONResponse(
+        content={"result": True, "user_ids": followed_user_ids},
+    )
+
+
+@router.post(
+    "/follow/batch/delete",
+    response_model=UserIdsOut,
+    responses={
+        422: validation_error_response,
+    },
+)
+async def cancel_follow_users(
+    user_ids_in: UserIdsIn,
+    api_key: Annotated[str, Header()],
+    session: AsyncSession = Depends(get_async_session),
+) -> Response:
+    """
+    Эндпоинт для отписки от нескольких пользователей.
+
+    Не отслеживаемые пользователи пропускаются. Эндпоинт принимает POST,
+    потому что тело запроса DELETE не передают многие клиенты и прокси.
+    :param user_ids_in: ID пользователей
+    :param api_key: api_key пользователя
+    :param session: асинхронная сессия
+    :return: response с ID пользователей, от которых пользователь отписан
+    """
+    logger.info(
+        "User with api key: {api_key} try to stop following users with "
+        "IDs: {user_ids}",
+        api_key=api_key,
+        user_ids=user_ids_in.user_ids,
+    )
+    current_user_id = await get_user_id_by_api_key(api_key, session)
+    unfollowed_user_ids = await remove_follows(
+        current_user_id, user_ids_in.user_ids, session,
+    )
+    if unfollowed_user_ids:
+        await remove_author_from_timeline(
+            current_user_id, unfollowed_user_ids, session,
+        )
+        await commit_user_write(session, api_key)
+    logger.info(
+        "User with ID: {current_user_id} stop following users with IDs: "
+        "{unfollowed_user_ids}",
+        current_user_id=current_user_id,
+        unfollowed_user_ids=unfollowed_user_ids,
+    )
+    return ORJSONResponse(
+        content={"result": True, "user_ids": unfollowed_user_ids},
+    )
+
+
+@router.get(
+    "",
+    response_model=UsersListOut,
+    responses={
+        422: validation_error_response,
+    },
+)
+async def get_profiles_info(
+    ids: ProfileIds,
+    session: AsyncSession = Depends(get_async_read_session),
+) -> Response | dict[str, bool | Sequence[dict[str, Any]]]:
+    """
+    Эндпоинт для получения информации о нескольких профилях по их ID.
+
+    ID передаются повторяющимся параметром: '?ids=1&ids=2'. Пользователи
+    загружаются одним запросом, а первые подписчики и подписки всех
+    пользователей - ещё одним, несуществующие ID пропускаются.
+    :param ids: ID пользователей
+    :param session: асинхронная сессия
+    :return: response
+    """
+    logger.info("User try to get profiles with IDs: {ids} info", ids=ids)
+    query = get_profiles_query().filter(User.id.in_(ids)).order_by(User.id)
+    select_users_info_result = await session.execute(query)
+    users = [user._asdict() for user in select_users_info_result]
+    await add_follows_previews(users, session)
+    logger.info(
+        "User get {count} profiles info",
+        count=len(users),
+    )
+    return build_model_response(
+        UsersListOut,
+        {
+            "request_result": True,
+            "users": users,
+        },
+    )
+
+
 @router.get(
     "/me",
     response_model=UsersOut,
@@ -165,37 +338,36 @@ async def cancel_follow_user(
 )
 async def get_own_profile_info(
     api_key: Annotated[str | None, Header()],
-    session: AsyncSession = Depends(get_async_session),
-) -> dict[str, bool | User]:
+    session: AsyncSession = Depends(get_async_read_session),
+) -> Response | dict[str, bool | dict[str, Any]]:
     """
     Эндпоинт для получения информации о своём профиле.
 
+    Профиль содержит счётчики и первые PROFILE_FOLLOWS_PREVIEW_SIZE
+    подписчиков и подписок, остальные запрашиваются постранично.
     :param api_key: api_key пользователя
     :param session: асинхронная сессия
     :return: response
     """
     logger.info(
-        "User with api key: {api_key}".format(
-            api_key=api_key,
-        ) + " try to get own profile info",
-    )
-    query = (
-        select(User).options(load_only(User.name)).
-        filter_by(user_api_key=api_key).
-        options(selectinload(User.followers).load_only(User.name)).
-        options(selectinload(User.following).load_only(User.name))
+        "User with api key: {api_key} try to get own profile info",
+        api_key=api_key,
     )
+    query = get_profiles_query().filter_by(user_api_key=api_key)
     select_user_own_info_result = await session.execute(query)
-    current_user = select_user_own_info_result.scalars().one()
+    current_user = select_user_own_info_result.one()._asdict()
+    await add_follows_previews([current_user], session)
     logger.info(
-        "User with ID: {current_user_id} get own profile info".format(
-            current_user_id=current_user.id,
-        ),
+        "User with ID: {current_user_id} get own profile info",
+        current_user_id=current_user["id"],
+    )
+    return build_model_response(
+        UsersOut,
+        {
+            "request_result": True,
+            "user": current_user,
+        },
     )
-    return {
-        "request_result": True,
-        "user": current_user,
-    }
 
 
 @router.get(
@@ -208,34 +380,113 @@ async def get_own_profile_info(
 )
 async def get_profile_info(
     id: Annotated[int, Path(gt=0)],
-    session: AsyncSession = Depends(get_async_session),
-) -> dict[str, bool | User]:
+    session: AsyncSession = Depends(get_async_read_session),
+) -> Response:
     """
     Эндпоинт для получения информации о произвольном профиле по его ID.
 
+    Одновременные запросы одного профиля ожидают одно построение ответа.
+    Сессия запроса закрывается до ожидания ответа, чтобы не удерживать
+    соединение пула, пока ответ строится в отдельной сессии.
     :param id: ID произвольного пользователя
     :param session: асинхронная сессия
     :return: response
     """
+    logger.info("User try to get profile with ID: {id} info", id=id)
+    await session.close()
+    flight_key = (session.bind, id)
+    profile_info = await profile_flight.do(
+        flight_key, partial(build_profile_info, session.bind, id),
+    )
+    logger.info("User get profile with ID: {id} info", id=id)
+    return Response(content=profile_info, media_type="application/json")
+
+
+@router.get(
+    "/{id}/followers",
+    response_model=FollowsOut,
+    responses={
+        404: not_found_error_response,
+        422: validation_error_response,
+    },
+)
+async def get_followers(
+    id: Annotated[int, Path(gt=0)],
+    limit: Annotated[int, Query(gt=0, le=BATCH_MAX_SIZE)] = FOLLOWS_PAGE_SIZE,
+    cursor: Annotated[int | None, Query(gt=0)] = None,
+    session: AsyncSession = Depends(get_async_read_session),
+) -> Response | dict[str, bool | str | None | Sequence[dict[str, Any]]]:
+    """
+    Эндпоинт для получения страницы подписчиков пользователя.
+
+    Подписчики упорядочены по ID, как и первые подписчики в профиле,
+    поэтому курсором продолжения профиля служит ID последнего из них.
+    :param id: ID пользователя
+    :param limit: лимит
+    :param cursor: ID последнего подписчика предыдущей страницы
+    :param session: асинхронная сессия
+    :return: response
+    """
     logger.info(
-        "User try to get profile with ID: {id} info".format(
-            id=id,
-        ),
+        "User try to get followers of user with ID: {id} with limit: "
+        "{limit} and cursor: {cursor}",
+        id=id,
+        limit=limit,
+        cursor=cursor,
     )
-    query = (
-        select(User).options(load_only(User.name)).
-        filter_by(id=id).
-        options(selectinload(User.followers).load_only(User.name)).
-        options(selectinload(User.following).load_only(User.name))
+    follows_page = await get_follows_page(
+        id, followers=True, limit=limit, cursor=cursor, session=session,
     )
-    select_user_info_result = await session.execute(query)
-    user = select_user_info_result.scalars().one()
     logger.info(
-        "User get profile with ID: {id} info".format(
-            id=id,
-        ),
+        "User get followers of user with ID: {id} with limit: {limit} "
+        "and cursor: {cursor}",
+        id=id,
+        limit=limit,
+        cursor=cursor,
+    )
+    return build_model_response(FollowsOut, follows_page)
+
+
+@router.get(
+    "/{id}/following",
+    response_model=FollowsOut,
+    responses={
+        404: not_found_error_response,
+        422: validation_error_response,
+    },
+)
+async def get_following(
+    id: Annotated[int, Path(gt=0)],
+    limit: Annotated[int, Query(gt=0, le=BATCH_MAX_SIZE)] = FOLLOWS_PAGE_SIZE,
+    cursor: Annotated[int | None, Query(gt=0)] = None,
+    session: AsyncSession = Depends(get_async_read_session),
+) -> Response | dict[str, bool | str | None | Sequence[dict[str, Any]]]:
+    """
+    Эндпоинт для получения страницы подписок пользователя.
+
+    Пользователи упорядочены по ID, как и первые подписки в профиле,
+    поэтому курсором продолжения профиля служит ID последней из них.
+    :param id: ID пользователя
+    :param limit: лимит
+    :param cursor: ID последнего пользователя предыдущей страницы
+    :param session: асинхронная сессия
+    :return: response
+    """
+    logger.info(
+        "User try to get following of user with ID: {id} with limit: "
+        "{limit} and cursor: {cursor}",
+        id=id,
+        limit=limit,
+        cursor=cursor,
+    )
+    follows_page = await get_follows_page(
+        id, followers=False, limit=limit, cursor=cursor, session=session,
+    )
+    logger.info(
+        "User get following of user with ID: {id} with limit: {limit} "
+        "and cursor: {cursor}",
+        id=id,
+        limit=limit,
+        cursor=cursor,
     )
-    return {
-        "request_result": True,
-        "user": user,
-    }
+    return build_model_response(FollowsOut, follows_page)
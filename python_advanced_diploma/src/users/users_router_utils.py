@@ -0,0 +1,303 @@
+"""Users router utils file. Use to create util functions."""
+
+from typing import Any, Sequence
+
+from sqlalchemy import (
+    Integer,
+    delete,
+    func,
+    literal,
+    select,
+    true,
+    union_all,
+    update,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession
+from sqlalchemy.sql.expression import (
+    ColumnElement,
+    CompoundSelect,
+    Select,
+    TableValuedAlias,
+)
+
+from python_advanced_diploma.src.cache import SingleFlight
+from python_advanced_diploma.src.config import PROFILE_FOLLOWS_PREVIEW_SIZE
+from python_advanced_diploma.src.routers_utils import serialize_response_model
+from python_advanced_diploma.src.users.users_models import Follow, User
+from python_advanced_diploma.src.users.users_schemas import UsersOut
+
+profile_flight: SingleFlight[bytes] = SingleFlight()
+
+
+def get_profiles_query() -> Select:
+    """
+    Функция для получения запроса профилей без подписчиков и подписок.
+
+    :return: запрос ID, имён и счётчиков подписчиков и подписок
+    """
+    return select(
+        User.id, User.name, User.followers_count, User.following_count,
+    )
+
+
+def get_follows_query(
+    user_id: int | ColumnElement[int],
+    followers: bool,
+    limit: int,
+    cursor: int | None = None,
+) -> Select:
+    """
+    Функция для получения запроса страницы подписчиков или подписок.
+
+    Страница упорядочена по ID пользователей и продолжается с курсора по
+    индексу подписок, не пропуская и не повторяя пользователей при
+    добавлении новых подписок.
+    :param user_id: ID пользователя или столбец с ним
+    :param followers: страница подписчиков, иначе подписок
+    :param limit: лимит
+    :param cursor: ID последнего пользователя предыдущей страницы
+    :return: запрос ID и имён пользователей страницы
+    """
+    if followers:
+        user_column = Follow.following_user_id
+        page_user_column = Follow.followed_user_id
+    else:
+        user_column = Follow.followed_user_id
+        page_user_column = Follow.following_user_id
+    query = (
+        select(User.id, User.name).
+        join(Follow, page_user_column == User.id).
+        filter(user_column == user_id)
+    )
+    if cursor is not None:
+        query = query.filter(page_user_column > cursor)
+    return query.order_by(page_user_column).limit(limit)
+
+
+async def get_follows_page(
+    user_id: int,
+    followers: bool,
+    limit: int,
+    cursor: int | None,
+    session: AsyncSession,
+) -> dict[str, Any]:
+    """
+    Функция для получения страницы подписчиков или подписок пользователя.
+
+    Существование пользователя проверяется только для пустой первой
+    страницы, и для несуществующего пользователя выбрасывается
+    NoResultFound.
+    :param user_id: ID пользователя
+    :param followers: страница подписчиков, иначе подписок
+    :param limit: лимит
+    :param cursor: ID последнего пользователя предыдущей страницы
+    :param session: асинхронная сессия
+    :return: страница пользователей и курсор следующей страницы
+    """
+    follows_select_result = await session.execute(
+        get_follows_query(user_id, followers, limit, cursor),
+    )
+    users = [user._asdict() for user in follows_select_result]
+    if not users and cursor is None:
+        user_select_result = await session.execute(
+            select(User.id).filter_by(id=user_id),
+        )
+        user_select_result.scalar_one()
+    next_cursor = None
+    if len(users) == limit:
+        next_cursor = str(users[-1]["id"])
+    return {
+        "result": True,
+        "users": users,
+        "next_cursor": next_cursor,
+    }
+
+
+def get_follows_preview_query(
+    users: TableValuedAlias, relation: str, followers: bool,
+) -> Select:
+    """
+    Функция для получения запроса первых подписчиков или подписок.
+
+    :param users: таблица ID пользователей
+    :param relation: название списка в профиле
+    :param followers: первые подписчики, иначе подписки
+    :return: запрос первых пользователей страниц всех пользователей
+    """
+    preview = get_follows_query(
+        users.c.user_id, followers, PROFILE_FOLLOWS_PREVIEW_SIZE,
+    ).lateral()
+    return (
+        select(
+            literal(relation).label("relation"),
+            users.c.user_id,
+            preview.c.id,
+            preview.c.name,
+        ).
+        select_from(users).
+        join(preview, true())
+    )
+
+
+def get_follows_previews_query(user_ids: list[int]) -> CompoundSelect:
+    """
+    Функция для получения запроса первых подписчиков и подписок.
+
+    Первые страницы всех профилей выбираются одним запросом с лимитом в
+    боковых подзапросах, поэтому размер ответа не зависит от количества
+    подписчиков.
+    :param user_ids: ID пользователей
+    :return: запрос первых подписчиков и подписок
+    """
+    users = func.unnest(
+        literal(user_ids, ARRAY(Integer)),
+    ).table_valued("user_id").render_derived()
+    previews_query = union_all(
+        get_follows_preview_query(users, "followers", followers=True),
+        get_follows_preview_query(users, "following", followers=False),
+    )
+    return previews_query.order_by(
+        previews_query.selected_columns.user_id,
+        previews_query.selected_columns.id,
+    )
+
+
+async def add_follows_previews(
+    profiles: Sequence[dict[str, Any]], session: AsyncSession,
+) -> None:
+    """
+    Функция для добавления в профили первых подписчиков и подписок.
+
+    Остальные страницы подписчиков и подписок запрашиваются отдельно.
+    :param profiles: профили с ID пользователей
+    :param session: асинхронная сессия
+    """
+    profiles_by_id = {}
+    for profile in profiles:
+        profile["followers"] = []
+        profile["following"] = []
+        profiles_by_id[profile["id"]] = profile
+    if not profiles_by_id:
+        return
+    previews_result = await session.execute(
+        get_follows_previews_query(list(profiles_by_id)),
+    )
+    for preview_row in previews_result:
+        profiles_by_id[preview_row.user_id][preview_row.relation].append(
+            {"id": preview_row.id, "name": preview_row.name},
+        )
+
+
+async def build_profile_info(
+    bind: AsyncEngine | AsyncConnection, user_id: int,
+) -> bytes:
+    """
+    Функция для построения сериализованной информации о профиле.
+
+    Информация строится в отдельной сессии, так как её результат разделяют
+    одновременные запросы и он не должен зависеть от сессии одного из них.
+    :param bind: движок или соединение сессии запроса
+    :param user_id: ID пользователя
+    :return: тело ответа с информацией о профиле
+    """
+    async with AsyncSession(bind) as session:
+        select_user_info_result = await session.execute(
+            get_profiles_query().filter_by(id=user_id),
+        )
+        user = select_user_info_result.one()._asdict()
+        await add_follows_previews([user], session)
+    return serialize_response_model(
+        UsersOut,
+        {
+            "request_result": True,
+            "user": user,
+        },
+    )
+
+
+async def add_follows(
+    user_id: int, followee_ids: Sequence[int], session: AsyncSession,
+) -> list[int]:
+    """
+    Функция для подписки пользователя на других пользователей.
+
+    Подписки на себя, несуществующих пользователей и повторные подписки
+    не вставляются и не прерывают транзакцию. Вставка подписок и
+    увеличение счётчиков подписчиков и подписок выполняются одним запросом.
+    :param user_id: ID подписчика
+    :param followee_ids: ID отслеживаемых пользователей
+    :param session: асинхронная сессия
+    :return: ID пользователей, на которых добавлены подписки
+    """
+    followees = (
+        select(User.id, literal(user_id)).
+        filter(User.id.in_(followee_ids), User.id != user_id)
+    )
+    inserted_follows = (
+        insert(Follow).
+        from_select(["following_user_id", "followed_user_id"], followees).
+        on_conflict_do_nothing().
+        returning(Follow.following_user_id).
+        cte("inserted_follows")
+    )
+    following_count_update = (
+        update(User).
+        filter(User.id == user_id, select(inserted_follows).exists()).
+        values(
+            following_count=User.following_count + select(
+                func.count(),
+            ).select_from(inserted_follows).scalar_subquery(),
+        ).
+        cte("following_count_update")
+    )
+    followers_count_update_result = await session.execute(
+        update(User).
+        filter(User.id.in_(select(inserted_follows.c.following_user_id))).
+        values(followers_count=User.followers_count + 1).
+        returning(User.id).
+        add_cte(following_count_update),
+    )
+    return sorted(followers_count_update_result.scalars().all())
+
+
+async def remove_follows(
+    user_id: int, followee_ids: Sequence[int], session: AsyncSession,
+) -> list[int]:
+    """
+    Функция для отписки пользователя от других пользователей.
+
+    Удаление подписок и уменьшение счётчиков подписчиков и подписок
+    выполняются одним запросом.
+    :param user_id: ID подписчика
+    :param followee_ids: ID отслеживаемых пользователей
+    :param session: асинхронная сессия
+    :return: ID пользователей, от которых пользователь отписан
+    """
+    deleted_follows = (
+        delete(Follow).
+        filter(
+            Follow.following_user_id.in_(followee_ids),
+            Follow.followed_user_id == user_id,
+        ).
+        returning(Follow.following_user_id).
+        cte("deleted_follows")
+    )
+    following_count_update = (
+        update(User).
+        filter(User.id == user_id, select(deleted_follows).exists()).
+        values(
+            following_count=User.following_count - select(
+                func.count(),
+            ).select_from(deleted_follows).scalar_subquery(),
+        ).
+        cte("following_count_update")
+    )
+    followers_count_update_result = await session.execute(
+        update(User).
+        filter(User.id.in_(select(deleted_follows.c.following_user_id))).
+        values(followers_count=User.followers_count - 1).
+        returning(User.id).
+        add_cte(following_count_update),
+    )
+    return sorted(followers_count_update_result.scalars().all())
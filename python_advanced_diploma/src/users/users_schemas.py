@@ -1,5 +1,8 @@
 """Users schemas file. Used to define schemas to users routes."""
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, conint
+
+from python_advanced_diploma.src.config import BATCH_MAX_SIZE
+from python_advanced_diploma.src.schemas import SuccessMessage
 
 
 class BaseUser(BaseModel):
@@ -12,6 +15,8 @@ class BaseUser(BaseModel):
 class UserOut(BaseUser):
     """Исходящий пользователь. Родитель: BaseModel."""
 
+    followers_count: int
+    following_count: int
     followers: list[BaseUser]
     following: list[BaseUser]
 
@@ -21,3 +26,31 @@ class UsersOut(BaseModel):
 
     request_result: bool = Field(..., serialization_alias="result")
     user: UserOut
+
+
+class UsersListOut(BaseModel):
+    """Исходящий список пользователей. Родитель: BaseModel."""
+
+    request_result: bool = Field(..., serialization_alias="result")
+    users: list[UserOut]
+
+
+class FollowsOut(SuccessMessage):
+    """Страница подписчиков или подписок. Родитель: SuccessMessage."""
+
+    users: list[BaseUser]
+    next_cursor: str | None = None
+
+
+class UserIdsIn(BaseModel):
+    """Входящие ID пользователей. Родитель: BaseModel."""
+
+    user_ids: list[conint(gt=0)] = Field(  # type: ignore
+        ..., min_length=1, max_length=BATCH_MAX_SIZE,
+    )
+
+
+class UserIdsOut(SuccessMessage):
+    """ID пользователей, изменённых запросом. Родитель: SuccessMessage."""
+
+    user_ids: list[int]
@@ -1,12 +1,15 @@
 """Tests conftest file. Used to prepare to tests."""
+import os
 from asyncio import get_event_loop_policy, sleep
-from typing import AsyncGenerator, Generator
+from contextlib import AbstractContextManager, contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import AsyncGenerator, Callable, Generator, Iterator
 
 import aiofiles
 import docker
 import pytest
 from httpx import ASGITransport, AsyncClient
-from sqlalchemy import NullPool
+from sqlalchemy import NullPool, update
 from sqlalchemy.ext.asyncio import (
     AsyncSession,
     async_sessionmaker,
@@ -20,9 +23,24 @@ from python_advanced_diploma.src.config import (
     DB_PORT_TEST,
     DB_USER_TEST,
 )
-from python_advanced_diploma.src.database import Base, get_async_session
+from python_advanced_diploma.src.database import (
+    Base,
+    get_async_read_session,
+    get_async_session,
+    get_async_session_maker,
+)
 from python_advanced_diploma.src.main import app
 from python_advanced_diploma.src.medias.medias_models import TweetMedia
+from python_advanced_diploma.src.medias.medias_renditions import (
+    render_image_renditions,
+)
+from python_advanced_diploma.src.metrics import (
+    RequestQueries,
+    count_queries,
+    instrument_engine,
+)
+from python_advanced_diploma.src.slow_queries import instrument_slow_queries
+from python_advanced_diploma.src.tweets.tweets_feed_cache import feed_cache
 from python_advanced_diploma.src.tweets.tweets_models import Like, Tweet
 from python_advanced_diploma.src.users.users_models import Follow, User
 from tests.factories import TweetFactory, UserFactory
@@ -39,6 +57,8 @@ DATABASE_URL_TEST = (
     )
 )
 engine_test = create_async_engine(DATABASE_URL_TEST, poolclass=NullPool)
+instrument_engine(engine_test)
+instrument_slow_queries(engine_test)
 test_async_session_maker = async_sessionmaker(
     engine_test,
     class_=AsyncSession,
@@ -51,6 +71,10 @@ test_async_session = test_async_session_maker()
 
 docker_client = docker.from_env()
 
+NEW_USERS_COUNT = 3
+
+AssertMaxQueries = Callable[[int], AbstractContextManager[RequestQueries]]
+
 
 async def override_get_async_session() -> AsyncGenerator[AsyncSession, None]:
     """
@@ -62,7 +86,46 @@ async def override_get_async_session() -> AsyncGenerator[AsyncSession, None]:
         yield test_session
 
 
+def override_get_async_session_maker() -> async_sessionmaker[AsyncSession]:
+    """
+    Функция для перезаписи фабрики асинхронных сессий.
+
+    :return: Фабрика асинхронных сессий
+    """
+    return test_async_session_maker
+
+
+async def create_follow(followee: User, follower: User) -> Follow:
+    """
+    Функция для создания подписки с увеличением счётчиков пользователей.
+
+    :param followee: Отслеживаемый пользователь
+    :param follower: Подписчик
+    :return: Подписка
+    """
+    follow = Follow(
+        following_user_id=followee.id, followed_user_id=follower.id,
+    )
+    test_async_session.add(follow)
+    await test_async_session.execute(
+        update(User).
+        filter_by(id=followee.id).
+        values(followers_count=User.followers_count + 1),
+    )
+    await test_async_session.execute(
+        update(User).
+        filter_by(id=follower.id).
+        values(following_count=User.following_count + 1),
+    )
+    await test_async_session.commit()
+    return follow
+
+
 app.dependency_overrides[get_async_session] = override_get_async_session
+app.dependency_overrides[get_async_read_session] = override_get_async_session
+app.dependency_overrides[get_async_session_maker] = (
+    override_get_async_session_maker
+)
 
 
 @pytest.fixture(autouse=True, scope="session")
@@ -131,6 +194,42 @@ async def ac() -> AsyncGenerator[AsyncClient, None]:
         yield async_client
 
 
+@pytest.fixture(autouse=True)
+async def invalidate_feed_cache() -> None:
+    """
+    Фикстура для сброса кэша ленты твитов.
+
+    Фикстуры изменяют ленту напрямую в БД, минуя сброс кэша в эндпоинтах.
+    """
+    await feed_cache.invalidate()
+
+
+@pytest.fixture
+def assert_max_queries() -> AssertMaxQueries:
+    """
+    Фикстура для проверки количества запросов к БД внутри блока.
+
+    Тест падает, если изменение увеличило количество запросов эндпоинта
+    сверх заданной границы.
+    :return: Контекстный менеджер с максимальным количеством запросов
+    """
+
+    @contextmanager
+    def max_queries_context(max_queries: int) -> Iterator[RequestQueries]:
+        with count_queries() as queries:
+            yield queries
+            assert queries.count <= max_queries, (
+                "Expected at most {max_queries} queries, executed {count}: "
+                "{statements}".format(
+                    max_queries=max_queries,
+                    count=queries.count,
+                    statements=list(queries.statements),
+                )
+            )
+
+    return max_queries_context
+
+
 @pytest.fixture(autouse=True, scope="session")
 async def set_session_for_factories() -> None:
     """Фикстура для добавления сессии в фабрики."""
@@ -151,6 +250,17 @@ async def user() -> UserFactory:
     return user
 
 
+@pytest.fixture
+def user_headers(user: User) -> dict[str, str]:
+    """
+    Фикстура заголовков запросов пользователя.
+
+    :param user: Пользователь
+    :return: Заголовки с api key пользователя
+    """
+    return {"Api-Key": user.user_api_key}
+
+
 @pytest.fixture
 async def tweet_to_delete(user: User) -> TweetFactory:
     """
@@ -249,6 +359,7 @@ async def exist_like_to_test(
         user_id=user.id,
         tweet_id=tweet_to_test_exist_like.id,
     )
+    tweet_to_test_exist_like.like_count = 1
     test_async_session.add(exist_like_to_test)
     await test_async_session.commit()
     return exist_like_to_test
@@ -281,6 +392,7 @@ async def like_to_delete(user: User, tweet_to_delete_like: Tweet) -> Like:
         user_id=user.id,
         tweet_id=tweet_to_delete_like.id,
     )
+    tweet_to_delete_like.like_count = 1
     test_async_session.add(like_to_delete)
     await test_async_session.commit()
     return like_to_delete
@@ -299,6 +411,19 @@ async def user_to_follow() -> UserFactory:
     return user_to_follow
 
 
+@pytest.fixture
+async def new_users() -> list[UserFactory]:
+    """
+    Фикстура новых пользователей без подписок.
+
+    :return: Новые пользователи
+    """
+    new_users = [UserFactory() for _ in range(NEW_USERS_COUNT)]
+    test_async_session.add_all(new_users)
+    await test_async_session.commit()
+    return new_users
+
+
 @pytest.fixture
 async def follow_to_test(user: User, user_to_follow: User) -> Follow:
     """
@@ -308,13 +433,7 @@ async def follow_to_test(user: User, user_to_follow: User) -> Follow:
     :param user_to_follow: Пользователь для тестирования подписки
     :return: Подписка для тестирования
     """
-    follow_to_test = Follow(
-        following_user_id=user_to_follow.id,
-        followed_user_id=user.id,
-    )
-    test_async_session.add(follow_to_test)
-    await test_async_session.commit()
-    return follow_to_test
+    return await create_follow(user_to_follow, user)
 
 
 @pytest.fixture
@@ -326,13 +445,63 @@ async def follow_to_delete(user: User, another_user: User) -> Follow:
     :param another_user: Другой пользователь
     :return: Подписка для удаления
     """
-    follow_to_delete = Follow(
-        following_user_id=user.id,
-        followed_user_id=another_user.id,
+    return await create_follow(user, another_user)
+
+
+@pytest.fixture(scope="session")
+async def followed_author() -> UserFactory:
+    """
+    Фикстура автора, на которого подписан пользователь.
+
+    :return: Отслеживаемый автор
+    """
+    followed_author = UserFactory()
+    test_async_session.add(followed_author)
+    await test_async_session.commit()
+    return followed_author
+
+
+@pytest.fixture(scope="session")
+async def follow_followed_author(user: User, followed_author: User) -> Follow:
+    """
+    Фикстура подписки пользователя на отслеживаемого автора.
+
+    :param user: Пользователь
+    :param followed_author: Отслеживаемый автор
+    :return: Подписка на отслеживаемого автора
+    """
+    return await create_follow(followed_author, user)
+
+
+@pytest.fixture
+async def not_fanned_out_tweet(followed_author: User) -> TweetFactory:
+    """
+    Фикстура твита, не разосланного по домашним лентам.
+
+    :param followed_author: Отслеживаемый автор
+    :return: Не разосланный твит
+    """
+    not_fanned_out_tweet = TweetFactory(
+        author=followed_author,
+        is_fanned_out=False,
     )
-    test_async_session.add(follow_to_delete)
+    test_async_session.add(not_fanned_out_tweet)
+    await test_async_session.commit()
+    return not_fanned_out_tweet
+
+
+@pytest.fixture
+async def own_not_fanned_out_tweet(user: User) -> TweetFactory:
+    """
+    Фикстура собственного твита пользователя, не разосланного по лентам.
+
+    :param user: Пользователь
+    :return: Собственный не разосланный твит
+    """
+    own_not_fanned_out_tweet = TweetFactory(author=user, is_fanned_out=False)
+    test_async_session.add(own_not_fanned_out_tweet)
     await test_async_session.commit()
-    return follow_to_delete
+    return own_not_fanned_out_tweet
 
 
 @pytest.fixture
@@ -359,6 +528,8 @@ async def tweets(
         user_id=another_user.id,
         tweet_id=tweet_one.id,  # type: ignore
     )
+    tweet_one.like_count = 1
+    tweet_three.like_count = 1
     test_async_session.add_all((like_one, like_two))
     await test_async_session.commit()
     return tweet_one, tweet_two, tweet_three
@@ -413,3 +584,38 @@ async def tweet_medias(tweet_media_images: list[str]) -> list[TweetMedia]:
     test_async_session.add_all(medias)
     await test_async_session.commit()
     return medias
+
+
+@pytest.fixture
+async def orphaned_tweet_media(test_image: bytes) -> TweetMedia:
+    """
+    Фикстура давно загруженного и не прикреплённого к твиту твит медиа.
+
+    :param test_image: тестовое изображение для твит медиа
+    :return: Не прикреплённое твит медиа
+    """
+    image_path = "../../images/orphaned_test_image.jpeg"
+    async with aiofiles.open(image_path, "wb") as img_file:
+        await img_file.write(test_image)
+    orphaned_tweet_media = TweetMedia(
+        image=image_path,
+        created_at=datetime.now(timezone.utc) - timedelta(days=2),
+    )
+    test_async_session.add(orphaned_tweet_media)
+    await test_async_session.commit()
+    return orphaned_tweet_media
+
+
+@pytest.fixture
+def rendition_paths() -> Iterator[dict[str, str]]:
+    """
+    Фикстура уменьшенных копий тестового изображения.
+
+    :yield: пути к копиям изображения
+    """
+    paths = render_image_renditions(
+        "../../tests/images_for_tests/test_image.jpeg",
+    )
+    yield paths
+    for rendition_path in paths.values():
+        os.remove(rendition_path)
@@ -23,6 +23,7 @@ class TweetFactory(factory.alchemy.SQLAlchemyModelFactory):
 
     content: factory.Faker = factory.Faker("word")
     author: factory.SubFactory = factory.SubFactory(UserFactory)
+    like_count: int = 0
 
     class Meta:
         """Мета класс фабрики твитов."""
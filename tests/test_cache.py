@@ -0,0 +1,137 @@
+"""Test cache file. Used to test in-process caches."""
+
+import asyncio
+from time import sleep
+
+import pytest
+
+from python_advanced_diploma.src.cache import SingleFlight, TTLCache
+
+# Время жизни записи и ожидание её устаревания в секундах
+SHORT_TTL = 0.01
+EXPIRATION_WAIT = 0.02
+
+
+def test_ttl_cache_get_and_set() -> None:
+    """Тест сохранения и получения значения из кэша."""
+    cache: TTLCache[int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("key", 1)
+    assert cache.get("key") == 1
+    assert cache.get("missing_key") is None
+    assert cache.stats() == {
+        "size": 1,
+        "hits": 1,
+        "misses": 1,
+        "evictions": 0,
+    }
+
+
+def test_ttl_cache_evicts_least_recently_used() -> None:
+    """Тест вытеснения давно не использовавшейся записи из кэша."""
+    cache: TTLCache[int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("first", 1)
+    cache.set("second", 2)
+    cache.get("first")
+    cache.set("third", 3)
+    assert cache.get("second") is None
+    assert cache.get("first") == 1
+    assert cache.get("third") == 3
+    assert cache.evictions == 1
+
+
+def test_ttl_cache_expires_entries() -> None:
+    """Тест устаревания записи в кэше."""
+    cache: TTLCache[int] = TTLCache(maxsize=2, ttl=SHORT_TTL)
+    cache.set("key", 1)
+    sleep(EXPIRATION_WAIT)
+    assert cache.get("key") is None
+    assert not len(cache)
+
+
+def test_ttl_cache_invalidate() -> None:
+    """Тест удаления записи из кэша."""
+    cache: TTLCache[int] = TTLCache(maxsize=2, ttl=60)
+    cache.set("key", 1)
+    cache.invalidate("key")
+    cache.invalidate("missing_key")
+    assert cache.get("key") is None
+
+
+async def test_single_flight_coalesces_concurrent_calls() -> None:
+    """Тест объединения одновременных вызовов с одним ключом."""
+    single_flight: SingleFlight[int] = SingleFlight()
+    release_call = asyncio.Event()
+    executions = []
+
+    async def call() -> int:
+        executions.append(1)
+        await release_call.wait()
+        return len(executions)
+
+    calls = [
+        asyncio.ensure_future(single_flight.do("key", call))
+        for _ in range(5)
+    ]
+    await asyncio.sleep(0)
+    release_call.set()
+    assert await asyncio.gather(*calls) == [1, 1, 1, 1, 1]
+    assert await single_flight.do("key", call) == 2
+    assert single_flight.stats() == {
+        "in_flight": 0,
+        "executions": 2,
+        "coalesced": 4,
+    }
+
+
+async def test_single_flight_with_different_keys() -> None:
+    """Тест выполнения одновременных вызовов с разными ключами."""
+    single_flight: SingleFlight[str] = SingleFlight()
+
+    async def call(call_key: str) -> str:
+        await asyncio.sleep(0)
+        return call_key
+
+    assert await asyncio.gather(
+        single_flight.do("first", lambda: call("first")),
+        single_flight.do("second", lambda: call("second")),
+    ) == ["first", "second"]
+    assert single_flight.coalesced == 0
+
+
+async def test_single_flight_shares_exception() -> None:
+    """Тест передачи исключения вызова всем ожидающим."""
+    single_flight: SingleFlight[int] = SingleFlight()
+
+    async def call() -> int:
+        await asyncio.sleep(0)
+        raise ValueError("call failed")
+
+    call_results = await asyncio.gather(
+        single_flight.do("key", call),
+        single_flight.do("key", call),
+        return_exceptions=True,
+    )
+    assert all(
+        isinstance(call_result, ValueError) for call_result in call_results
+    )
+    assert single_flight.stats()["in_flight"] == 0
+
+
+async def test_single_flight_with_caller_cancellation() -> None:
+    """Тест завершения вызова после отмены запустившего его вызова."""
+    single_flight: SingleFlight[int] = SingleFlight()
+    release_call = asyncio.Event()
+
+    async def call() -> int:
+        await release_call.wait()
+        return 1
+
+    first_call = asyncio.ensure_future(single_flight.do("key", call))
+    await asyncio.sleep(0)
+    second_call = asyncio.ensure_future(single_flight.do("key", call))
+    await asyncio.sleep(0)
+    first_call.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await first_call
+    release_call.set()
+    assert await second_call == 1
@@ -0,0 +1,99 @@
+"""Test database file. Used to test read sessions routing."""
+
+from typing import Generator
+
+import pytest
+
+from python_advanced_diploma.src.database import (
+    REPLICA_IS_FRESH_KEY,
+    async_session_maker,
+    get_read_session_maker,
+    is_replica_fresh,
+    is_replica_session,
+    mark_recent_write,
+    recent_writers_cache,
+    replica_state_cache,
+)
+from tests.conftest import test_async_session_maker
+
+
+@pytest.fixture
+def replica(monkeypatch: pytest.MonkeyPatch) -> Generator[None, None, None]:
+    """
+    Фикстура реплики, в качестве которой используется тестовая БД.
+
+    :param monkeypatch: фикстура для подмены атрибутов
+    :yield: None
+    """
+    monkeypatch.setattr(
+        "python_advanced_diploma.src.database.replica_session_maker",
+        test_async_session_maker,
+    )
+    replica_state_cache.clear()
+    recent_writers_cache.clear()
+    yield
+    replica_state_cache.clear()
+    recent_writers_cache.clear()
+
+
+async def test_get_read_session_maker_without_replica(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Тест выбора основного сервера для чтения, если реплика не настроена.
+
+    :param monkeypatch: фикстура для подмены атрибутов
+    """
+    monkeypatch.setattr(
+        "python_advanced_diploma.src.database.replica_session_maker", None,
+    )
+    session_maker = await get_read_session_maker("api_key")
+    assert session_maker is async_session_maker
+
+
+async def test_get_read_session_maker_from_replica(replica) -> None:
+    """
+    Тест выбора реплики для чтения, если она не отстаёт.
+
+    :param replica: реплика
+    """
+    replica_state_cache.set(REPLICA_IS_FRESH_KEY, cache_value=True)
+    session_maker = await get_read_session_maker("api_key")
+    assert session_maker is test_async_session_maker
+
+
+async def test_get_read_session_maker_after_own_write(replica) -> None:
+    """
+    Тест выбора основного сервера для чтения после записи пользователя.
+
+    :param replica: реплика
+    """
+    replica_state_cache.set(REPLICA_IS_FRESH_KEY, cache_value=True)
+    mark_recent_write("api_key")
+    session_maker = await get_read_session_maker("api_key")
+    assert session_maker is async_session_maker
+    other_session_maker = await get_read_session_maker("other_api_key")
+    assert other_session_maker is test_async_session_maker
+
+
+async def test_is_replica_fresh_without_replay(replica) -> None:
+    """
+    Тест проверки отставания сервера, не применяющего журнал изменений.
+
+    Сервер, не являющийся репликой, не используется для чтения вместо неё.
+    :param replica: реплика
+    """
+    assert not await is_replica_fresh(test_async_session_maker)
+    assert replica_state_cache.get(REPLICA_IS_FRESH_KEY) is False
+
+
+async def test_is_replica_session(replica) -> None:
+    """
+    Тест проверки, что сессия выполняет запросы к реплике.
+
+    :param replica: реплика
+    """
+    async with test_async_session_maker() as replica_session:
+        assert is_replica_session(replica_session)
+    async with async_session_maker() as primary_session:
+        assert not is_replica_session(primary_session)
@@ -0,0 +1,88 @@
+"""Test invalidation file. Used to test cross-worker cache invalidation."""
+
+import asyncio
+from typing import AsyncGenerator
+
+import pytest
+
+from python_advanced_diploma.src.database import recent_writers_cache
+from python_advanced_diploma.src.invalidation import (
+    InvalidationListener,
+    dispatch_invalidation,
+    publish_feed_change,
+)
+from python_advanced_diploma.src.tweets.tweets_feed_cache import feed_cache
+from tests.conftest import engine_test, test_async_session_maker
+
+# Максимальное время ожидания доставки события в секундах
+EVENT_TIMEOUT = 5
+EVENT_POLL_INTERVAL = 0.05
+
+
+async def wait_for_feed_version(version: int) -> None:
+    """
+    Функция для ожидания изменения версии ленты твитов.
+
+    :param version: исходная версия ленты
+    """
+    async def poll_feed_version() -> None:
+        while await feed_cache.current_version() == version:
+            await asyncio.sleep(EVENT_POLL_INTERVAL)
+
+    await asyncio.wait_for(poll_feed_version(), timeout=EVENT_TIMEOUT)
+
+
+async def test_dispatch_feed_invalidation() -> None:
+    """Тест применения события изменения ленты твитов."""
+    version = await feed_cache.current_version()
+    await dispatch_invalidation('{"entity": "feed", "key": null}')
+    assert await feed_cache.current_version() != version
+
+
+async def test_dispatch_invalid_invalidation() -> None:
+    """Тест пропуска некорректного события инвалидации."""
+    version = await feed_cache.current_version()
+    await dispatch_invalidation("not json")
+    await dispatch_invalidation('{"entity": "unknown"}')
+    assert await feed_cache.current_version() == version
+
+
+@pytest.fixture
+async def listener() -> AsyncGenerator[InvalidationListener, None]:
+    """
+    Фикстура запущенного слушателя событий инвалидации.
+
+    Слушатель сбрасывает кэши после подписки на канал событий.
+    :yield: подписанный на канал событий слушатель
+    """
+    version = await feed_cache.current_version()
+    invalidation_listener = InvalidationListener()
+    invalidation_listener.start(engine_test)
+    await wait_for_feed_version(version)
+    yield invalidation_listener
+    await invalidation_listener.stop()
+    recent_writers_cache.clear()
+
+
+async def publish_committed_feed_change(api_key: str) -> None:
+    """
+    Функция для публикации изменения ленты в зафиксированной транзакции.
+
+    :param api_key: api_key изменившего ленту пользователя
+    """
+    async with test_async_session_maker() as session:
+        await publish_feed_change(session, api_key)
+        await session.commit()
+
+
+async def test_invalidation_listener(listener: InvalidationListener) -> None:
+    """
+    Тест получения события инвалидации, опубликованного в транзакции.
+
+    Событие доставляется после фиксации транзакции.
+    :param listener: слушатель событий инвалидации
+    """
+    version = await feed_cache.current_version()
+    await publish_committed_feed_change("writer_api_key")
+    await wait_for_feed_version(version)
+    assert recent_writers_cache.get("writer_api_key")
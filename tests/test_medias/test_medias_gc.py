@@ -0,0 +1,42 @@
+"""Test medias garbage collector file. Used to test orphaned media cleanup."""
+import os
+from datetime import timedelta
+
+from sqlalchemy import select
+
+from python_advanced_diploma.src.medias.medias_gc import (
+    collect_orphaned_media,
+)
+from python_advanced_diploma.src.medias.medias_models import TweetMedia
+from tests.conftest import test_async_session, test_async_session_maker
+
+
+async def test_collect_orphaned_media(
+    orphaned_tweet_media: TweetMedia,
+    tweet_medias: list[TweetMedia],
+    test_image: bytes,
+) -> None:
+    """
+    Тест сборщика не прикреплённых к твитам твит медиа.
+
+    Недавно загруженные твит медиа не удаляются.
+    :param orphaned_tweet_media: Не прикреплённое твит медиа
+    :param tweet_medias: список недавно загруженных твит медиа
+    :param test_image: тестовое изображение для твит медиа
+    """
+    report = await collect_orphaned_media(
+        test_async_session_maker, timedelta(days=1),
+    )
+    query = select(TweetMedia.id).filter(
+        TweetMedia.id.in_(
+            [orphaned_tweet_media.id, *[media.id for media in tweet_medias]],
+        ),
+    )
+    async with test_async_session as session:
+        select_medias_result = await session.execute(query)
+    remaining_media_ids = select_medias_result.scalars().all()
+    assert orphaned_tweet_media.id not in remaining_media_ids
+    assert len(remaining_media_ids) == len(tweet_medias)
+    assert not os.path.isfile(orphaned_tweet_media.image)
+    assert report["deleted_rows"] >= 1
+    assert report["reclaimed_bytes"] >= len(test_image)
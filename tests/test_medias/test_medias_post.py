@@ -1,15 +1,28 @@
 """Test medias file. Used to test medias routes."""
 
-import shutil
+import os
+from hashlib import sha256
 
 import aiofiles
 import pytest
-from httpx import AsyncClient
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
 from sqlalchemy import select
 from sqlalchemy.exc import NoResultFound
 from starlette import status
 
+from python_advanced_diploma.src.medias.medias_middleware import (
+    MULTIPART_OVERHEAD_SIZE,
+    MediaSizeLimitMiddleware,
+)
 from python_advanced_diploma.src.medias.medias_models import TweetMedia
+from python_advanced_diploma.src.medias.medias_renditions import (
+    get_images_with_renditions,
+    get_rendition_paths,
+)
+from python_advanced_diploma.src.medias.medias_router_utils import (
+    get_image_path,
+)
 from python_advanced_diploma.src.users.users_models import User
 from tests.conftest import test_async_session
 
@@ -18,6 +31,8 @@ async def test_add_new_media(ac: AsyncClient, user: User) -> None:
     """
     Тест эндпоинта для добавления нового твит медиа.
 
+    Изображение сохраняется под именем хэша своего содержимого, его
+    уменьшенные копии создаются в фоне.
     :param ac: Асинхронный клиент
     :param user: Пользователь
     """
@@ -30,19 +45,22 @@ async def test_add_new_media(ac: AsyncClient, user: User) -> None:
         files={"file": ("test_image.jpeg", image)},
         headers={"Api-Key": user.user_api_key},
     )
-    select_media_result = await test_async_session.execute(
-        select(TweetMedia).filter(
-            TweetMedia.image.contains("test_image.jpeg"),
-        ))
-    new_tweet_media = select_media_result.scalars().one_or_none()
+    new_tweet_media = (
+        await test_async_session.scalars(
+            select(TweetMedia).filter_by(id=response.json().get("media_id")),
+        )
+    ).one()
     assert response.status_code == status.HTTP_201_CREATED
-    assert new_tweet_media is not None
     assert response.json() == {"result": True, "media_id": new_tweet_media.id}
-    shutil.rmtree(
-        "../../images/{user_api_key}".format(
-            user_api_key=user.user_api_key,
-        ),
+    assert new_tweet_media.image == get_image_path(
+        sha256(image).hexdigest(), "jpg",
     )
+    assert new_tweet_media.medium == get_rendition_paths(
+        new_tweet_media.image,
+    )["medium"]
+    for image_path in get_images_with_renditions([new_tweet_media.image]):
+        assert os.path.isfile(image_path)
+        os.remove(image_path)
 
 
 async def test_add_new_media_with_non_image_file(
@@ -90,3 +108,35 @@ async def test_add_new_media_without_media(
         headers={"Api-Key": user.user_api_key},
     )
     assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+async def test_add_too_large_media_rejected_early() -> None:
+    """
+    Тест отклонения загрузки файла по заголовку 'Content-Length'.
+
+    Эндпоинт не вызывается, если тело запроса больше лимита.
+    """
+    app = FastAPI()
+    upload_calls = []
+
+    @app.post("/api/medias")
+    async def add_media() -> dict[str, bool]:
+        """
+        Эндпоинт, запоминающий свой вызов.
+
+        :return: response
+        """
+        upload_calls.append(True)
+        return {"result": True}
+
+    app.add_middleware(MediaSizeLimitMiddleware, max_size=1)
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test",
+    ) as async_client:
+        response = await async_client.post(
+            "/api/medias",
+            files={"file": ("image.jpeg", bytes(MULTIPART_OVERHEAD_SIZE))},
+        )
+    assert response.status_code == status.HTTP_413_REQUEST_ENTITY_TOO_LARGE
+    assert not response.json()["result"]
+    assert not upload_calls
@@ -0,0 +1,97 @@
+"""Test medias renditions file. Used to test tweet media renditions."""
+import os
+import shutil
+from pathlib import Path
+
+import pytest
+from PIL import Image
+
+from python_advanced_diploma.src.medias.medias_renditions import (
+    MEDIUM_SIZE,
+    THUMBNAIL_SIZE,
+    get_images_with_renditions,
+    get_rendition_paths,
+    render_image_renditions,
+    save_media_renditions,
+)
+from python_advanced_diploma.src.tweets.tweets_schemas import TweetImage
+from tests.conftest import test_async_session_maker
+
+NON_EXISTENT_MEDIA_ID = 123456
+
+
+def test_render_image_renditions(rendition_paths: dict[str, str]) -> None:
+    """
+    Тест утилиты для создания уменьшенных копий изображения.
+
+    :param rendition_paths: пути к копиям изображения
+    """
+    assert rendition_paths == get_rendition_paths(
+        "../../tests/images_for_tests/test_image.jpeg",
+    )
+    with Image.open(rendition_paths["webp"]) as webp:
+        assert webp.format == "WEBP"
+
+
+@pytest.mark.parametrize(
+    "rendition, max_size",
+    [
+        ("thumbnail", THUMBNAIL_SIZE),
+        ("medium", MEDIUM_SIZE),
+    ],
+)
+def test_rendition_fits_max_size(
+    rendition_paths: dict[str, str],
+    rendition: str,
+    max_size: tuple[int, int],
+) -> None:
+    """
+    Тест размера уменьшенной копии изображения.
+
+    :param rendition_paths: пути к копиям изображения
+    :param rendition: название копии
+    :param max_size: максимальный размер копии
+    """
+    with Image.open(rendition_paths[rendition]) as rendition_image:
+        assert rendition_image.width <= max_size[0]
+        assert rendition_image.height <= max_size[1]
+
+
+def test_get_images_with_renditions() -> None:
+    """Тест утилиты для получения путей к изображениям вместе с копиями."""
+    images_with_renditions = get_images_with_renditions(["images/a/b.jpg"])
+    assert images_with_renditions == [
+        "images/a/b.jpg",
+        "images/a/b_thumbnail.jpg",
+        "images/a/b_medium.jpg",
+        "images/a/b.webp",
+    ]
+
+
+def test_tweet_image_serialization() -> None:
+    """Тест сериализации изображения твита с уменьшенной копией и без неё."""
+    original_image = TweetImage(image="images/a/b.jpg")
+    image_with_medium = TweetImage(
+        image="images/a/b.jpg",
+        medium="images/a/b_medium.jpg",
+    )
+    assert original_image.model_dump() == "images/a/b.jpg"
+    assert image_with_medium.model_dump() == "images/a/b_medium.jpg"
+
+
+async def test_save_renditions_of_deleted_media(tmp_path: Path) -> None:
+    """
+    Тест сохранения копий изображения удалённой твит медиа.
+
+    Изображение без ссылок удаляется вместе с созданными копиями.
+    :param tmp_path: Временная директория
+    """
+    image_path = str(tmp_path / "image.jpeg")
+    shutil.copy("../../tests/images_for_tests/test_image.jpeg", image_path)
+    rendition_paths = render_image_renditions(image_path)
+    async with test_async_session_maker() as session:
+        renditions_saved = await save_media_renditions(
+            NON_EXISTENT_MEDIA_ID, image_path, rendition_paths, session,
+        )
+    assert not renditions_saved
+    assert not os.listdir(tmp_path)
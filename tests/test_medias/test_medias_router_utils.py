@@ -1,13 +1,34 @@
 """Test medias routers utils file. Used to test media routers utils."""
 import os
-import shutil
+from hashlib import sha256
+from typing import AsyncIterator
 
 import aiofiles
+import pytest
+from sqlalchemy import func, select
 
+from python_advanced_diploma.src.medias.medias_models import TweetMedia
 from python_advanced_diploma.src.medias.medias_router_utils import (
+    IMAGES_TMP_DIR,
     delete_all_tweet_images,
+    get_image_path,
+    get_unreferenced_images,
+    lock_images,
     save_image_to_disk,
 )
+from tests.conftest import test_async_session, test_async_session_maker
+
+
+async def get_image_chunks(image: bytes) -> AsyncIterator[bytes]:
+    """
+    Функция для получения изображения частями.
+
+    :param image: изображение
+    :yield: часть изображения
+    """
+    chunk_size = 1024
+    for chunk_start in range(0, len(image), chunk_size):
+        yield image[chunk_start:chunk_start + chunk_size]
 
 
 async def test_delete_all_tweet_images(tweet_media_images: list[str]) -> None:
@@ -23,14 +44,80 @@ async def test_delete_all_tweet_images(tweet_media_images: list[str]) -> None:
 
 async def test_save_image_to_disk() -> None:
     """Тест утилиты для сохранения изображений на диск."""
+    async with aiofiles.open(
+        "../../tests/images_for_tests/test_image.jpeg", "rb",
+    ) as image_file:
+        image = await image_file.read()
+    test_image_path = await save_image_to_disk(get_image_chunks(image), "jpg")
+    same_image_path = await save_image_to_disk(get_image_chunks(image), "jpg")
+    assert test_image_path
+    assert test_image_path == same_image_path
+    assert test_image_path == get_image_path(sha256(image).hexdigest(), "jpg")
+    assert os.path.isfile(test_image_path)
+    assert os.path.getsize(test_image_path) == len(image)
+    os.remove(test_image_path)
+
+
+async def test_save_too_large_image_to_disk() -> None:
+    """Тест утилиты для сохранения на диск изображения, превышающего лимит."""
     async with aiofiles.open(
         "../../tests/images_for_tests/test_image.jpeg", "rb",
     ) as image_file:
         image = await image_file.read()
     test_image_path = await save_image_to_disk(
-        "api_key_for_test_util",
-        "filename_for_test_util",
-        image,
+        get_image_chunks(image),
+        "jpg",
+        max_size=len(image) - 1,
     )
-    assert os.path.isfile(test_image_path)
-    shutil.rmtree("../../images/api_key_for_test_util")
+    assert test_image_path is None
+    assert not os.listdir(IMAGES_TMP_DIR)
+
+
+async def get_broken_image_chunks() -> AsyncIterator[bytes]:
+    """
+    Функция для получения частей изображения с разрывом соединения.
+
+    :yield: часть изображения
+    :raises ConnectionError: соединение разорвано
+    """
+    yield b"\xff\xd8"
+    raise ConnectionError
+
+
+async def test_save_image_to_disk_with_broken_chunks() -> None:
+    """Тест удаления временного файла при ошибке чтения изображения."""
+    with pytest.raises(ConnectionError):
+        await save_image_to_disk(get_broken_image_chunks(), "jpg")
+    assert not os.listdir(IMAGES_TMP_DIR)
+
+
+async def test_get_unreferenced_images(
+    tweet_medias: list[TweetMedia],
+) -> None:
+    """
+    Тест утилиты для получения изображений без ссылок твит медиа.
+
+    :param tweet_medias: список твит медиа
+    """
+    referenced_image = tweet_medias[0].image
+    unreferenced_image = "../../images/unreferenced_image.jpg"
+    unreferenced_images = await get_unreferenced_images(
+        [referenced_image, unreferenced_image], test_async_session,
+    )
+    assert unreferenced_images == [unreferenced_image]
+
+
+async def test_lock_images() -> None:
+    """
+    Тест утилиты для блокировки изображений.
+
+    Заблокированное изображение нельзя заблокировать в другой транзакции.
+    """
+    image = "../../images/locked_image.jpg"
+    async with test_async_session_maker() as session:
+        await lock_images([image], session)
+        async with test_async_session_maker() as other_session:
+            is_locked = await other_session.scalar(
+                select(func.pg_try_advisory_xact_lock(func.hashtext(image))),
+            )
+    assert is_locked is False
@@ -0,0 +1,187 @@
+"""Test metrics file. Used to test runtime metrics."""
+
+import os
+from pathlib import Path
+
+import pytest
+from fastapi import FastAPI
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import text
+from starlette import status
+
+from python_advanced_diploma.src import metrics_router
+from python_advanced_diploma.src.metrics import (
+    Counter,
+    Gauge,
+    Histogram,
+    MetricsMiddleware,
+    MetricsRegistry,
+    RequestQueries,
+)
+from python_advanced_diploma.src.metrics_snapshots import (
+    MetricsSnapshots,
+    get_snapshot_path,
+)
+from python_advanced_diploma.src.users.users_models import User
+from tests.conftest import test_async_session_maker
+
+METRICS_PORT = 9000
+
+
+def test_histogram_renders_cumulative_buckets() -> None:
+    """Тест вывода гистограммы в формате Prometheus."""
+    metrics_registry = MetricsRegistry()
+    histogram = metrics_registry.register(
+        Histogram("duration", "Duration.", ("route",), buckets=(1, 10)),
+    )
+    for observed_value in (1, 2, 50):
+        histogram.observe(observed_value, ("/api",))
+    worker_labels = 'worker="{worker}",route="/api"'.format(
+        worker=os.getpid(),
+    )
+    assert metrics_registry.render().splitlines() == [
+        "# HELP duration Duration.",
+        "# TYPE duration histogram",
+        'duration_bucket{{{labels},le="1"}} 1.0'.format(
+            labels=worker_labels,
+        ),
+        'duration_bucket{{{labels},le="10"}} 2.0'.format(
+            labels=worker_labels,
+        ),
+        'duration_bucket{{{labels},le="+Inf"}} 3.0'.format(
+            labels=worker_labels,
+        ),
+        "duration_sum{{{labels}}} 53.0".format(labels=worker_labels),
+        "duration_count{{{labels}}} 3.0".format(labels=worker_labels),
+    ]
+
+
+def test_counter_and_gauge_render_labels() -> None:
+    """Тест вывода счётчика и значения с экранированными метками."""
+    metrics_registry = MetricsRegistry()
+    counter = metrics_registry.register(
+        Counter("requests_total", "Requests.", ("path",)),
+    )
+    gauge = metrics_registry.register(Gauge("in_progress", "In progress."))
+    counter.inc(('/say "hi"',), amount=2)
+    gauge.inc()
+    gauge.inc()
+    gauge.dec()
+    rendered_metrics = metrics_registry.render()
+    assert "# TYPE requests_total counter" in rendered_metrics
+    assert r'path="/say \"hi\""} 2.0' in rendered_metrics
+    assert "# TYPE in_progress gauge" in rendered_metrics
+    assert rendered_metrics.count("in_progress{") == 1
+    assert '"} 1.0' in rendered_metrics.split("in_progress{")[1]
+
+
+def test_render_other_workers_samples() -> None:
+    """Тест вывода образцов метрик других процессов."""
+    metrics_registry = MetricsRegistry()
+    metrics_registry.register(Counter("requests_total", "Requests."))
+    rendered_metrics = metrics_registry.render(
+        {"1": {"requests_total": [("requests_total", (), (), 3)]}},
+    )
+    assert 'requests_total{worker="1"} 3.0' in rendered_metrics
+    assert rendered_metrics.count("# TYPE requests_total") == 1
+
+
+def test_metrics_snapshots(tmp_path: Path) -> None:
+    """
+    Тест чтения снимков метрик других процессов из общего каталога.
+
+    Снимок текущего процесса не читается, так как его метрики выводятся
+    напрямую.
+    :param tmp_path: временный каталог
+    """
+    metrics_registry = MetricsRegistry()
+    metrics_registry.register(Counter("requests_total", "Requests.")).inc()
+    snapshots = MetricsSnapshots(metrics_registry, str(tmp_path), interval=1)
+    snapshots.write()
+    os.rename(
+        get_snapshot_path(str(tmp_path), str(os.getpid())),
+        get_snapshot_path(str(tmp_path), "1"),
+    )
+    snapshots.write()
+    assert snapshots.read() == {
+        "1": {"requests_total": [("requests_total", (), (), 1)]},
+    }
+
+
+async def test_get_metrics(
+    ac: AsyncClient, user: User, another_user: User,
+) -> None:
+    """
+    Тест эндпоинта для получения метрик.
+
+    Метрики запроса записываются с шаблоном пути маршрута.
+    :param ac: Асинхронный клиент
+    :param user: Пользователь
+    :param another_user: Другой пользователь
+    """
+    await ac.get(
+        "/api/users/{another_user_id}".format(
+            another_user_id=another_user.id,
+        ),
+        headers={"Api-Key": user.user_api_key},
+    )
+    response = await ac.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-type"].startswith("text/plain")
+    request_labels = 'method="GET",route="/api/users/{id}",status="200"}'
+    assert request_labels in response.text
+    assert "cache_events_total{worker=" in response.text
+    assert 'flight="profile",result="executed"}' in response.text
+
+
+async def test_get_metrics_on_public_port(
+    ac: AsyncClient, monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Тест эндпоинта для получения метрик на порту, отличном от METRICS_PORT.
+
+    :param ac: Асинхронный клиент
+    :param monkeypatch: фикстура для подмены атрибутов
+    """
+    monkeypatch.setattr(metrics_router, "METRICS_PORT", METRICS_PORT)
+    response = await ac.get("/metrics")
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_request_queries_repeated_statements() -> None:
+    """Тест поиска запросов, выполненных много раз за запрос."""
+    request_queries = RequestQueries()
+    request_queries.statements = {
+        "SELECT tweets": 1,
+        "SELECT users WHERE id = $1": 5,
+    }
+    assert request_queries.get_repeated_statements(5) == [
+        "SELECT users WHERE id = $1",
+    ]
+    assert not request_queries.get_repeated_statements(6)
+
+
+async def test_debug_query_headers() -> None:
+    """Тест заголовков с количеством и временем запросов к БД."""
+    app = FastAPI()
+
+    @app.get("/queries")
+    async def run_queries() -> dict[str, bool]:
+        """
+        Эндпоинт, выполняющий два запроса к БД.
+
+        :return: response
+        """
+        async with test_async_session_maker() as session:
+            await session.execute(text("SELECT 1"))
+            await session.execute(text("SELECT 2"))
+        return {"result": True}
+
+    app.add_middleware(MetricsMiddleware, debug=True)
+    async with AsyncClient(
+        transport=ASGITransport(app=app), base_url="http://test",
+    ) as async_client:
+        response = await async_client.get("/queries")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["x-db-query-count"] == "2"
+    assert float(response.headers["x-db-query-duration-ms"]) > 0
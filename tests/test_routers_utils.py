@@ -4,10 +4,12 @@ import random
 from string import ascii_letters
 
 import pytest
+from fastapi import Response
 from sqlalchemy.exc import NoResultFound
 
-from python_advanced_diploma.src.routers_utils import get_user_id_by_api_key
+from python_advanced_diploma.src import routers_utils
 from python_advanced_diploma.src.users.users_models import User
+from python_advanced_diploma.src.users.users_schemas import UsersOut
 from tests.conftest import test_async_session
 
 
@@ -17,7 +19,7 @@ async def test_get_user_id_by_api_key(user: User) -> None:
 
     :param user: Пользователь
     """
-    user_id = await get_user_id_by_api_key(
+    user_id = await routers_utils.get_user_id_by_api_key(
         user.user_api_key, test_async_session,
     )
     expected_user_id = user.id
@@ -32,4 +34,63 @@ async def test_get_user_id_by_non_exists_api_key() -> None:
     """
     api_key = "".join(random.choices(ascii_letters, k=5))  # noqa: S311
     with pytest.raises(NoResultFound):
-        await get_user_id_by_api_key(api_key, test_async_session)
+        await routers_utils.get_user_id_by_api_key(api_key, test_async_session)
+
+
+async def test_get_user_id_by_api_key_from_cache(user: User) -> None:
+    """
+    Тест утилиты для получения ID пользователя по его api key из кэша.
+
+    :param user: Пользователь
+    """
+    routers_utils.invalidate_user_api_key(user.user_api_key)
+    await routers_utils.get_user_id_by_api_key(
+        user.user_api_key, test_async_session,
+    )
+    hits_before = routers_utils.api_key_cache.hits
+    user_id = await routers_utils.get_user_id_by_api_key(
+        user.user_api_key, test_async_session,
+    )
+    assert user_id == user.id
+    assert routers_utils.api_key_cache.hits == hits_before + 1
+
+
+def test_build_model_response() -> None:
+    """Тест утилиты для сериализации ответа эндпоинта по его схеме."""
+    response = routers_utils.build_model_response(
+        UsersOut,
+        {
+            "request_result": True,
+            "user": {
+                "id": 1,
+                "name": "name",
+                "followers_count": 0,
+                "following_count": 0,
+                "followers": [],
+                "following": [],
+            },
+        },
+    )
+    assert isinstance(response, Response)
+    assert response.body == (
+        b'{"result":true,"user":{"id":1,"name":"name",'
+        b'"followers_count":0,"following_count":0,'
+        b'"followers":[],"following":[]}}'
+    )
+    assert response.media_type == "application/json"
+
+
+def test_build_model_response_with_revalidation(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Тест утилиты для сериализации ответа с выключенным быстрым путём.
+
+    Данные возвращаются для валидации и сериализации FastAPI.
+    :param monkeypatch: фикстура для подмены атрибутов
+    """
+    monkeypatch.setattr(
+        routers_utils, "SKIP_RESPONSE_REVALIDATION", value=False,
+    )
+    content = {"request_result": True, "user": {"id": 1, "name": "name"}}
+    assert routers_utils.build_model_response(UsersOut, content) is content
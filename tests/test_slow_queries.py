@@ -0,0 +1,106 @@
+"""Test slow queries file. Used to test the slow queries log."""
+
+import asyncio
+from typing import Any, Iterator
+
+import pytest
+from loguru import Record, logger
+from sqlalchemy import text
+
+from python_advanced_diploma.src import slow_queries
+from python_advanced_diploma.src.config import QUERY_PLANS_EXTRA_KEY
+from tests.conftest import test_async_session_maker
+
+SLOW_QUERY_THRESHOLD = 0.001
+
+
+@pytest.mark.parametrize(
+    "parameters, executemany, shape",
+    [
+        ([1, 2, 3, "name", None], False, "(int x 3, str, NoneType)"),
+        ({"id": 1}, False, "{'id': 'int'}"),
+        ([[1, "name"], [2, "name"]], True, "2 x (int, str)"),
+    ],
+)
+def test_get_parameters_shape(
+    parameters: Any, executemany: bool, shape: str,
+) -> None:
+    """
+    Тест получения формы параметров запроса без их значений.
+
+    :param parameters: Параметры запроса
+    :param executemany: Запрос выполняется для нескольких наборов параметров
+    :param shape: Ожидаемая форма параметров
+    """
+    assert slow_queries.get_parameters_shape(parameters, executemany) == shape
+
+
+@pytest.mark.parametrize(
+    "statement, analyze",
+    [
+        ("SELECT tweets.id FROM tweets", True),
+        ("SELECT users.id FROM users FOR UPDATE SKIP LOCKED", False),
+        ("UPDATE tweets SET like_count = $1", False),
+        ("WITH ids AS (DELETE FROM likes RETURNING id) SELECT 1", False),
+        (
+            "SELECT pg_advisory_xact_lock(hashtext(anon_1)) "
+            "FROM unnest($1::TEXT[]) AS anon_1",
+            False,
+        ),
+        ("SELECT pg_notify($1, $2)", False),
+        ("SELECT nextval('tweet_id_seq')", False),
+    ],
+)
+def test_can_analyze(statement: str, analyze: bool) -> None:
+    """
+    Тест проверки, можно ли выполнить запрос для EXPLAIN ANALYZE.
+
+    :param statement: Текст запроса
+    :param analyze: Ожидаемый результат
+    """
+    assert slow_queries.can_analyze(statement) is analyze
+
+
+@pytest.fixture
+def log_records() -> Iterator[list[Record]]:
+    """
+    Фикстура для сбора записей логов.
+
+    :yield: Записи логов
+    """
+    records: list[Record] = []
+    handler_id = logger.add(
+        lambda message: records.append(message.record), level="INFO",
+    )
+    yield records
+    logger.remove(handler_id)
+
+
+async def test_slow_query_is_logged_with_plan(
+    monkeypatch: pytest.MonkeyPatch, log_records: list[Record],
+) -> None:
+    """
+    Тест записи медленного запроса и его плана в логи.
+
+    :param monkeypatch: Фикстура для подмены атрибутов
+    :param log_records: Записи логов
+    """
+    monkeypatch.setattr(
+        slow_queries, "DB_SLOW_QUERY_THRESHOLD", SLOW_QUERY_THRESHOLD,
+    )
+    monkeypatch.setattr(slow_queries, "DB_SLOW_QUERY_EXPLAIN_RATE", 1)
+    async with test_async_session_maker() as session:
+        await session.execute(text("SELECT pg_sleep(0.01)"))
+    await asyncio.gather(*slow_queries._explain_tasks)
+    slow_query_messages = [
+        log_record["message"]
+        for log_record in log_records
+        if log_record["message"].startswith("Slow query")
+    ]
+    query_plans = [
+        log_record["message"]
+        for log_record in log_records
+        if QUERY_PLANS_EXTRA_KEY in log_record["extra"]
+    ]
+    assert any("pg_sleep" in message for message in slow_query_messages)
+    assert any("Result" in query_plan for query_plan in query_plans)
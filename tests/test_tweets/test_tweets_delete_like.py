@@ -29,16 +29,20 @@ async def test_dislike_tweet(
         ),
         headers={"Api-Key": user.user_api_key},
     )
-    query = select(Like).filter_by(
-        user_id=user.id,
-        tweet_id=tweet_to_delete_like.id,
-    )
     async with test_async_session as session:
-        select_like_to_delete_result = await session.execute(query)
-    like = select_like_to_delete_result.scalars().one_or_none()
+        like = await session.scalar(
+            select(Like).filter_by(
+                user_id=user.id,
+                tweet_id=tweet_to_delete_like.id,
+            ),
+        )
+        like_count = await session.scalar(
+            select(Tweet.like_count).filter_by(id=tweet_to_delete_like.id),
+        )
     assert response.status_code == status.HTTP_200_OK
     assert response.json() == {"result": True}
     assert like is None
+    assert like_count == 0
 
 
 async def test_dislike_tweet_with_non_valid_tweet_id(
@@ -73,3 +77,38 @@ async def test_dislike_non_exist_tweet(ac: AsyncClient, user: User) -> None:
     )
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert not response.json()["result"]
+
+
+async def test_dislike_tweets_batch(
+    ac: AsyncClient,
+    user: User,
+    tweet_to_delete_like: Tweet,
+    like_to_delete: Like,
+    tweet_to_like: Tweet,
+) -> None:
+    """
+    Тест эндпоинта для удаления отметок 'Нравится' с нескольких твитов.
+
+    Твит без лайка пользователя пропускается.
+    :param ac: Асинхронный клиент
+    :param user: Пользователь
+    :param tweet_to_delete_like: Твит с отметкой 'Нравится' для удаления
+    :param like_to_delete: Лайк для удаления
+    :param tweet_to_like: Твит без отметки 'Нравится'
+    """
+    response = await ac.post(
+        "/api/tweets/likes/batch/delete",
+        json={"tweet_ids": [tweet_to_delete_like.id, tweet_to_like.id]},
+        headers={"Api-Key": user.user_api_key},
+    )
+    like_count_query = select(Tweet.like_count).filter_by(
+        id=tweet_to_delete_like.id,
+    )
+    async with test_async_session as session:
+        select_like_count_result = await session.execute(like_count_query)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "result": True,
+        "tweet_ids": [tweet_to_delete_like.id],
+    }
+    assert select_like_count_result.scalars().one() == 0
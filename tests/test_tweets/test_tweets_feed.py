@@ -0,0 +1,39 @@
+"""Test tweets feed file. Used to test tweets feed page utils."""
+
+import pytest
+
+from python_advanced_diploma.src.tweets.tweets_feed import (
+    decode_feed_cursor,
+    encode_feed_cursor,
+)
+
+
+@pytest.mark.parametrize(
+    "like_count, tweet_id",
+    [
+        (0, 1),
+        (15, 42),
+        (1000, 123456),
+    ],
+)
+def test_encode_and_decode_feed_cursor(like_count: int, tweet_id: int) -> None:
+    """
+    Тест утилит для создания и разбора курсора ленты твитов.
+
+    :param like_count: количество лайков твита
+    :param tweet_id: ID твита
+    """
+    cursor = encode_feed_cursor(like_count, tweet_id)
+    assert decode_feed_cursor(cursor) == (like_count, tweet_id)
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "MTU6", "LTE6Mg"])
+def test_decode_non_valid_feed_cursor(cursor: str) -> None:
+    """
+    Тест утилиты для разбора курсора ленты твитов.
+
+    С передачей некорректного курсора.
+    :param cursor: курсор
+    """
+    with pytest.raises(ValueError):
+        decode_feed_cursor(cursor)
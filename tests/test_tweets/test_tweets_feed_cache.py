@@ -0,0 +1,38 @@
+"""Test tweets feed cache file. Used to test tweets feed pages cache."""
+
+from python_advanced_diploma.src.tweets.tweets_feed_cache import (
+    FeedCache,
+    InMemoryFeedCacheBackend,
+)
+
+
+async def test_feed_cache_get_and_set() -> None:
+    """Тест сохранения и получения страницы ленты из кэша."""
+    cache = FeedCache(InMemoryFeedCacheBackend(maxsize=2, ttl=60), 0)
+    version = await cache.current_version()
+    await cache.set((10, None, None), version, b"page")
+    assert await cache.get((10, None, None), version) == b"page"
+    assert await cache.get((10, 2, None), version) is None
+    assert cache.stats() == {"hits": 1, "stale_hits": 0, "misses": 1}
+
+
+async def test_feed_cache_invalidate() -> None:
+    """Тест сброса кэша ленты при её изменении."""
+    cache = FeedCache(InMemoryFeedCacheBackend(maxsize=2, ttl=60), 0)
+    version = await cache.current_version()
+    await cache.set((10, None, None), version, b"page")
+    await cache.invalidate()
+    new_version = await cache.current_version()
+    assert new_version != version
+    assert await cache.get((10, None, None), new_version) is None
+
+
+async def test_feed_cache_max_staleness() -> None:
+    """Тест получения устаревшей страницы ленты в окне устарелости."""
+    cache = FeedCache(InMemoryFeedCacheBackend(maxsize=2, ttl=60), 60)
+    version = await cache.current_version()
+    await cache.set((10, None, None), version, b"page")
+    await cache.invalidate()
+    new_version = await cache.current_version()
+    assert await cache.get((10, None, None), new_version) == b"page"
+    assert cache.stale_hits == 1
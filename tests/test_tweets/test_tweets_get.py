@@ -1,18 +1,23 @@
 """Test get tweets route file. Used to test get tweets route."""
 
+import json
+
+import pytest
 from httpx import AsyncClient
-from sqlalchemy import func, select
+from sqlalchemy import select
 from starlette import status
 
-from python_advanced_diploma.src.tweets.tweets_models import Like, Tweet
+from python_advanced_diploma.src.tweets import tweets_router
+from python_advanced_diploma.src.tweets.tweets_feed_cache import feed_cache
+from python_advanced_diploma.src.tweets.tweets_models import Tweet
 from python_advanced_diploma.src.users.users_models import User
-from tests.conftest import test_async_session
+from tests.conftest import AssertMaxQueries, test_async_session
 
 
 async def test_get_tweets(
     ac: AsyncClient,
     user: User,
-    tweets: tuple[Tweet],
+    tweets: tuple[Tweet, ...],
 ) -> None:
     """
     Тест эндпоинта для получения ленты твитов.
@@ -27,9 +32,7 @@ async def test_get_tweets(
     )
     query = (
         select(Tweet.id).
-        join(Like, isouter=True).
-        group_by(Tweet.id).
-        order_by(func.count(Tweet.likes).desc(), Tweet.id)
+        order_by(Tweet.like_count.desc(), Tweet.id)
     )
     async with test_async_session as session:
         select_tweets_result = await session.execute(query)
@@ -41,6 +44,142 @@ async def test_get_tweets(
     assert select_tweets_result.scalars().all() == response_tweets
 
 
+async def test_get_tweets_with_cursor(
+    ac: AsyncClient,
+    user_headers: dict[str, str],
+    tweets: tuple[Tweet, ...],
+) -> None:
+    """
+    Тест эндпоинта для получения ленты твитов с постраничным курсором.
+
+    :param ac: Асинхронный клиент
+    :param user_headers: Заголовки запросов пользователя
+    :param tweets: Кортеж твитов
+    """
+    first_page_response = await ac.get(
+        "/api/tweets?limit=2",
+        headers=user_headers,
+    )
+    assert first_page_response.json()["next_cursor"]
+    second_page_response = await ac.get(
+        "/api/tweets",
+        params={
+            "limit": 2,
+            "cursor": first_page_response.json()["next_cursor"],
+        },
+        headers=user_headers,
+    )
+    async with test_async_session as session:
+        tweet_ids = await session.scalars(
+            select(Tweet.id).order_by(Tweet.like_count.desc(), Tweet.id),
+        )
+    response_tweets = [
+        tweet.get("id")
+        for page_response in (first_page_response, second_page_response)
+        for tweet in page_response.json().get("tweets")
+    ]
+    assert second_page_response.status_code == status.HTTP_200_OK
+    assert tweet_ids.all()[:4] == response_tweets
+
+
+@pytest.mark.parametrize("tweets_url", ["/api/tweets", "/api/tweets?limit=2"])
+async def test_get_tweets_json_from_database(
+    ac: AsyncClient,
+    user_headers: dict[str, str],
+    tweets: tuple[Tweet, ...],
+    monkeypatch: pytest.MonkeyPatch,
+    tweets_url: str,
+) -> None:
+    """
+    Тест эндпоинта для получения ленты твитов, собранной в PostgreSQL.
+
+    Ответ совпадает с ответом, собранным из моделей, с точностью до
+    пробелов, которые PostgreSQL добавляет в JSON.
+    :param ac: Асинхронный клиент
+    :param user_headers: Заголовки запросов пользователя
+    :param tweets: Кортеж твитов
+    :param monkeypatch: фикстура для подмены атрибутов
+    :param tweets_url: URL ленты твитов
+    """
+    models_response = await ac.get(
+        tweets_url,
+        headers=user_headers,
+    )
+    monkeypatch.setattr(tweets_router, "TWEETS_FEED_SQL_JSON", value=True)
+    await feed_cache.invalidate()
+    database_response = await ac.get(
+        tweets_url,
+        headers=user_headers,
+    )
+    database_response_content = json.dumps(
+        database_response.json(),
+        ensure_ascii=False,
+        separators=(",", ":"),
+    ).encode()
+    assert database_response.status_code == status.HTTP_200_OK
+    assert database_response_content == models_response.content
+
+
+async def test_get_tweets_from_cache(
+    ac: AsyncClient,
+    user: User,
+    user_headers: dict[str, str],
+    tweets: tuple[Tweet, ...],
+) -> None:
+    """
+    Тест эндпоинта для получения ленты твитов из кэша.
+
+    Лайк твита сбрасывает кэш ленты.
+    :param ac: Асинхронный клиент
+    :param user: Пользователь
+    :param user_headers: Заголовки запросов пользователя
+    :param tweets: Кортеж твитов
+    """
+    first_response = await ac.get(
+        "/api/tweets",
+        headers=user_headers,
+    )
+    hits_before = feed_cache.hits
+    cached_response = await ac.get(
+        "/api/tweets",
+        headers=user_headers,
+    )
+    assert feed_cache.hits == hits_before + 1
+    assert cached_response.content == first_response.content
+    await ac.post(
+        "/api/tweets/{id}/likes".format(id=tweets[1].id),
+        headers=user_headers,
+    )
+    response_after_like = await ac.get(
+        "/api/tweets",
+        headers=user_headers,
+    )
+    liked_tweet = next(
+        tweet
+        for tweet in response_after_like.json()["tweets"]
+        if tweet["id"] == tweets[1].id
+    )
+    assert feed_cache.hits == hits_before + 1
+    assert {"user_id": user.id, "name": user.name} in liked_tweet["likes"]
+
+
+async def test_get_tweets_with_non_valid_cursor(
+    ac: AsyncClient, user: User,
+) -> None:
+    """
+    Тест эндпоинта для получения ленты твитов с некорректным курсором.
+
+    :param ac: Асинхронный клиент
+    :param user: Пользователь
+    """
+    response = await ac.get(
+        "/api/tweets?limit=2&cursor=non_valid_cursor",
+        headers={"Api-Key": user.user_api_key},
+    )
+    assert response.status_code == status.HTTP_400_BAD_REQUEST
+    assert not response.json()["result"]
+
+
 async def test_get_tweets_without_user_api_key(ac: AsyncClient) -> None:
     """
     Тест эндпоинта для получения ленты твитов без api key пользователя.
@@ -70,3 +209,26 @@ async def test_get_tweets_with_non_valid_params(
     )
     assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
     assert not response.json()["result"]
+
+
+async def test_get_tweets_query_count(
+    ac: AsyncClient,
+    user: User,
+    tweets: tuple[Tweet, ...],
+    assert_max_queries: AssertMaxQueries,
+) -> None:
+    """
+    Тест количества запросов к БД эндпоинта для получения ленты твитов.
+
+    Пользователь, твиты и их медиа, авторы и лайкнувшие пользователи.
+    :param ac: Асинхронный клиент
+    :param user: Пользователь
+    :param tweets: Кортеж твитов
+    :param assert_max_queries: Проверка количества запросов к БД
+    """
+    with assert_max_queries(5):
+        response = await ac.get(
+            "/api/tweets",
+            headers={"Api-Key": user.user_api_key},
+        )
+    assert response.status_code == status.HTTP_200_OK
@@ -8,7 +8,7 @@ from starlette import status
 
 from python_advanced_diploma.src.tweets.tweets_models import Like, Tweet
 from python_advanced_diploma.src.users.users_models import User
-from tests.conftest import test_async_session
+from tests.conftest import AssertMaxQueries, test_async_session
 
 
 async def test_like_tweet(
@@ -29,13 +29,17 @@ async def test_like_tweet(
         ),
         headers={"Api-Key": user.user_api_key},
     )
-    query = select(Like).filter_by(user_id=user.id, tweet_id=tweet_to_like.id)
     async with test_async_session as session:
-        select_like_result = await session.execute(query)
-    like = select_like_result.scalars().one_or_none()
+        like = await session.scalar(
+            select(Like).filter_by(user_id=user.id, tweet_id=tweet_to_like.id),
+        )
+        like_count = await session.scalar(
+            select(Tweet.like_count).filter_by(id=tweet_to_like.id),
+        )
     assert response.status_code == status.HTTP_201_CREATED
     assert response.json() == {"result": True}
     assert like is not None
+    assert like_count == 1
 
 
 async def test_like_own_tweet(
@@ -139,5 +143,100 @@ async def test_like_tweet_already_exists(
         ),
         headers={"Api-Key": user.user_api_key},
     )
+    like_count_query = select(Tweet.like_count).filter_by(
+        id=tweet_to_test_exist_like.id,
+    )
+    async with test_async_session as session:
+        select_like_count_result = await session.execute(like_count_query)
     assert response.status_code == status.HTTP_400_BAD_REQUEST
     assert not response.json()["result"]
+    assert response.json()["error_message"] == "Tweet is already liked"
+    assert select_like_count_result.scalars().one() == 1
+
+
+async def test_like_tweet_queries(
+    ac: AsyncClient,
+    user: User,
+    tweet_to_like: Tweet,
+    assert_max_queries: AssertMaxQueries,
+) -> None:
+    """
+    Тест количества запросов к БД эндпоинта для установки отметки 'Нравится'.
+
+    Пользователь, вставка лайка с увеличением счётчика и уведомление об
+    изменении ленты.
+    :param ac: Асинхронный клиент
+    :param user: Пользователь
+    :param tweet_to_like: Твит для установки отметки 'Нравится'
+    :param assert_max_queries: Проверка количества запросов к БД
+    """
+    with assert_max_queries(3):
+        response = await ac.post(
+            "/api/tweets/{tweet_to_like_id}/likes".format(
+                tweet_to_like_id=tweet_to_like.id,
+            ),
+            headers={"Api-Key": user.user_api_key},
+        )
+    assert response.status_code == status.HTTP_201_CREATED
+
+
+@pytest.mark.usefixtures("exist_like_to_test")
+async def test_like_tweets_batch(
+    ac: AsyncClient,
+    user_headers: dict[str, str],
+    tweet_to_like: Tweet,
+    own_tweet_to_like: Tweet,
+    tweet_to_test_exist_like: Tweet,
+) -> None:
+    """
+    Тест эндпоинта для установки отметок 'Нравится' на несколько твитов.
+
+    Собственный, несуществующий и уже лайкнутый твиты пропускаются.
+    :param ac: Асинхронный клиент
+    :param user_headers: Заголовки запросов пользователя
+    :param tweet_to_like: Твит для установки отметки 'Нравится'
+    :param own_tweet_to_like: Собственный твит для установки отметки 'Нравится'
+    :param tweet_to_test_exist_like: Твит с установленной отметкой 'Нравится'
+    """
+    response = await ac.post(
+        "/api/tweets/likes/batch",
+        json={
+            "tweet_ids": [
+                tweet_to_like.id,
+                own_tweet_to_like.id,
+                tweet_to_test_exist_like.id,
+                666,
+            ],
+        },
+        headers=user_headers,
+    )
+    like_counts_query = select(Tweet.id, Tweet.like_count).filter(
+        Tweet.id.in_([tweet_to_like.id, tweet_to_test_exist_like.id]),
+    )
+    async with test_async_session as session:
+        like_counts_result = await session.execute(like_counts_query)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"result": True, "tweet_ids": [tweet_to_like.id]}
+    assert dict(like_counts_result.tuples().all()) == {
+        tweet_to_like.id: 1,
+        tweet_to_test_exist_like.id: 1,
+    }
+
+
+async def test_like_tweets_batch_without_tweet_ids(
+    ac: AsyncClient, user_headers: dict[str, str],
+) -> None:
+    """
+    Тест эндпоинта для установки отметок 'Нравится' на несколько твитов.
+
+    С пустым списком ID твитов.
+    :param ac: Асинхронный клиент
+    :param user_headers: Заголовки запросов пользователя
+    """
+    response = await ac.post(
+        "/api/tweets/likes/batch",
+        json={"tweet_ids": []},
+        headers=user_headers,
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert not response.json()["result"]
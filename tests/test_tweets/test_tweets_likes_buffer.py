@@ -0,0 +1,260 @@
+"""Test tweets likes buffer file. Used to test write-behind likes queue."""
+
+import os
+from pathlib import Path
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import select
+from starlette import status
+
+from python_advanced_diploma.src.tweets import (
+    tweets_likes_buffer,
+    tweets_router,
+)
+from python_advanced_diploma.src.tweets.tweets_models import Like, Tweet
+from python_advanced_diploma.src.users.users_models import User
+from tests.conftest import engine_test, test_async_session
+
+
+async def get_like_and_like_count(
+    user_id: int, tweet_id: int,
+) -> tuple[Like | None, int | None]:
+    """
+    Функция для получения лайка и счётчика лайков твита из БД.
+
+    :param user_id: ID пользователя
+    :param tweet_id: ID твита
+    :return: лайк | None и счётчик лайков твита
+    """
+    async with test_async_session as session:
+        like = await session.scalar(
+            select(Like).filter_by(user_id=user_id, tweet_id=tweet_id),
+        )
+        like_count = await session.scalar(
+            select(Tweet.like_count).filter_by(id=tweet_id),
+        )
+    return like, like_count
+
+
+@pytest.fixture
+def likes_buffer(tmp_path: Path) -> tweets_likes_buffer.LikesBuffer:
+    """
+    Фикстура очереди лайков во временной директории.
+
+    :param tmp_path: Временная директория
+    :return: Очередь лайков
+    """
+    return tweets_likes_buffer.LikesBuffer(
+        str(tmp_path), fsync=False, batch_size=100,
+    )
+
+
+@pytest.fixture
+def write_behind_buffer(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch,
+) -> tweets_likes_buffer.LikesBuffer:
+    """
+    Фикстура очереди лайков, через которую эндпоинты записывают лайки.
+
+    :param tmp_path: Временная директория
+    :param monkeypatch: Подмена атрибутов
+    :return: Очередь лайков
+    """
+    likes_buffer = tweets_likes_buffer.LikesBuffer(
+        str(tmp_path), fsync=True, batch_size=100,
+    )
+    monkeypatch.setattr(tweets_router, "LIKES_WRITE_BEHIND", value=True)
+    monkeypatch.setattr(tweets_router, "likes_buffer", likes_buffer)
+    return likes_buffer
+
+
+async def test_likes_buffer_recover(tmp_path: Path) -> None:
+    """
+    Тест воспроизведения файла очереди упавшего процесса.
+
+    :param tmp_path: Временная директория
+    """
+    likes_buffer = tweets_likes_buffer.LikesBuffer(
+        str(tmp_path), fsync=True, batch_size=100,
+    )
+    await likes_buffer.add(1, [10], liked=True)
+    await likes_buffer.add(2, [10], liked=True)
+    await likes_buffer.add(1, [10], liked=False)
+    queue_file = likes_buffer._queue_file
+    assert queue_file is not None
+    assert tweets_likes_buffer.claim_queue_file(queue_file.path) is None
+    queue_file.queue_file.close()
+    with open(queue_file.path, "ab") as torn_queue_file:
+        torn_queue_file.write(b"1 3")
+    recovered_buffer = tweets_likes_buffer.LikesBuffer(
+        str(tmp_path), fsync=True, batch_size=100,
+    )
+    assert recovered_buffer.recover() == 2
+    assert recovered_buffer.queued_likes == {(1, 10): False, (2, 10): True}
+
+
+async def test_likes_queue_file_sync_after_delete(tmp_path: Path) -> None:
+    """
+    Тест ожидания записи на диск файла очереди, удалённого после записи.
+
+    :param tmp_path: Временная директория
+    """
+    queue_file = tweets_likes_buffer.LikesQueueFile.create(str(tmp_path))
+    queue_file.append(1, 10, liked=True)
+    await queue_file.delete()
+    await queue_file.sync()
+    assert queue_file.synced == 0
+    assert not os.listdir(tmp_path)
+
+
+async def test_likes_buffer_flush(
+    user: User,
+    tweet_to_like: Tweet,
+    likes_buffer: tweets_likes_buffer.LikesBuffer,
+    tmp_path: Path,
+) -> None:
+    """
+    Тест записи лайков очереди в БД.
+
+    :param user: Пользователь
+    :param tweet_to_like: Твит для установки отметки 'Нравится'
+    :param likes_buffer: Очередь лайков
+    :param tmp_path: Временная директория
+    """
+    await likes_buffer.add(user.id, [tweet_to_like.id], liked=True)
+    assert await likes_buffer.flush(engine_test) == 1
+    like, like_count = await get_like_and_like_count(
+        user.id, tweet_to_like.id,
+    )
+    assert like is not None
+    assert like_count == 1
+    assert not os.listdir(tmp_path)
+
+
+async def test_likes_buffer_flush_is_idempotent(
+    user: User,
+    tweet_to_like: Tweet,
+    likes_buffer: tweets_likes_buffer.LikesBuffer,
+) -> None:
+    """
+    Тест повторной записи того же лайка очереди в БД.
+
+    :param user: Пользователь
+    :param tweet_to_like: Твит для установки отметки 'Нравится'
+    :param likes_buffer: Очередь лайков
+    """
+    for _ in range(2):
+        await likes_buffer.add(user.id, [tweet_to_like.id], liked=True)
+        await likes_buffer.flush(engine_test)
+    _, like_count = await get_like_and_like_count(user.id, tweet_to_like.id)
+    assert like_count == 1
+
+
+async def test_likes_buffer_flush_dislike(
+    user: User,
+    tweet_to_like: Tweet,
+    likes_buffer: tweets_likes_buffer.LikesBuffer,
+) -> None:
+    """
+    Тест записи отмены лайка очереди в БД.
+
+    :param user: Пользователь
+    :param tweet_to_like: Твит для установки отметки 'Нравится'
+    :param likes_buffer: Очередь лайков
+    """
+    for liked in (True, False):
+        await likes_buffer.add(user.id, [tweet_to_like.id], liked=liked)
+        await likes_buffer.flush(engine_test)
+    like, like_count = await get_like_and_like_count(
+        user.id, tweet_to_like.id,
+    )
+    assert like is None
+    assert like_count == 0
+
+
+async def test_likes_buffer_flush_failure(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    """
+    Тест сохранения лайков в очереди при ошибке записи в БД.
+
+    :param tmp_path: Временная директория
+    :param monkeypatch: Подмена атрибутов
+    """
+    async def fail_to_apply_likes(*args: object) -> None:
+        raise ConnectionError
+
+    monkeypatch.setattr(
+        tweets_likes_buffer, "apply_likes", fail_to_apply_likes,
+    )
+    likes_buffer = tweets_likes_buffer.LikesBuffer(
+        str(tmp_path), fsync=False, batch_size=1,
+    )
+    await likes_buffer.add(1, [10], liked=True)
+    assert likes_buffer.flush_requested.is_set()
+    assert await likes_buffer.flush(engine_test) == 0
+    await likes_buffer.add(2, [10], liked=True)
+    assert likes_buffer.queued_likes == {(1, 10): True, (2, 10): True}
+    assert likes_buffer.stats()["failed_flushes"] == 1
+    assert len(os.listdir(tmp_path)) == 2
+
+
+async def test_like_tweet_write_behind(
+    ac: AsyncClient,
+    user: User,
+    tweet_to_like: Tweet,
+    write_behind_buffer: tweets_likes_buffer.LikesBuffer,
+) -> None:
+    """
+    Тест установки отметки 'Нравится' через очередь лайков.
+
+    :param ac: Асинхронный клиент
+    :param user: Пользователь
+    :param tweet_to_like: Твит для установки отметки 'Нравится'
+    :param write_behind_buffer: Очередь лайков эндпоинтов
+    """
+    response = await ac.post(
+        "/api/tweets/{tweet_to_like_id}/likes".format(
+            tweet_to_like_id=tweet_to_like.id,
+        ),
+        headers={"Api-Key": user.user_api_key},
+    )
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    like, _ = await get_like_and_like_count(user.id, tweet_to_like.id)
+    assert like is None
+    await write_behind_buffer.flush(engine_test)
+    like, like_count = await get_like_and_like_count(
+        user.id, tweet_to_like.id,
+    )
+    assert like is not None
+    assert like_count == 1
+
+
+async def test_dislike_tweet_write_behind(
+    ac: AsyncClient,
+    user: User,
+    tweet_to_like: Tweet,
+    write_behind_buffer: tweets_likes_buffer.LikesBuffer,
+) -> None:
+    """
+    Тест отмены отметки 'Нравится' через очередь лайков.
+
+    Повторная отмена не найденного в очереди и в БД лайка отклоняется.
+    :param ac: Асинхронный клиент
+    :param user: Пользователь
+    :param tweet_to_like: Твит для установки отметки 'Нравится'
+    :param write_behind_buffer: Очередь лайков эндпоинтов
+    """
+    like_url = "/api/tweets/{tweet_to_like_id}/likes".format(
+        tweet_to_like_id=tweet_to_like.id,
+    )
+    headers = {"Api-Key": user.user_api_key}
+    await ac.post(like_url, headers=headers)
+    response = await ac.delete(like_url, headers=headers)
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    assert write_behind_buffer.queued_likes == {
+        (user.id, tweet_to_like.id): False,
+    }
+    response = await ac.delete(like_url, headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
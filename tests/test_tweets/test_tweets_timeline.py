@@ -0,0 +1,139 @@
+"""Test home timeline route file. Used to test home timeline route."""
+
+from httpx import AsyncClient
+from sqlalchemy import select
+from starlette import status
+
+from python_advanced_diploma.src.tweets.tweets_models import (
+    TimelineEntry,
+    Tweet,
+)
+from python_advanced_diploma.src.users.users_models import Follow, User
+from tests.conftest import AssertMaxQueries, test_async_session
+
+
+async def test_get_home_timeline(
+    ac: AsyncClient,
+    user: User,
+    followed_author: User,
+    follow_followed_author: Follow,
+) -> None:
+    """
+    Тест эндпоинта для получения домашней ленты твитов.
+
+    Новый твит отслеживаемого автора рассылается в ленту пользователя.
+    :param ac: Асинхронный клиент
+    :param user: Пользователь
+    :param followed_author: Отслеживаемый автор
+    :param follow_followed_author: Подписка на отслеживаемого автора
+    """
+    new_tweet_id = (
+        await ac.post(
+            "/api/tweets",
+            json={"tweet_data": "Tweet to fan out", "tweet_media_ids": []},
+            headers={"Api-Key": followed_author.user_api_key},
+        )
+    ).json()["tweet_id"]
+    response = await ac.get(
+        "/api/tweets/timeline",
+        headers={"Api-Key": user.user_api_key},
+    )
+    async with test_async_session as session:
+        timeline_entry = await session.scalar(
+            select(TimelineEntry).filter_by(
+                user_id=user.id,
+                tweet_id=new_tweet_id,
+            ),
+        )
+    response_tweets = [
+        tweet.get("id") for tweet in response.json().get("tweets")
+    ]
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["result"]
+    assert new_tweet_id in response_tweets
+    assert response_tweets == sorted(response_tweets, reverse=True)
+    assert timeline_entry is not None
+
+
+async def test_get_timeline_with_not_fanned_out_tweet(
+    ac: AsyncClient,
+    user: User,
+    follow_followed_author: Follow,
+    not_fanned_out_tweet: Tweet,
+) -> None:
+    """
+    Тест эндпоинта для получения домашней ленты твитов.
+
+    Не разосланный твит отслеживаемого автора читается из таблицы твитов.
+    :param ac: Асинхронный клиент
+    :param user: Пользователь
+    :param follow_followed_author: Подписка на отслеживаемого автора
+    :param not_fanned_out_tweet: Не разосланный твит
+    """
+    response = await ac.get(
+        "/api/tweets/timeline",
+        headers={"Api-Key": user.user_api_key},
+    )
+    response_tweets = [
+        tweet.get("id") for tweet in response.json().get("tweets")
+    ]
+    assert response.status_code == status.HTTP_200_OK
+    assert not_fanned_out_tweet.id in response_tweets
+
+
+async def test_get_timeline_with_own_old_tweet(
+    ac: AsyncClient,
+    user_headers: dict[str, str],
+    own_not_fanned_out_tweet: Tweet,
+) -> None:
+    """
+    Тест эндпоинта для получения домашней ленты твитов.
+
+    Собственный твит, созданный до появления лент, читается из таблицы
+    твитов.
+    :param ac: Асинхронный клиент
+    :param user_headers: Заголовки запросов пользователя
+    :param own_not_fanned_out_tweet: Собственный не разосланный твит
+    """
+    response = await ac.get("/api/tweets/timeline", headers=user_headers)
+    response_tweets = [
+        tweet.get("id") for tweet in response.json().get("tweets")
+    ]
+    assert response.status_code == status.HTTP_200_OK
+    assert own_not_fanned_out_tweet.id in response_tweets
+
+
+async def test_get_home_timeline_without_user_api_key(
+    ac: AsyncClient,
+) -> None:
+    """
+    Тест эндпоинта для получения домашней ленты без api key пользователя.
+
+    :param ac: Асинхронный клиент
+    """
+    response = await ac.get("/api/tweets/timeline")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert not response.json()["result"]
+
+
+async def test_get_home_timeline_query_count(
+    ac: AsyncClient,
+    user: User,
+    follow_followed_author: Follow,
+    assert_max_queries: AssertMaxQueries,
+) -> None:
+    """
+    Тест количества запросов к БД эндпоинта для получения домашней ленты.
+
+    Пользователь, твиты и их медиа, авторы и лайкнувшие пользователи.
+    :param ac: Асинхронный клиент
+    :param user: Пользователь
+    :param follow_followed_author: Подписка на отслеживаемого автора
+    :param assert_max_queries: Проверка количества запросов к БД
+    """
+    with assert_max_queries(5):
+        response = await ac.get(
+            "/api/tweets/timeline",
+            headers={"Api-Key": user.user_api_key},
+        )
+    assert response.status_code == status.HTTP_200_OK
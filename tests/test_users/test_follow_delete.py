@@ -9,7 +9,7 @@ from sqlalchemy import select
 from starlette import status
 
 from python_advanced_diploma.src.users.users_models import Follow, User
-from tests.conftest import test_async_session
+from tests.conftest import create_follow, test_async_session
 
 
 async def test_cancel_follow_user(
@@ -79,3 +79,33 @@ async def test_cancel_follow_user_non_exists(
     )
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert not response.json()["result"]
+
+
+async def test_cancel_follow_users_batch(
+    ac: AsyncClient, user: User, new_users: list[User],
+) -> None:
+    """
+    Тест эндпоинта для отмены подписки на нескольких пользователей.
+
+    Не отслеживаемый пользователь пропускается.
+    :param ac: Асинхронный клиент
+    :param user: Пользователь
+    :param new_users: Новые пользователи
+    """
+    followed_user, not_followed_user, _ = new_users
+    await create_follow(followed_user, user)
+    response = await ac.post(
+        "/api/users/follow/batch/delete",
+        json={"user_ids": [followed_user.id, not_followed_user.id]},
+        headers={"Api-Key": user.user_api_key},
+    )
+    async with test_async_session as session:
+        select_follow_result = await session.execute(
+            select(Follow).filter_by(
+                following_user_id=followed_user.id,
+                followed_user_id=user.id,
+            ),
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"result": True, "user_ids": [followed_user.id]}
+    assert select_follow_result.scalars().one_or_none() is None
@@ -5,7 +5,7 @@ from sqlalchemy import select
 from starlette import status
 
 from python_advanced_diploma.src.users.users_models import Follow, User
-from tests.conftest import test_async_session
+from tests.conftest import create_follow, test_async_session
 
 
 async def test_follow_user(
@@ -134,3 +134,37 @@ async def test_follow_user_already_exists(
     )
     assert response.status_code == status.HTTP_400_BAD_REQUEST
     assert not response.json()["result"]
+    assert response.json()["error_message"] == "User is already followed"
+
+
+async def test_follow_users_batch(
+    ac: AsyncClient, user: User, new_users: list[User],
+) -> None:
+    """
+    Тест эндпоинта для подписки на нескольких пользователей.
+
+    Сам пользователь, несуществующий и уже отслеживаемый пользователи
+    пропускаются.
+    :param ac: Асинхронный клиент
+    :param user: Пользователь
+    :param new_users: Новые пользователи
+    """
+    user_to_follow, followed_user, _ = new_users
+    await create_follow(followed_user, user)
+    response = await ac.post(
+        "/api/users/follow/batch",
+        json={
+            "user_ids": [user_to_follow.id, followed_user.id, user.id, 1234],
+        },
+        headers={"Api-Key": user.user_api_key},
+    )
+    async with test_async_session as session:
+        select_follow_result = await session.execute(
+            select(Follow).filter_by(
+                following_user_id=user_to_follow.id,
+                followed_user_id=user.id,
+            ),
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {"result": True, "user_ids": [user_to_follow.id]}
+    assert select_follow_result.scalars().one_or_none() is not None
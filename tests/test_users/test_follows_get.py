@@ -0,0 +1,133 @@
+"""Test get follows routes file. Used to test followers and following pages."""
+
+from typing import Any
+
+from httpx import AsyncClient
+from starlette import status
+
+from python_advanced_diploma.src.config import BATCH_MAX_SIZE
+from python_advanced_diploma.src.users.users_models import User
+
+UsersPages = list[list[dict[str, Any]]]
+
+
+async def get_pages(
+    ac: AsyncClient, url: str, headers: dict[str, str],
+) -> tuple[UsersPages, str | None]:
+    """
+    Функция для получения трёх страниц пользователей по одному на странице.
+
+    :param ac: Асинхронный клиент
+    :param url: Адрес страниц
+    :param headers: Заголовки запросов
+    :return: Пользователи страниц и курсор после последней страницы
+    """
+    pages = []
+    cursor = None
+    for _ in range(3):
+        params: dict[str, Any] = {"limit": 1}
+        if cursor is not None:
+            params["cursor"] = cursor
+        response = await ac.get(url, params=params, headers=headers)
+        assert response.status_code == status.HTTP_200_OK
+        pages.append(response.json()["users"])
+        cursor = response.json()["next_cursor"]
+    return pages, cursor
+
+
+async def test_get_followers_pages(
+    ac: AsyncClient, user_headers: dict[str, str], new_users: list[User],
+) -> None:
+    """
+    Тест эндпоинта для получения страниц подписчиков пользователя.
+
+    Страницы продолжаются с курсора до пустой страницы.
+    :param ac: Асинхронный клиент
+    :param user_headers: Заголовки запросов пользователя
+    :param new_users: Новые пользователи
+    """
+    followee, *followers = new_users
+    for follower in followers:
+        await ac.post(
+            "/api/users/{followee_id}/follow".format(followee_id=followee.id),
+            headers={"Api-Key": follower.user_api_key},
+        )
+    pages, cursor = await get_pages(
+        ac,
+        "/api/users/{followee_id}/followers".format(followee_id=followee.id),
+        user_headers,
+    )
+    assert pages == [
+        [{"id": followers[0].id, "name": followers[0].name}],
+        [{"id": followers[1].id, "name": followers[1].name}],
+        [],
+    ]
+    assert cursor is None
+
+
+async def test_get_following(
+    ac: AsyncClient, user_headers: dict[str, str], new_users: list[User],
+) -> None:
+    """
+    Тест эндпоинта для получения страницы подписок пользователя.
+
+    :param ac: Асинхронный клиент
+    :param user_headers: Заголовки запросов пользователя
+    :param new_users: Новые пользователи
+    """
+    follower, *followees = new_users
+    await ac.post(
+        "/api/users/follow/batch",
+        json={"user_ids": [followee.id for followee in followees]},
+        headers={"Api-Key": follower.user_api_key},
+    )
+    response = await ac.get(
+        "/api/users/{follower_id}/following".format(follower_id=follower.id),
+        headers=user_headers,
+    )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json() == {
+        "result": True,
+        "users": [
+            {"id": followee.id, "name": followee.name}
+            for followee in followees
+        ],
+        "next_cursor": None,
+    }
+
+
+async def test_get_followers_of_non_exists_user(
+    ac: AsyncClient, user: User,
+) -> None:
+    """
+    Тест эндпоинта для получения страницы подписчиков пользователя.
+
+    С несуществующим значением ID пользователя.
+    :param ac: Асинхронный клиент
+    :param user: Пользователь
+    """
+    response = await ac.get(
+        "/api/users/555/followers",
+        headers={"Api-Key": user.user_api_key},
+    )
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert not response.json()["result"]
+
+
+async def test_get_followers_with_too_big_limit(
+    ac: AsyncClient, user: User,
+) -> None:
+    """
+    Тест эндпоинта для получения страницы подписчиков пользователя.
+
+    С лимитом больше максимального размера страницы.
+    :param ac: Асинхронный клиент
+    :param user: Пользователь
+    """
+    response = await ac.get(
+        "/api/users/{user_id}/followers".format(user_id=user.id),
+        params={"limit": BATCH_MAX_SIZE + 1},
+        headers={"Api-Key": user.user_api_key},
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert not response.json()["result"]
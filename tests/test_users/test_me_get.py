@@ -7,6 +7,7 @@ from httpx import AsyncClient
 from starlette import status
 
 from python_advanced_diploma.src.users.users_models import User
+from tests.conftest import AssertMaxQueries
 
 
 async def test_get_own_profile_info(ac: AsyncClient, user: User) -> None:
@@ -58,3 +59,22 @@ async def test_get_own_non_exists_profile(
     )
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert not response.json()["result"]
+
+
+async def test_get_own_profile_info_query_count(
+    ac: AsyncClient, user: User, assert_max_queries: AssertMaxQueries,
+) -> None:
+    """
+    Тест количества запросов к БД эндпоинта для получения своего профиля.
+
+    Пользователь и его первые подписчики и подписки.
+    :param ac: Асинхронный клиент
+    :param user: Пользователь
+    :param assert_max_queries: Проверка количества запросов к БД
+    """
+    with assert_max_queries(2):
+        response = await ac.get(
+            "/api/users/me",
+            headers={"Api-Key": user.user_api_key},
+        )
+    assert response.status_code == status.HTTP_200_OK
@@ -4,6 +4,7 @@ from httpx import AsyncClient
 from starlette import status
 
 from python_advanced_diploma.src.users.users_models import User
+from tests.conftest import AssertMaxQueries
 
 
 async def test_get_profile_info(
@@ -64,3 +65,114 @@ async def test_get_profile_info_with_non_exists_user_id(
     )
     assert response.status_code == status.HTTP_404_NOT_FOUND
     assert not response.json()["result"]
+
+
+async def test_get_profile_info_query_count(
+    ac: AsyncClient,
+    user: User,
+    another_user: User,
+    assert_max_queries: AssertMaxQueries,
+) -> None:
+    """
+    Тест количества запросов к БД эндпоинта для получения профиля по ID.
+
+    Пользователь и его первые подписчики и подписки.
+    :param ac: Асинхронный клиент
+    :param user: Пользователь
+    :param another_user: Другой пользователь
+    :param assert_max_queries: Проверка количества запросов к БД
+    """
+    with assert_max_queries(2):
+        response = await ac.get(
+            "/api/users/{another_user_id}".format(
+                another_user_id=another_user.id,
+            ),
+            headers={"Api-Key": user.user_api_key},
+        )
+    assert response.status_code == status.HTTP_200_OK
+
+
+async def test_get_profile_follows_counts(
+    ac: AsyncClient, new_users: list[User],
+) -> None:
+    """
+    Тест счётчиков подписчиков и подписок в информации о профиле по ID.
+
+    Счётчики изменяются при подписке и отписке.
+    :param ac: Асинхронный клиент
+    :param new_users: Новые пользователи
+    """
+    followee, follower, _ = new_users
+    for user in new_users[1:]:
+        await ac.post(
+            "/api/users/{followee_id}/follow".format(followee_id=followee.id),
+            headers={"Api-Key": user.user_api_key},
+        )
+    await ac.post(
+        "/api/users/follow/batch/delete",
+        json={"user_ids": [followee.id]},
+        headers={"Api-Key": new_users[2].user_api_key},
+    )
+    followee_info = (await ac.get(
+        "/api/users/{followee_id}".format(followee_id=followee.id),
+        headers={"Api-Key": followee.user_api_key},
+    )).json()["user"]
+    follower_info = (await ac.get(
+        "/api/users/me",
+        headers={"Api-Key": follower.user_api_key},
+    )).json()["user"]
+    assert followee_info["followers_count"] == 1
+    assert followee_info["following_count"] == 0
+    assert followee_info["followers"] == [
+        {"id": follower.id, "name": follower.name},
+    ]
+    assert follower_info["following_count"] == 1
+    assert follower_info["following"] == [
+        {"id": followee.id, "name": followee.name},
+    ]
+
+
+async def test_get_profiles_info(
+    ac: AsyncClient,
+    user: User,
+    another_user: User,
+    assert_max_queries: AssertMaxQueries,
+) -> None:
+    """
+    Тест эндпоинта для получения информации о нескольких профилях по ID.
+
+    Несуществующий ID пропускается, а первые подписчики и подписки всех
+    пользователей загружаются одним запросом.
+    :param ac: Асинхронный клиент
+    :param user: Пользователь
+    :param another_user: Другой пользователь
+    :param assert_max_queries: Проверка количества запросов к БД
+    """
+    with assert_max_queries(2):
+        response = await ac.get(
+            "/api/users",
+            params={"ids": [another_user.id, user.id, 123456]},
+            headers={"Api-Key": user.user_api_key},
+        )
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["result"]
+    user_ids = [user_info["id"] for user_info in response.json()["users"]]
+    assert user_ids == sorted([user.id, another_user.id])
+
+
+async def test_get_profiles_info_without_ids(
+    ac: AsyncClient, user: User,
+) -> None:
+    """
+    Тест эндпоинта для получения информации о нескольких профилях по ID.
+
+    Без передачи ID.
+    :param ac: Асинхронный клиент
+    :param user: Пользователь
+    """
+    response = await ac.get(
+        "/api/users",
+        headers={"Api-Key": user.user_api_key},
+    )
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert not response.json()["result"]